@@ -1,15 +1,30 @@
 """
 Structured Logging Utility for Admin Operations
 Provides readable, formatted logging for all write operations
+
+With LOGS_STRUCTURED the admin loggers emit a one-line message and pass the
+details as typed fields (`extra={"fields": {...}}`), which the database
+handler stores in LogEntry.fields. The banner is only formatted when the
+entry is displayed, see format_admin_action.
 """
 
 import logging
+from contextvars import ContextVar
+from datetime import datetime
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 from typing import Optional, Dict, Any
 
 logger = logging.getLogger('django')
 
+# Id of the request being served, added to structured log records (see RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
 
 class AdminLogger:
     """Structured logging for admin operations"""
@@ -42,53 +57,61 @@ class AdminLogger:
             extra_info: Additional information to log
         """
 
-        timestamp = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-        emoji = AdminLogger.COLORS.get(action, '[ACTION]')
-        user_display = f"{user.first_name} {user.last_name}" if user.first_name else user.username
-
-        # Build the log message
-        log_lines = [
-            f"\n{'='*80}",
-            f"{emoji} {action.upper()} | {model_name}",
-            f"{'='*80}",
-            f"Timestamp: {timestamp}",
-            f"User: {user_display} ({user.email})",
-            f"ID: {instance.pk}",
-        ]
+        fields = {
+            'action': action,
+            'model': model_name,
+            'object_id': instance.pk,
+            **AdminLogger._user_fields(user),
+        }
 
         # Add instance representation
         if hasattr(instance, 'title'):
-            log_lines.append(f"Title: {instance.title}")
+            fields['title'] = str(instance.title)
         elif hasattr(instance, 'name'):
-            log_lines.append(f"Name: {instance.name}")
+            fields['name'] = str(instance.name)
 
         if hasattr(instance, 'slug'):
-            log_lines.append(f"Slug: {instance.slug}")
+            fields['slug'] = instance.slug
 
         if hasattr(instance, 'status'):
-            log_lines.append(f"Status: {instance.status}")
+            fields['status'] = instance.status
 
         if hasattr(instance, 'published_at'):
             pub_at = instance.published_at
-            log_lines.append(f"Published: {pub_at.strftime('%Y-%m-%d %H:%M:%S') if pub_at else 'Not published'}")
+            fields['published_at'] = pub_at.isoformat() if pub_at else None
 
         # Add changes if provided
         if changes and action == 'UPDATED':
-            log_lines.append(f"\nChanges:")
-            for field, (old_value, new_value) in changes.items():
-                log_lines.append(f"  • {field}:")
-                log_lines.append(f"      Old: {AdminLogger._format_value(old_value)}")
-                log_lines.append(f"      New: {AdminLogger._format_value(new_value)}")
+            fields['changes'] = {
+                field: [AdminLogger._format_value(old_value), AdminLogger._format_value(new_value)]
+                for field, (old_value, new_value) in changes.items()
+            }
 
         # Add extra info
         if extra_info:
-            log_lines.append(f"\nInfo: {extra_info}")
+            fields['info'] = extra_info
 
-        log_lines.append(f"{'='*80}\n")
+        return AdminLogger._log(fields)
 
-        message = '\n'.join(log_lines)
-        logger.info(message)
+    @staticmethod
+    def _user_fields(user: User) -> Dict[str, Any]:
+        return {
+            'user_id': user.pk,
+            'user': f"{user.first_name} {user.last_name}" if user.first_name else user.username,
+            'email': user.email,
+        }
 
+    @staticmethod
+    def _log(fields: Dict[str, Any]) -> str:
+        """Log the fields as a one-line message with structured fields, or as the full banner"""
+        if settings.LOGS_STRUCTURED:
+            emoji = AdminLogger.COLORS.get(fields['action'], '[ACTION]')
+            target = f"{fields['count']} items" if 'count' in fields else f"#{fields['object_id']}"
+            message = f"{emoji} {fields['action'].upper()} | {fields['model']} {target} by {fields['user']}"
+            logger.info(message, extra={'fields': fields})
+        else:
+            message = format_admin_action(fields, timezone.now())
+            logger.info(message)
         return message
 
     @staticmethod
@@ -117,28 +140,67 @@ class AdminLogger:
     ):
         """Log bulk operations like delete/status change"""
 
-        timestamp = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-        emoji = AdminLogger.COLORS.get(action, '[ACTION]')
-        user_display = f"{user.first_name} {user.last_name}" if user.first_name else user.username
+        fields = {
+            'action': action,
+            'model': model_name,
+            'count': count,
+            **AdminLogger._user_fields(user),
+        }
+        if query_description:
+            fields['query'] = query_description
+
+        return AdminLogger._log(fields)
 
-        log_lines = [
-            f"\n{'='*80}",
-            f"{emoji} BULK {action.upper()} | {model_name}",
-            f"{'='*80}",
-            f"Timestamp: {timestamp}",
-            f"User: {user_display} ({user.email})",
-            f"Items Affected: {count}",
-        ]
 
-        if query_description:
-            log_lines.append(f"Query: {query_description}")
+def format_admin_action(fields: Dict[str, Any], timestamp: datetime) -> str:
+    """The readable banner of an admin action logged with the given fields"""
+    emoji = AdminLogger.COLORS.get(fields['action'], '[ACTION]')
+    bulk = 'count' in fields
 
-        log_lines.append(f"{'='*80}\n")
+    log_lines = [
+        f"\n{'='*80}",
+        f"{emoji} {'BULK ' if bulk else ''}{fields['action'].upper()} | {fields['model']}",
+        f"{'='*80}",
+        f"Timestamp: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"User: {fields['user']} ({fields['email']})",
+    ]
 
-        message = '\n'.join(log_lines)
-        logger.info(message)
+    if bulk:
+        log_lines.append(f"Items Affected: {fields['count']}")
+        if fields.get('query'):
+            log_lines.append(f"Query: {fields['query']}")
+    else:
+        log_lines.append(f"ID: {fields['object_id']}")
 
-        return message
+        if 'title' in fields:
+            log_lines.append(f"Title: {fields['title']}")
+        elif 'name' in fields:
+            log_lines.append(f"Name: {fields['name']}")
+
+        if 'slug' in fields:
+            log_lines.append(f"Slug: {fields['slug']}")
+
+        if 'status' in fields:
+            log_lines.append(f"Status: {fields['status']}")
+
+        if 'published_at' in fields:
+            pub_at = fields['published_at']
+            log_lines.append(
+                f"Published: {datetime.fromisoformat(pub_at).strftime('%Y-%m-%d %H:%M:%S') if pub_at else 'Not published'}"
+            )
+
+        if fields.get('changes'):
+            log_lines.append(f"\nChanges:")
+            for field, (old_value, new_value) in fields['changes'].items():
+                log_lines.append(f"  • {field}:")
+                log_lines.append(f"      Old: {old_value}")
+                log_lines.append(f"      New: {new_value}")
+
+        if fields.get('info'):
+            log_lines.append(f"\nInfo: {fields['info']}")
+
+    log_lines.append(f"{'='*80}\n")
+    return '\n'.join(log_lines)
 
 
 def log_admin_change(sender, instance, created, **kwargs):
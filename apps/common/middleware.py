@@ -4,14 +4,47 @@ Tracks all admin actions and logs them to the logging system
 """
 
 import logging
+import re
+import time
+import uuid
 from django.http import HttpRequest, HttpResponse
 from django.contrib.admin.models import LogEntry, CHANGE, ADDITION, DELETION
 from django.contrib.contenttypes.models import ContentType
 from django.urls import resolve
 
+from apps.common.logging import request_id_var
+
 logger = logging.getLogger('django')
 
 
+class RequestIdMiddleware:
+    """
+    Give every request an id, taken from the proxy's X-Request-ID header when
+    it looks like one. Log records emitted while serving the request carry it
+    as the `request_id` field, and the response returns it to the client.
+    """
+
+    HEADER = 'X-Request-ID'
+    VALID_ID = re.compile(r'^[\w.-]{1,64}$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        request_id = request.headers.get(self.HEADER, '')
+        if not self.VALID_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+
+        token = request_id_var.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response[self.HEADER] = request_id
+        return response
+
+
 class AdminActionTrackingMiddleware:
     """
     Middleware to track admin actions
@@ -23,21 +56,30 @@ class AdminActionTrackingMiddleware:
         self.get_response = get_response
 
     def __call__(self, request: HttpRequest) -> HttpResponse:
+        start = time.perf_counter()
         response = self.get_response(request)
+        latency = time.perf_counter() - start
 
         # Only track admin changes
         if request.path.startswith('/admin/') and request.method in ['POST', 'DELETE']:
-            self._track_admin_request(request, response)
+            self._track_admin_request(request, response, latency)
 
         return response
 
-    def _track_admin_request(self, request: HttpRequest, response: HttpResponse):
+    def _track_admin_request(self, request: HttpRequest, response: HttpResponse, latency: float):
         """Track admin POST/DELETE requests"""
         try:
             # Log the request
             logger.info(
                 f"Admin Request: {request.method} {request.path} "
-                f"by {request.user.username} - Status: {response.status_code}"
+                f"by {request.user.username} - Status: {response.status_code}",
+                extra={'fields': {
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'user_id': request.user.pk,
+                    'latency_ms': round(latency * 1000, 1),
+                }},
             )
         except Exception as e:
             logger.error(f"Error tracking admin request: {e}")
@@ -0,0 +1,22 @@
+from functools import lru_cache
+
+from django.conf import settings
+
+try:
+    import redis  # type: ignore
+except Exception:
+    redis = None  # optional dependency, only needed when REDIS_URL is set
+
+
+@lru_cache(maxsize=1)
+def get_redis_client():
+    """
+    Return a shared Redis client for settings.REDIS_URL.
+
+    Returns None when Redis is not configured or the client library is not
+    installed, so callers can fall back to in-process structures.
+    """
+    url = getattr(settings, "REDIS_URL", "")
+    if not url or redis is None:
+        return None
+    return redis.Redis.from_url(url)
@@ -0,0 +1,40 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # optional dependency, fall back to the stock encoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for JSONRenderer built on orjson.
+
+    Produces the same bytes as the stock renderer: datetimes, Decimals, lazy
+    strings and other non-native types are passed to DRF's JSONEncoder
+    hook, and U+2028/U+2029 are escaped the same way. Indented output and
+    values orjson cannot encode fall back to the stock renderer.
+    """
+
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._encoder.default, option=self.options)
+        except TypeError:
+            # e.g. integers beyond 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same as JSONRenderer: these are valid JSON but break JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,33 @@
+import re
+
+# Uzbek/Russian Cyrillic -> Uzbek Latin. Apostrophe letters (o', g') lose the
+# apostrophe below anyway, so they map straight to their base letter.
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "ғ": "g", "д": "d", "е": "e",
+    "ё": "yo", "ж": "j", "з": "z", "и": "i", "й": "y", "к": "k", "қ": "q",
+    "л": "l", "м": "m", "н": "n", "о": "o", "ў": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ҳ": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "", "ы": "i", "ь": "", "э": "e",
+    "ю": "yu", "я": "ya",
+}
+
+_TRANSLITERATION = str.maketrans(CYRILLIC_TO_LATIN)
+
+# All the ways readers type the Uzbek apostrophe (o‘zbek, oʻzbek, o'zbek, o`zbek)
+_APOSTROPHES = re.compile(r"['`´ʻʼ‘’]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_script(text):
+    """
+    Normalize text for script-insensitive matching.
+
+    Lowercases, transliterates Cyrillic to Uzbek Latin, drops apostrophes and
+    collapses punctuation/whitespace, so "Ўзбекистон", "O‘zbekiston" and
+    "ozbekiston" all become "ozbekiston".
+    """
+    if not text:
+        return ""
+    text = text.casefold().translate(_TRANSLITERATION)
+    text = _APOSTROPHES.sub("", text)
+    return _NON_WORD.sub(" ", text).strip()
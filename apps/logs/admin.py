@@ -1,9 +1,88 @@
+import json
+import re
+from datetime import datetime, timedelta
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from unfold.admin import ModelAdmin
 from unfold.decorators import display
 
-from apps.logs.models import LogEntry
+from apps.common.logging import format_admin_action
+from apps.logs.models import ExceptionFingerprint, LogEntry
+from apps.logs.partitions import estimated_count, legacy_partition_end, month_bounds, partition_months
+
+
+# key:value search terms, keys look like identifiers so that times (12:30) and URLs stay text
+FIELD_TERM = re.compile(r'([A-Za-z_][A-Za-z0-9_]*):(?!//)(.+)')
+# Values stored as numbers print like this, zero-padded ones can only be strings
+INTEGER = re.compile(r'-?(0|[1-9][0-9]*)')
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts the unfiltered changelist from planner statistics instead of scanning every partition"""
+
+    # Below this many rows an exact count is cheap enough
+    EXACT_COUNT_LIMIT = 100_000
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimated_count()
+            if estimate > self.EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+class LoggerNameFilter(admin.SimpleListFilter):
+    """Logger names seen lately, listing all of them would read the whole table"""
+
+    title = 'logger name'
+    parameter_name = 'logger_name'
+    window = timedelta(days=1)
+
+    def lookups(self, request, model_admin):
+        names = LogEntry.objects.filter(timestamp__gte=timezone.now() - self.window).values_list(
+            'logger_name', flat=True
+        ).distinct().order_by('logger_name')
+        return [(name, name) for name in names]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(logger_name=self.value())
+        return queryset
+
+
+class MonthFilter(admin.SimpleListFilter):
+    """Months of the partitions, read from the catalog, each selecting a single partition"""
+
+    title = 'month'
+    parameter_name = 'month'
+    legacy = 'legacy'
+
+    def lookups(self, request, model_admin):
+        lookups = [(f'{month:%Y-%m}', f'{month:%B %Y}') for month in partition_months()]
+        if legacy_partition_end() is not None:
+            lookups.append((self.legacy, 'Before partitioning'))
+        return lookups
+
+    def queryset(self, request, queryset):
+        if self.value() == self.legacy:
+            end = legacy_partition_end()
+            return queryset.filter(timestamp__lt=end) if end is not None else queryset.none()
+        if self.value():
+            try:
+                month = datetime.strptime(self.value(), '%Y-%m').date()
+            except ValueError:
+                return queryset.none()
+            start, end = month_bounds(month)
+            return queryset.filter(timestamp__gte=start, timestamp__lt=end)
+        return queryset
 
 
 class LogEntryAdmin(ModelAdmin):
@@ -18,21 +97,33 @@ class LogEntryAdmin(ModelAdmin):
 
     list_filter = [
         'level',
-        'logger_name',
+        LoggerNameFilter,
+        MonthFilter,
         'timestamp',
     ]
 
-    search_fields = ['message', 'logger_name', 'pathname']
+    # Served by the trigram index on UPPER(message), other columns have filters.
+    # Terms like object_id:123 or action:UPDATED match structured fields instead
+    search_fields = ['message']
+    search_help_text = 'Search messages, or fields with key:value (e.g. model:Post object_id:123)'
     ordering = ['-timestamp']
-    readonly_fields = ['timestamp', 'level', 'logger_name', 'message', 'pathname', 'line_no', 'exception']
-    date_hierarchy = 'timestamp'
+    readonly_fields = [
+        'timestamp', 'level', 'logger_name', 'formatted_message', 'fields_display',
+        'pathname', 'line_no', 'exception',
+    ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('⏰ Timing', {
             'fields': ('timestamp',),
         }),
         ('📋 Log Details', {
-            'fields': ('level', 'logger_name', 'message'),
+            'fields': ('level', 'logger_name', 'formatted_message'),
+        }),
+        ('🧾 Fields', {
+            'fields': ('fields_display',),
+            'classes': ('collapse',),
         }),
         ('🔍 Location', {
             'fields': ('pathname', 'line_no'),
@@ -44,6 +135,24 @@ class LogEntryAdmin(ModelAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """Match key:value terms against the structured fields, the rest against the message"""
+        words = []
+        for term in search_term.split():
+            match = FIELD_TERM.fullmatch(term)
+            if match:
+                queryset = queryset.filter(self._field_lookup(*match.groups()))
+            else:
+                words.append(term)
+        return super().get_search_results(request, queryset, ' '.join(words))
+
+    @staticmethod
+    def _field_lookup(key, value):
+        """Search terms are text, ids and counts may be stored as numbers or as strings"""
+        if INTEGER.fullmatch(value):
+            return Q(fields__contains={key: int(value)}) | Q(fields__contains={key: value})
+        return Q(fields__contains={key: {'true': True, 'false': False, 'null': None}.get(value, value)})
+
     def has_add_permission(self, request):
         """Logs are read-only"""
         return False
@@ -105,10 +214,7 @@ class LogEntryAdmin(ModelAdmin):
             return '.'.join(parts[-2:])
         return obj.logger_name
 
-    @display(
-        description='Message',
-        ordering='message',
-    )
+    @display(description='Message')
     def message_preview(self, obj):
         """Display message preview"""
         message = obj.message.replace('\n', ' ')
@@ -116,6 +222,107 @@ class LogEntryAdmin(ModelAdmin):
             return message[:77] + '...'
         return message
 
+    @display(description='Message')
+    def formatted_message(self, obj):
+        """Full message, admin actions logged with fields are formatted here"""
+        fields = obj.fields or {}
+        message = format_admin_action(fields, obj.timestamp) if 'action' in fields and 'model' in fields else obj.message
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', message)
 
-admin.site.register(LogEntry, LogEntryAdmin)
+    @display(description='Fields')
+    def fields_display(self, obj):
+        """Structured fields as indented JSON"""
+        if not obj.fields:
+            return '-'
+        return format_html(
+            '<pre style="white-space: pre-wrap;">{}</pre>',
+            json.dumps(obj.fields, indent=2, ensure_ascii=False),
+        )
 
+
+class ExceptionFingerprintAdmin(ModelAdmin):
+    """Exception groups by occurrences in the last day, with their hourly rate"""
+
+    # Period the ranking and rates are computed over
+    window = timedelta(hours=24)
+
+    list_display = [
+        'exception_display',
+        'view_name',
+        'status_code',
+        'recent_count',
+        'rate_display',
+        'count',
+        'last_seen',
+        'logs_link',
+    ]
+    list_filter = ['status_code', 'last_seen']
+    search_fields = ['exception_type', 'view_name', 'path']
+    readonly_fields = [
+        'fingerprint', 'exception_type', 'view_name', 'status_code', 'message', 'path', 'count',
+        'first_seen', 'last_seen', 'frames_display', 'hourly_display', 'logs_link',
+    ]
+    fieldsets = (
+        ('🧩 Exception', {
+            'fields': ('exception_type', 'view_name', 'status_code', 'fingerprint', 'logs_link'),
+        }),
+        ('📈 Occurrences', {
+            'fields': ('count', 'first_seen', 'last_seen', 'hourly_display'),
+        }),
+        ('📝 Latest', {
+            'fields': ('message', 'path'),
+        }),
+        ('🔍 Stack', {
+            'fields': ('frames_display',),
+            'classes': ('collapse',),
+        }),
+    )
+
+    def get_queryset(self, request):
+        # Annotated before ordering, which ModelAdmin.get_queryset applies
+        since = timezone.now() - self.window
+        return self.model._default_manager.annotate(
+            recent_count=Coalesce(Sum('hourly_counts__count', filter=Q(hourly_counts__hour__gte=since)), 0),
+        ).order_by(*self.get_ordering(request))
+
+    def get_ordering(self, request):
+        return ['-recent_count', '-last_seen']
+
+    def has_add_permission(self, request):
+        """Fingerprints are recorded by the exception handler"""
+        return False
+
+    @display(description='Exception', ordering='exception_type')
+    def exception_display(self, obj):
+        """Exception class without its module"""
+        return obj.exception_type.rsplit('.', 1)[-1]
+
+    @display(description='Last 24h', ordering='recent_count')
+    def recent_count(self, obj):
+        return obj.recent_count
+
+    @display(description='Rate')
+    def rate_display(self, obj):
+        """Average occurrences per hour over the window"""
+        return f'{obj.recent_count / (self.window.total_seconds() / 3600):.1f}/h'
+
+    @display(description='Logs')
+    def logs_link(self, obj):
+        """Log entries of the sampled occurrences"""
+        url = reverse('admin:logs_logentry_changelist')
+        return format_html('<a href="{}?q=fingerprint:{}">View logs</a>', url, obj.fingerprint)
+
+    @display(description='Stack')
+    def frames_display(self, obj):
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', obj.frames)
+
+    @display(description='Hourly occurrences')
+    def hourly_display(self, obj):
+        """Occurrences per hour over the window, latest first"""
+        counts = obj.hourly_counts.filter(hour__gte=timezone.now() - self.window).order_by('-hour')
+        lines = '\n'.join(f'{count.hour:%Y-%m-%d %H:00}  {count.count}' for count in counts)
+        return format_html('<pre>{}</pre>', lines or '-')
+
+
+admin.site.register(LogEntry, LogEntryAdmin)
+admin.site.register(ExceptionFingerprint, ExceptionFingerprintAdmin)
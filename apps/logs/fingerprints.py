@@ -0,0 +1,223 @@
+"""
+Exception fingerprints.
+
+custom_exception_handler reduces every exception to a fingerprint: its
+type, the view it was raised in and the stack it went through, as module
+paths and function names. Line numbers are left out so that unrelated edits
+to a file don't split a group.
+
+ExceptionTracker counts occurrences per fingerprint in memory, and a
+background thread adds them to ExceptionFingerprint and its hourly
+ExceptionCount rows every flush interval. Only the first
+LOGS_EXCEPTION_TRACEBACKS_PER_HOUR occurrences of a fingerprint in an hour
+are meant to be logged, the rest are only counted. The limit applies per
+worker process.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from apps.logs.models import ExceptionCount, ExceptionFingerprint
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames kept, deep recursion doesn't make a new fingerprint per depth
+MAX_FRAMES = 30
+
+# Fingerprints per INSERT statement when flushing
+FLUSH_BATCH_SIZE = 500
+
+MAX_MESSAGE_LENGTH = 1000
+
+_PROJECT_ROOT = f"{settings.BASE_DIR}{os.sep}"
+_SITE_PACKAGES = f"site-packages{os.sep}"
+
+
+def _module_path(filename):
+    """File path without the install location, which differs between hosts and Python versions"""
+    if filename.startswith(_PROJECT_ROOT):
+        return filename[len(_PROJECT_ROOT):]
+    index = filename.rfind(_SITE_PACKAGES)
+    if index >= 0:
+        return filename[index + len(_SITE_PACKAGES):]
+    return os.path.basename(filename)
+
+
+def stack_frames(exc):
+    """Normalized frames of the exception's traceback, "path:function", outermost first"""
+    frames = []
+    for frame, _ in traceback.walk_tb(exc.__traceback__):
+        name = f"{_module_path(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+        if not frames or frames[-1] != name:
+            frames.append(name)
+    return frames[-MAX_FRAMES:]
+
+
+def exception_type_name(exc):
+    return f"{type(exc).__module__}.{type(exc).__qualname__}"
+
+
+def fingerprint(exception_type, view_name, frames):
+    return hashlib.sha1("\n".join([exception_type, view_name, *frames]).encode()).hexdigest()
+
+
+class _Occurrences:
+    """Occurrences of one fingerprint not stored yet"""
+
+    __slots__ = ("exception_type", "view_name", "frames", "status_code", "message", "path",
+                 "count", "first_seen", "last_seen", "hours")
+
+    def __init__(self, exception_type, view_name, frames):
+        self.exception_type = exception_type
+        self.view_name = view_name
+        self.frames = frames
+        self.status_code = None
+        self.message = ""
+        self.path = ""
+        self.count = 0
+        self.first_seen = None
+        self.last_seen = None
+        self.hours = Counter()
+
+    def add(self, now, status_code, message, path):
+        self.count += 1
+        self.first_seen = self.first_seen or now
+        self.last_seen = now
+        self.status_code, self.message, self.path = status_code, message, path
+        self.hours[now.replace(minute=0, second=0, microsecond=0)] += 1
+
+    def merge(self, newer):
+        """Add occurrences recorded after these ones"""
+        self.count += newer.count
+        self.last_seen = newer.last_seen
+        self.status_code, self.message, self.path = newer.status_code, newer.message, newer.path
+        self.hours.update(newer.hours)
+
+
+def apply_exception_counts(pending):
+    """Add pending occurrences to the fingerprints and their hourly counts in batched upserts"""
+    table = connection.ops.quote_name(ExceptionFingerprint._meta.db_table)
+    counts = connection.ops.quote_name(ExceptionCount._meta.db_table)
+    items = list(pending.items())
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(items), FLUSH_BATCH_SIZE):
+            batch = items[start:start + FLUSH_BATCH_SIZE]
+            values = ", ".join(["(%s, %s, %s, %s, %s::smallint, %s, %s, %s::bigint, %s, %s)"] * len(batch))
+            cursor.execute(
+                f"INSERT INTO {table} AS f (fingerprint, exception_type, view_name, frames, status_code, "
+                f"message, path, count, first_seen, last_seen) VALUES {values} "
+                f"ON CONFLICT (fingerprint) DO UPDATE SET count = f.count + EXCLUDED.count, "
+                f"last_seen = GREATEST(f.last_seen, EXCLUDED.last_seen), status_code = EXCLUDED.status_code, "
+                f"message = EXCLUDED.message, path = EXCLUDED.path "
+                f"RETURNING f.fingerprint, f.id",
+                [
+                    value
+                    for key, item in batch
+                    for value in (key, item.exception_type[:255], item.view_name[:255], "\n".join(item.frames),
+                                  item.status_code, item.message[:MAX_MESSAGE_LENGTH], item.path[:500],
+                                  item.count, item.first_seen, item.last_seen)
+                ],
+            )
+            ids = dict(cursor.fetchall())
+
+            hours = [(ids[key], hour, count) for key, item in batch for hour, count in item.hours.items()]
+            values = ", ".join(["(%s::bigint, %s, %s::integer)"] * len(hours))
+            cursor.execute(
+                f"INSERT INTO {counts} AS c (fingerprint_id, hour, count) VALUES {values} "
+                f"ON CONFLICT (fingerprint_id, hour) DO UPDATE SET count = c.count + EXCLUDED.count",
+                [value for row in hours for value in row],
+            )
+    return len(items)
+
+
+class ExceptionTracker:
+    """Counts exceptions per fingerprint and flushes the counts from a background thread"""
+
+    def __init__(self, tracebacks_per_hour, flush_interval):
+        self.tracebacks_per_hour = tracebacks_per_hour
+        self.flush_interval = flush_interval
+        self._pending = {}
+        # Fingerprint -> (hour, occurrences logged in that hour)
+        self._logged = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def record(self, exc, view_name, status_code, message, path):
+        """Count an occurrence, returns (fingerprint, whether this occurrence should be logged)"""
+        self._ensure_flusher()
+        exception_type = exception_type_name(exc)
+        frames = stack_frames(exc)
+        key = fingerprint(exception_type, view_name, frames)
+        now = timezone.now()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+
+        with self._lock:
+            occurrences = self._pending.get(key)
+            if occurrences is None:
+                occurrences = self._pending[key] = _Occurrences(exception_type, view_name, frames)
+            occurrences.add(now, status_code, message, path)
+
+            logged_hour, logged = self._logged.get(key, (hour, 0))
+            if logged_hour != hour:
+                logged = 0
+            sample = logged < self.tracebacks_per_hour
+            if sample:
+                self._logged[key] = (hour, logged + 1)
+        return key, sample
+
+    def flush(self):
+        """Store all pending occurrences, returns the number of fingerprints"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+            self._logged = {key: value for key, value in self._logged.items() if value[0] == hour}
+        if not pending:
+            return 0
+        try:
+            return apply_exception_counts(pending)
+        except Exception:
+            logger.exception("[EXCEPTIONS] Failed to store %s exception fingerprints, re-queued", len(pending))
+            with self._lock:
+                for key, occurrences in pending.items():
+                    newer = self._pending.get(key)
+                    if newer is not None:
+                        occurrences.merge(newer)
+                    self._pending[key] = occurrences
+            return 0
+
+    def _ensure_flusher(self):
+        # Started lazily so each forked worker gets its own thread
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="exception-count-flusher", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            close_old_connections()
+            self.flush()
+
+
+exception_tracker = ExceptionTracker(
+    tracebacks_per_hour=settings.LOGS_EXCEPTION_TRACEBACKS_PER_HOUR,
+    flush_interval=settings.LOGS_EXCEPTION_FLUSH_INTERVAL,
+)
@@ -1,21 +1,269 @@
+"""
+Queue-backed database log handler.
+
+emit() only formats the record and puts it on a bounded in-memory queue. A
+writer thread, started lazily in every worker process, takes records off
+the queue and stores them with one bulk_create per batch of `batch_size`
+records or `flush_interval` seconds, whichever comes first.
+
+When the writer falls behind and the queue fills up, `overflow` decides
+what happens to new records:
+
+- "drop": discard them
+- "sample": once the queue is half full, keep only `sample_rate` of the
+  records below WARNING, drop any record that still doesn't fit
+- "block": wait up to `block_timeout` seconds for room, then drop
+
+Dropped records are counted, and the writer stores a warning entry with the
+number dropped since the last one so losses show up in the log admin.
+Pending records are written by flush(), which logging calls at shutdown.
+
+Structured fields passed as `extra={"fields": {...}}`, plus the id of the
+request being served, are encoded to JSON once in emit() and inserted into
+the jsonb column as they are.
+"""
+
+import json
 import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import close_old_connections
+from django.db.models import Expression, JSONField
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # optional dependency, fall back to the stock encoder
+
+OVERFLOW_POLICIES = ("drop", "sample", "block")
+
+# Seconds flush() waits for the writer thread before writing on the caller's thread
+FLUSH_TIMEOUT = 5
 
-from django.utils import timezone
+
+def encode_fields(fields):
+    """JSON text of structured log fields, values JSON doesn't know are written as strings"""
+    if orjson is not None:
+        return orjson.dumps(fields, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(fields, default=str, ensure_ascii=False)
+
+
+class EncodedJSON(Expression):
+    """JSON text inserted into a jsonb column without being decoded and encoded again"""
+
+    def __init__(self, text):
+        super().__init__(output_field=JSONField())
+        self.text = text
+
+    def as_sql(self, compiler, connection):
+        return "%s::jsonb", [self.text]
+
+
+class _FlushRequest:
+    """Queue marker, set once every record queued before it is written"""
+
+    def __init__(self):
+        self.done = threading.Event()
 
 
 class DatabaseHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET, queue_size=10000, batch_size=500, flush_interval=2.0,
+                 overflow="drop", sample_rate=0.1, block_timeout=0.5):
+        super().__init__(level)
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.sample_rate = sample_rate
+        self.block_timeout = block_timeout
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._reported_dropped = 0
+        self._counter_lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def stats(self):
+        """Counters of this worker: records written, dropped on overflow, lost to failed writes, queued"""
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self._queue.qsize(),
+        }
+
     def emit(self, record):
         try:
-            from apps.logs.models import LogEntry
-
-            LogEntry.objects.create(
-                timestamp=timezone.now(),
-                level=record.levelname,
-                logger_name=record.name,
-                message=self.format(record),
-                pathname=record.pathname,
-                line_no=record.lineno,
-                exception=record.exc_info if record.exc_info else None,
-            )
+            self._ensure_writer()
+            if threading.current_thread() is self._thread:
+                # Logged while writing logs, queuing it could wait on itself
+                return
+            self._enqueue(self._entry(record), record.levelno)
         except Exception:
-            pass
+            self.handleError(record)
+
+    def _entry(self, record):
+        # Imported here: logging is configured before the apps are loaded
+        from apps.common.logging import get_request_id
+
+        # Formatted now: the record's arguments may change once the caller continues
+        message = self.format(record)
+        fields = getattr(record, "fields", None)
+        request_id = get_request_id()
+        if request_id is not None:
+            fields = {"request_id": request_id, **(fields or {})}
+        return {
+            "timestamp": datetime.fromtimestamp(record.created, tz=dt_timezone.utc),
+            "level": record.levelname,
+            "logger_name": record.name,
+            "message": message,
+            "pathname": record.pathname,
+            "line_no": record.lineno,
+            "exception": record.exc_text or None,
+            "fields": encode_fields(fields) if fields else None,
+        }
+
+    def _enqueue(self, entry, levelno):
+        if self.overflow == "sample" and levelno < logging.WARNING:
+            if self._queue.qsize() >= self.queue_size // 2 and random.random() >= self.sample_rate:
+                self._count_dropped()
+                return
+        try:
+            if self.overflow == "block":
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count_dropped()
+
+    def _count_dropped(self, amount=1):
+        with self._counter_lock:
+            self.dropped += amount
+
+    def _ensure_writer(self):
+        # Started lazily so each forked worker gets its own thread and queue,
+        # and again if the thread died
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Inherited from the parent, which writes those records itself
+                self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            flush_requests = []
+            try:
+                batch, flush_requests = self._collect()
+                self._write(batch)
+                close_old_connections()
+            except Exception:
+                # Never log from here: the records would come back to this handler
+                sys.stderr.write("[LOGS] Database log writer failed, continuing\n")
+                traceback.print_exc(file=sys.stderr)
+            finally:
+                for request in flush_requests:
+                    request.done.set()
+
+    def _collect(self):
+        """Wait for a batch: batch_size records or flush_interval seconds after the first one"""
+        batch, flush_requests = [], []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if isinstance(item, _FlushRequest):
+                flush_requests.append(item)
+                return batch, flush_requests
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, flush_requests
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return batch, flush_requests
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return batch, flush_requests
+
+    def _write(self, batch):
+        from apps.logs.models import LogEntry
+
+        with self._counter_lock:
+            dropped_total = self.dropped
+        dropped = dropped_total - self._reported_dropped
+        entries = [
+            LogEntry(**{**entry, "fields": EncodedJSON(entry["fields"]) if entry["fields"] else None})
+            for entry in batch
+        ]
+        if dropped:
+            entries.append(LogEntry(
+                timestamp=datetime.now(tz=dt_timezone.utc),
+                level="WARNING",
+                logger_name=__name__,
+                message=f"[LOGS] Dropped {dropped} log records, the database log queue was full",
+            ))
+        if not entries:
+            return
+        try:
+            LogEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+        except Exception:
+            # Never log from here: the records would come back to this handler
+            with self._counter_lock:
+                self.failed += len(batch)
+            return
+        with self._counter_lock:
+            self.written += len(batch)
+        # Reported once stored, a failed write reports them with the next batch
+        self._reported_dropped = dropped_total
+
+    def flush(self):
+        """Write all records queued so far"""
+        if self._pid != os.getpid():
+            # Nothing emitted in this process, queued records belong to the parent
+            return
+        if not self._thread.is_alive():
+            self._drain()
+            return
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=FLUSH_TIMEOUT)
+        except queue.Full:
+            return
+        request.done.wait(FLUSH_TIMEOUT)
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(item, _FlushRequest):
+                batch.append(item)
+        if batch:
+            self._write(batch)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            super().close()
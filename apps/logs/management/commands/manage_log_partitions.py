@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.logs.partitions import maintain_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the coming monthly log partitions and drop those past the retention period. '
+        'The legacy partition, all entries logged before partitioning, is dropped whole once '
+        'the month it ends with is past the retention period.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int, help='Full months to keep (default: LOGS_RETENTION_MONTHS)')
+        parser.add_argument('--ahead', type=int, help='Months to create ahead (default: LOGS_PARTITIONS_AHEAD)')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the partitions to create and drop')
+
+    def handle(self, *args, **options):
+        result = maintain_partitions(
+            retention_months=options['retention_months'],
+            ahead=options['ahead'],
+            dry_run=options['dry_run'],
+        )
+        prefix = 'Would ' if options['dry_run'] else ''
+        for name in result['created']:
+            self.stdout.write(f'{prefix}create {name}')
+        for name in result['dropped']:
+            self.stdout.write(f'{prefix}drop {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(result['created'])} partitions created, {len(result['dropped'])} dropped"
+            + (' (dry run)' if options['dry_run'] else '')
+        ))
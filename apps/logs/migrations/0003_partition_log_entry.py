@@ -0,0 +1,97 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:05
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# The existing table becomes the partition of everything up to the end of the current
+# month, so no rows are copied; monthly partitions follow (see apps.logs.partitions)
+PARTITION_SQL = """
+DO $$
+DECLARE
+    next_id bigint;
+    boundary timestamptz := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + interval '1 month';
+BEGIN
+    ALTER TABLE "Log_entry" RENAME TO "Log_entry_legacy";
+    SELECT COALESCE(MAX("id"), 0) + 1 INTO next_id FROM "Log_entry_legacy";
+    ALTER TABLE "Log_entry_legacy" ALTER COLUMN "id" DROP IDENTITY IF EXISTS;
+    ALTER TABLE "Log_entry_legacy" DROP CONSTRAINT "Log_entry_pkey";
+
+    CREATE SEQUENCE "Log_entry_id_seq";
+    PERFORM setval('"Log_entry_id_seq"', next_id, false);
+    CREATE TABLE "Log_entry" (
+        "id" bigint NOT NULL DEFAULT nextval('"Log_entry_id_seq"'),
+        "timestamp" timestamp with time zone NOT NULL,
+        "level" varchar(30) NOT NULL,
+        "logger_name" varchar(255) NOT NULL,
+        "message" text NOT NULL,
+        "pathname" varchar(500) NULL,
+        "line_no" integer NULL,
+        "exception" text NULL,
+        PRIMARY KEY ("id", "timestamp")
+    ) PARTITION BY RANGE ("timestamp");
+    ALTER SEQUENCE "Log_entry_id_seq" OWNED BY "Log_entry"."id";
+
+    -- A valid CHECK constraint spares ATTACH from scanning the table again
+    EXECUTE format('ALTER TABLE "Log_entry_legacy" ADD CONSTRAINT "Log_entry_legacy_range" CHECK ("timestamp" < %L)', boundary);
+    EXECUTE format('ALTER TABLE "Log_entry" ATTACH PARTITION "Log_entry_legacy" FOR VALUES FROM (MINVALUE) TO (%L)', boundary);
+    ALTER TABLE "Log_entry_legacy" DROP CONSTRAINT "Log_entry_legacy_range";
+
+    FOR i IN 0..1 LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF "Log_entry" FOR VALUES FROM (%L) TO (%L)',
+            'Log_entry_p' || to_char((boundary + i * interval '1 month') AT TIME ZONE 'UTC', 'YYYYMM'),
+            boundary + i * interval '1 month',
+            boundary + (i + 1) * interval '1 month'
+        );
+    END LOOP;
+    CREATE TABLE "Log_entry_default" PARTITION OF "Log_entry" DEFAULT;
+END $$;
+"""
+
+UNPARTITION_SQL = """
+CREATE TABLE "Log_entry_plain" (
+    "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    "timestamp" timestamp with time zone NOT NULL,
+    "level" varchar(30) NOT NULL,
+    "logger_name" varchar(255) NOT NULL,
+    "message" text NOT NULL,
+    "pathname" varchar(500) NULL,
+    "line_no" integer NULL,
+    "exception" text NULL
+);
+INSERT INTO "Log_entry_plain" SELECT "id", "timestamp", "level", "logger_name", "message", "pathname", "line_no", "exception" FROM "Log_entry";
+SELECT setval(pg_get_serial_sequence('"Log_entry_plain"', 'id'), COALESCE(MAX("id"), 0) + 1, false) FROM "Log_entry_plain";
+DROP TABLE "Log_entry";
+ALTER TABLE "Log_entry_plain" RENAME TO "Log_entry";
+ALTER TABLE "Log_entry" RENAME CONSTRAINT "Log_entry_plain_pkey" TO "Log_entry_pkey";
+ALTER SEQUENCE "Log_entry_plain_id_seq" RENAME TO "Log_entry_id_seq";
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0002_alter_logentry_timestamp'),
+    ]
+
+    operations = [
+        migrations.RunSQL("CREATE EXTENSION IF NOT EXISTS pg_trgm", migrations.RunSQL.noop),
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['timestamp', 'id'], name='logs_entry_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['level', 'timestamp'], name='logs_entry_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['logger_name', 'timestamp'], name='logs_entry_logger_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('message'), name='gin_trgm_ops'), name='logs_entry_message_trgm'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0003_partition_log_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logentry',
+            name='fields',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['fields'], name='logs_entry_fields_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
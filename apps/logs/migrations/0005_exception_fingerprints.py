@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0004_logentry_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExceptionFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('exception_type', models.CharField(max_length=255)),
+                ('view_name', models.CharField(max_length=255)),
+                ('frames', models.TextField(blank=True)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('message', models.TextField(blank=True)),
+                ('path', models.CharField(blank=True, max_length=500)),
+                ('count', models.BigIntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Exception Fingerprint',
+                'verbose_name_plural': 'Exception Fingerprints',
+                'db_table': 'Exception_fingerprint',
+            },
+        ),
+        migrations.CreateModel(
+            name='ExceptionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_counts', to='logs.exceptionfingerprint')),
+            ],
+            options={
+                'verbose_name': 'Exception Count',
+                'verbose_name_plural': 'Exception Counts',
+                'db_table': 'Exception_count',
+                'indexes': [models.Index(fields=['hour'], name='exception_count_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fingerprint', 'hour'), name='exception_count_unique')],
+            },
+        ),
+    ]
@@ -1,14 +1,22 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 
 class LogEntry(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # The table is partitioned by month of timestamp (see apps.logs.partitions), its
+    # primary key is (id, timestamp) and ids come from one sequence shared by all months
+    # Time the record was logged, set by the handler since entries are written in batches
+    timestamp = models.DateTimeField(default=timezone.now)
     level = models.CharField(max_length=30)
     logger_name = models.CharField(max_length=255)
     message = models.TextField()
     pathname = models.CharField(max_length=500, null=True, blank=True)
     line_no = models.IntegerField(null=True, blank=True)
     exception = models.TextField(null=True, blank=True)
+    # Structured fields of the record (action, model, object_id, user_id, request_id, ...)
+    fields = models.JSONField(null=True, blank=True)
 
     def __str__(self):
         return f"[{self.level}] {self.logger_name}: {self.message[:50]}"
@@ -17,3 +25,58 @@ class LogEntry(models.Model):
         db_table = "Log_entry"
         verbose_name = "Log Entry"
         verbose_name_plural = "Log Entries"
+        indexes = [
+            models.Index(fields=["timestamp", "id"], name="logs_entry_timestamp_idx"),
+            models.Index(fields=["level", "timestamp"], name="logs_entry_level_idx"),
+            models.Index(fields=["logger_name", "timestamp"], name="logs_entry_logger_idx"),
+            # Containment lookups on the structured fields, e.g. fields__contains={"object_id": 123}
+            GinIndex(fields=["fields"], opclasses=["jsonb_path_ops"], name="logs_entry_fields_gin"),
+            # Admin message search, icontains compares UPPER(message)
+            GinIndex(OpClass(Upper("message"), name="gin_trgm_ops"), name="logs_entry_message_trgm"),
+        ]
+
+
+class ExceptionFingerprint(models.Model):
+    """Exceptions of one kind: same type, raised in the same view through the same code path"""
+    fingerprint = models.CharField(max_length=40, unique=True)
+    exception_type = models.CharField(max_length=255)
+    view_name = models.CharField(max_length=255)
+    # Normalized stack, one "module path:function" per line
+    frames = models.TextField(blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Latest occurrence
+    message = models.TextField(blank=True)
+    path = models.CharField(max_length=500, blank=True)
+    count = models.BigIntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.exception_type} in {self.view_name} ({self.count})"
+
+    class Meta:
+        db_table = "Exception_fingerprint"
+        verbose_name = "Exception Fingerprint"
+        verbose_name_plural = "Exception Fingerprints"
+
+
+class ExceptionCount(models.Model):
+    """Occurrences of one exception fingerprint during one hour"""
+    fingerprint = models.ForeignKey(ExceptionFingerprint, on_delete=models.CASCADE, related_name="hourly_counts")
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.fingerprint_id} @ {self.hour:%Y-%m-%d %H:00}: {self.count}"
+
+    class Meta:
+        db_table = "Exception_count"
+        verbose_name = "Exception Count"
+        verbose_name_plural = "Exception Counts"
+        constraints = [
+            models.UniqueConstraint(fields=["fingerprint", "hour"], name="exception_count_unique"),
+        ]
+        indexes = [
+            # Counts of the recent hours for the summary
+            models.Index(fields=["hour"], name="exception_count_hour_idx"),
+        ]
@@ -0,0 +1,160 @@
+"""
+Monthly range partitions of the Log_entry table.
+
+Log entries are partitioned by the month (UTC) of their timestamp, see
+migration 0003: "Log_entry_pYYYYMM" holds one month, "Log_entry_legacy" the
+entries logged before partitioning and "Log_entry_default" whatever falls
+outside the created ranges. Every partition carries the indexes declared on
+the parent.
+
+maintain_partitions() creates the partitions of the coming months ahead of
+time, so entries don't pile up in the default partition, and drops the
+partitions past the retention period. Dropping a partition frees its space
+at once, where a DELETE would leave dead rows for vacuum to clean up.
+"""
+
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+TABLE = "Log_entry"
+LEGACY_PARTITION = f"{TABLE}_legacy"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _starts_at(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def list_partitions():
+    """[(name, upper bound or None)] of the partitions, None for the default partition and open ranges"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            ORDER BY child.relname
+            """,
+            [f'"{TABLE}"'],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _UPPER_BOUND.search(bound)
+        partitions.append((name, datetime.fromisoformat(match.group(1)) if match else None))
+    return partitions
+
+
+def partition_months(today=None):
+    """First days of the months with their own partition, up to this month, newest first"""
+    current = month_start(today or timezone.now().date())
+    months = []
+    for name, upper in list_partitions():
+        if name.startswith(f"{TABLE}_p") and upper is not None:
+            month = add_months(upper.date(), -1)
+            if month <= current:
+                months.append(month)
+    return sorted(months, reverse=True)
+
+
+def legacy_partition_end():
+    """End of the legacy partition, None once it is dropped"""
+    return dict(list_partitions()).get(LEGACY_PARTITION)
+
+
+def month_bounds(month):
+    """[start, end) timestamps of a month, the range of its partition"""
+    return _starts_at(month), _starts_at(add_months(month, 1))
+
+
+def create_partition(month):
+    """Create the partition of a month, moving its entries out of the default partition"""
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Attaching a range the default partition has rows for fails, those rows move first
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE "timestamp" >= %s AND "timestamp" < %s '
+            f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return name
+
+
+def maintain_partitions(retention_months=None, ahead=None, today=None, dry_run=False):
+    """
+    Create the partitions of this month and the `ahead` next ones, drop those
+    older than `retention_months` full months.
+
+    The legacy partition holds every entry logged before partitioning and is
+    dropped whole, once the month it ends with is past the retention period.
+
+    Returns {"created": [names], "dropped": [names]}.
+    """
+    retention_months = settings.LOGS_RETENTION_MONTHS if retention_months is None else retention_months
+    ahead = settings.LOGS_PARTITIONS_AHEAD if ahead is None else ahead
+    current = month_start(today or timezone.now().date())
+
+    partitions = list_partitions()
+    existing = {name for name, _ in partitions}
+    legacy_end = dict(partitions).get(LEGACY_PARTITION)
+
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        # The legacy partition runs to the end of the month the table was partitioned in
+        if name in existing or (legacy_end is not None and _starts_at(month) < legacy_end):
+            continue
+        if not dry_run:
+            create_partition(month)
+        created.append(name)
+
+    dropped = []
+    cutoff = _starts_at(add_months(current, -retention_months))
+    for name, upper in partitions:
+        if upper is not None and upper <= cutoff:
+            if not dry_run:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE "{name}"')
+            dropped.append(name)
+
+    return {"created": created, "dropped": dropped}
+
+
+def estimated_count():
+    """Row count estimate of all partitions from the planner statistics"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(GREATEST(child.reltuples, 0)), 0)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [f'"{TABLE}"'],
+        )
+        return int(cursor.fetchone()[0])
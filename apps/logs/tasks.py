@@ -0,0 +1,15 @@
+import logging
+
+from celery import shared_task
+
+from apps.logs.partitions import maintain_partitions
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def maintain_log_partitions_task():
+    """Periodic job (daily): create the coming log partitions, drop the expired ones"""
+    result = maintain_partitions()
+    logger.info("[LOGS] Partitions created: %s, dropped: %s", result["created"], result["dropped"])
+    return result
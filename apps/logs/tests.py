@@ -1,3 +1,402 @@
-from django.test import TestCase
+import logging
+import threading
+from unittest import mock
+from datetime import date, datetime, timezone as dt_timezone
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.exceptions import custom_exception_handler
+
+from apps.common.logging import AdminLogger, format_admin_action, request_id_var
+from apps.logs.fingerprints import exception_tracker
+from apps.logs.handlers import DatabaseHandler
+from apps.logs.models import ExceptionCount, ExceptionFingerprint, LogEntry
+from apps.logs.partitions import (
+    LEGACY_PARTITION, create_partition, list_partitions, maintain_partitions, partition_months,
+)
+
+
+class DatabaseHandlerTests(TransactionTestCase):
+    """Records are queued by emit and written in batches by the writer thread"""
+
+    def make_logger(self, **options):
+        handler = DatabaseHandler(**options)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.addCleanup(handler.close)
+        test_logger = logging.getLogger(f"apps.logs.tests.{self._testMethodName}")
+        test_logger.propagate = False
+        test_logger.setLevel(logging.INFO)
+        test_logger.addHandler(handler)
+        self.addCleanup(test_logger.removeHandler, handler)
+        return test_logger, handler
+
+    def test_records_are_written_in_batches(self):
+        test_logger, handler = self.make_logger(batch_size=10, flush_interval=60)
+        for number in range(25):
+            test_logger.info("record %s", number)
+        handler.flush()
+
+        messages = list(LogEntry.objects.order_by("timestamp", "id").values_list("message", flat=True))
+        self.assertEqual(messages, [f"record {number}" for number in range(25)])
+        self.assertEqual(handler.stats()["written"], 25)
+        self.assertEqual(handler.stats()["queued"], 0)
+
+    def test_emit_does_not_wait_for_the_database(self):
+        test_logger, handler = self.make_logger(flush_interval=60)
+        test_logger.info("queued")
+
+        self.assertFalse(LogEntry.objects.filter(message="queued").exists())
+        handler.flush()
+        self.assertTrue(LogEntry.objects.filter(message="queued").exists())
+
+    def test_timestamp_is_the_time_of_the_record(self):
+        test_logger, handler = self.make_logger(flush_interval=60)
+        test_logger.info("timed")
+        record_time = LogEntry(message="").timestamp
+        handler.flush()
+
+        self.assertLessEqual(LogEntry.objects.get(message="timed").timestamp, record_time)
+
+    def test_full_queue_drops_and_reports(self):
+        test_logger, handler = self.make_logger(queue_size=5, flush_interval=60, overflow="drop")
+        writing = threading.Event()
+        release = threading.Event()
+        write = handler._write
+
+        def slow_write(batch):
+            writing.set()
+            release.wait(5)
+            write(batch)
+
+        handler._write = slow_write
+        test_logger.info("first")
+        writing.wait(5)
+        for number in range(10):
+            test_logger.info("record %s", number)
+        release.set()
+        handler.flush()
+
+        self.assertEqual(handler.stats()["dropped"], 5)
+        self.assertEqual(handler.stats()["written"], 6)
+        self.assertTrue(LogEntry.objects.filter(level="WARNING", message__contains="Dropped 5 log records").exists())
+
+    def test_dropped_records_are_reported_after_a_failed_write(self):
+        test_logger, handler = self.make_logger(flush_interval=60)
+        handler.dropped = 3
+        bulk_create = LogEntry.objects.bulk_create
+        failures = [RuntimeError("database is down")]
+
+        def failing_once(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(LogEntry.objects, "bulk_create", side_effect=failing_once):
+            test_logger.info("lost")
+            handler.flush()
+            test_logger.info("stored")
+            handler.flush()
+
+        self.assertEqual(handler.stats()["failed"], 1)
+        self.assertTrue(LogEntry.objects.filter(message="stored").exists())
+        self.assertTrue(LogEntry.objects.filter(message__contains="Dropped 3 log records").exists())
+
+    def test_writer_survives_errors(self):
+        test_logger, handler = self.make_logger(flush_interval=60)
+        with mock.patch("apps.logs.handlers.close_old_connections", side_effect=[RuntimeError("boom"), None]), \
+                mock.patch("sys.stderr") as stderr:
+            test_logger.info("first")
+            handler.flush()
+            test_logger.info("second")
+            handler.flush()
+
+        self.assertTrue(handler._thread.is_alive())
+        self.assertEqual(handler.stats()["written"], 2)
+        self.assertTrue(stderr.write.called)
+
+    def test_dead_writer_is_restarted(self):
+        test_logger, handler = self.make_logger(flush_interval=60)
+        test_logger.info("first")
+        handler.flush()
+        dead = threading.Thread(target=lambda: None)
+        dead.start()
+        dead.join()
+        handler._thread = dead
+
+        test_logger.info("second")
+        handler.flush()
+        self.assertIsNot(handler._thread, dead)
+        self.assertTrue(LogEntry.objects.filter(message="second").exists())
+
+    def test_sample_policy_keeps_warnings(self):
+        test_logger, handler = self.make_logger(queue_size=10, flush_interval=60, overflow="sample", sample_rate=0)
+        release = threading.Event()
+        write = handler._write
+        handler._write = lambda batch: (release.wait(5), write(batch))
+
+        test_logger.info("first")
+        for number in range(5):
+            test_logger.info("info %s", number)
+        test_logger.warning("warning")
+        release.set()
+        handler.flush()
+
+        self.assertTrue(LogEntry.objects.filter(message="warning").exists())
+        self.assertGreater(handler.stats()["dropped"], 0)
+
+    def test_structured_fields_are_stored(self):
+        test_logger, handler = self.make_logger(flush_interval=60)
+        token = request_id_var.set('req-1')
+        try:
+            test_logger.info('saved', extra={'fields': {'action': 'UPDATED', 'object_id': 123, 'latency_ms': 4.5}})
+        finally:
+            request_id_var.reset(token)
+        test_logger.info('plain')
+        handler.flush()
+
+        entry = LogEntry.objects.get(fields__contains={'object_id': 123})
+        self.assertEqual(entry.fields, {'request_id': 'req-1', 'action': 'UPDATED', 'object_id': 123, 'latency_ms': 4.5})
+        self.assertIsNone(LogEntry.objects.get(message='plain').fields)
+
+    def test_unknown_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            DatabaseHandler(overflow="spill")
+
+
+class LogPartitionTests(TestCase):
+    """Monthly partitions are created ahead and dropped whole past the retention period"""
+
+    def partition_of(self, entry):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM "Log_entry" WHERE id = %s', [entry.pk])
+            return cursor.fetchone()[0].strip('"')
+
+    def entry(self, timestamp):
+        return LogEntry.objects.create(timestamp=timestamp, level='INFO', logger_name='test', message='entry')
+
+    def test_creates_partitions_ahead(self):
+        result = maintain_partitions(retention_months=1200, ahead=2, today=date(2100, 1, 15))
+
+        self.assertEqual(result, {'created': ['Log_entry_p210001', 'Log_entry_p210002', 'Log_entry_p210003'],
+                                  'dropped': []})
+        entry = self.entry(datetime(2100, 2, 28, 23, 59, tzinfo=dt_timezone.utc))
+        self.assertEqual(self.partition_of(entry), 'Log_entry_p210002')
+        self.assertEqual(maintain_partitions(retention_months=1200, ahead=2, today=date(2100, 1, 15))['created'], [])
+
+    def test_drops_expired_partitions(self):
+        old = self.entry(datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+        maintain_partitions(retention_months=1200, ahead=0, today=date(2100, 1, 1))
+
+        result = maintain_partitions(retention_months=6, ahead=0, today=date(2100, 1, 1))
+
+        self.assertIn(LEGACY_PARTITION, result['dropped'])
+        self.assertNotIn('Log_entry_p210001', result['dropped'])
+        self.assertFalse(LogEntry.objects.filter(pk=old.pk).exists())
+        self.assertIn('Log_entry_p210001', [name for name, _ in list_partitions()])
+
+    def test_dry_run_changes_nothing(self):
+        before = list_partitions()
+        result = maintain_partitions(retention_months=0, ahead=1, today=date(2100, 1, 1), dry_run=True)
+
+        self.assertTrue(result['created'])
+        self.assertTrue(result['dropped'])
+        self.assertEqual(list_partitions(), before)
+
+    def test_new_partition_takes_rows_from_default(self):
+        entry = self.entry(datetime(2200, 5, 3, tzinfo=dt_timezone.utc))
+        self.assertEqual(self.partition_of(entry), 'Log_entry_default')
+
+        create_partition(date(2200, 5, 1))
+
+        self.assertEqual(self.partition_of(entry), 'Log_entry_p220005')
+
+    def test_admin_changelist_and_search(self):
+        self.entry(datetime.now(tz=dt_timezone.utc))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        response = self.client.get(reverse('admin:logs_logentry_changelist'), {'q': 'entr'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'entry')
+
+
+    def test_admin_month_filter_lists_partitions(self):
+        create_partition(date(2100, 1, 1))
+        january = self.entry(datetime(2100, 1, 31, 23, 59, tzinfo=dt_timezone.utc))
+        self.entry(datetime(2100, 2, 1, tzinfo=dt_timezone.utc))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        self.assertEqual(partition_months(today=date(2100, 2, 15))[0], date(2100, 1, 1))
+        response = self.client.get(reverse('admin:logs_logentry_changelist'), {'month': '2100-01'})
+
+        self.assertEqual(list(response.context['cl'].result_list), [january])
+        self.assertContains(response, 'Before partitioning')
+
+
+class StructuredLoggingTests(TestCase):
+    """Admin actions are logged as typed fields and formatted when displayed"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            'editor', 'editor@example.com', 'password', first_name='Ed', last_name='Editor'
+        )
+
+    def log_post_update(self):
+        post = mock.Mock(pk=123, title='Title', slug='title', status='published', published_at=None)
+        return AdminLogger.log_action('UPDATED', 'Post', post, self.user, changes={'status': ('draft', 'published')})
+
+    def test_log_action_passes_fields(self):
+        with self.assertLogs('django', level='INFO') as logs:
+            message = self.log_post_update()
+
+        record = logs.records[0]
+        self.assertEqual(message, '[UPDATED] UPDATED | Post #123 by Ed Editor')
+        self.assertEqual(record.fields['object_id'], 123)
+        self.assertEqual(record.fields['user_id'], self.user.pk)
+        self.assertEqual(record.fields['changes'], {'status': ['draft', 'published']})
+
+    def test_banner_formatted_from_fields_matches_text_mode(self):
+        timestamp = datetime(2026, 10, 17, 12, 30, tzinfo=dt_timezone.utc)
+        with self.assertLogs('django', level='INFO') as logs:
+            self.log_post_update()
+            with override_settings(LOGS_STRUCTURED=False), mock.patch('django.utils.timezone.now', return_value=timestamp):
+                text = self.log_post_update()
+
+        self.assertEqual(format_admin_action(logs.records[0].fields, timestamp), text)
+        self.assertIn('      New: published', text)
+
+    def test_request_id_header(self):
+        response = self.client.get('/', HTTP_X_REQUEST_ID='abc-123')
+        self.assertEqual(response['X-Request-ID'], 'abc-123')
+
+        response = self.client.get('/', HTTP_X_REQUEST_ID='not valid!')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_admin_searches_fields(self):
+        LogEntry.objects.create(level='INFO', logger_name='django', message='post saved',
+                                fields={'action': 'UPDATED', 'model': 'Post', 'object_id': 123, 'user': 'Ed',
+                                        'email': 'editor@example.com'})
+        LogEntry.objects.create(level='INFO', logger_name='django', message='other post saved',
+                                fields={'action': 'UPDATED', 'model': 'Post', 'object_id': 124})
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('admin:logs_logentry_changelist'), {'q': 'model:Post object_id:123'})
+
+        self.assertEqual(list(response.context['cl'].result_list.values_list('message', flat=True)), ['post saved'])
+
+    def search_messages(self, query):
+        response = self.client.get(reverse('admin:logs_logentry_changelist'), {'q': query})
+        return sorted(response.context['cl'].result_list.values_list('message', flat=True))
+
+    def test_admin_searches_urls_and_times_as_text(self):
+        LogEntry.objects.create(level='INFO', logger_name='django', message='fetched https://example.com at 12:30')
+        LogEntry.objects.create(level='INFO', logger_name='django', message='fetched other')
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.search_messages('https://example.com'), ['fetched https://example.com at 12:30'])
+        self.assertEqual(self.search_messages('12:30'), ['fetched https://example.com at 12:30'])
+
+    def test_admin_matches_zero_padded_and_numeric_ids(self):
+        LogEntry.objects.create(level='INFO', logger_name='django', message='padded', fields={'order_id': '00123'})
+        LogEntry.objects.create(level='INFO', logger_name='django', message='text', fields={'order_id': '123'})
+        LogEntry.objects.create(level='INFO', logger_name='django', message='number', fields={'order_id': 123})
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.search_messages('order_id:00123'), ['padded'])
+        self.assertEqual(self.search_messages('order_id:123'), ['number', 'text'])
+
+
+def raise_error(message):
+    raise RuntimeError(message)
+
+
+class ExceptionFingerprintTests(TestCase):
+    """Exceptions are counted per fingerprint, only the first ones per hour are logged"""
+
+    def setUp(self):
+        self.reset_tracker()
+        self.addCleanup(self.reset_tracker)
+        patcher = mock.patch.object(exception_tracker, 'tracebacks_per_hour', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def reset_tracker():
+        # Counts of other tests would be flushed into this test's transaction
+        exception_tracker._pending = {}
+        exception_tracker._logged = {}
+
+    def handle(self, message, view_name='BrokenView'):
+        view = type(view_name, (), {})()
+        try:
+            raise_error(message)
+        except RuntimeError as exc:
+            return custom_exception_handler(exc, {'view': view, 'request': None})
+
+    def test_same_code_path_shares_a_fingerprint(self):
+        with self.assertLogs('core.exceptions', level='ERROR') as logs:
+            self.handle('first')
+            self.handle('second, different message')
+            self.handle('other view', view_name='OtherView')
+
+        fingerprints = [record.fields['fingerprint'] for record in logs.records]
+        self.assertEqual(fingerprints[0], fingerprints[1])
+        self.assertNotEqual(fingerprints[0], fingerprints[2])
+
+    def test_server_errors_log_tracebacks_of_first_occurrences_only(self):
+        with self.assertLogs('core.exceptions', level='ERROR') as logs:
+            for number in range(5):
+                self.handle(f'failure {number}')
+        exception_tracker.flush()
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('Traceback', logs.records[0].getMessage())
+        self.assertIn('raise_error', logs.records[0].getMessage())
+        fingerprint = ExceptionFingerprint.objects.get(fingerprint=logs.records[0].fields['fingerprint'])
+        self.assertEqual(fingerprint.count, 5)
+        self.assertEqual(fingerprint.exception_type, 'builtins.RuntimeError')
+        self.assertEqual(fingerprint.message, 'failure 4')
+        self.assertEqual(ExceptionCount.objects.get(fingerprint=fingerprint).count, 5)
+
+    def test_client_errors_are_counted_without_traceback(self):
+        with self.assertLogs('core.exceptions', level='WARNING') as logs:
+            for _ in range(4):
+                response = self.client.get('/api/posts/missing-post/')
+        exception_tracker.flush()
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(logs.records), 2)
+        self.assertNotIn('Traceback', logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].fields['status'], 404)
+        fingerprint = ExceptionFingerprint.objects.get(fingerprint=logs.records[0].fields['fingerprint'])
+        self.assertEqual((fingerprint.count, fingerprint.status_code, fingerprint.view_name), (4, 404, 'PostViewSet'))
+
+    def test_counts_accumulate_across_flushes(self):
+        with self.assertLogs('core.exceptions', level='ERROR'):
+            self.handle('once')
+            exception_tracker.flush()
+            self.handle('twice')
+            exception_tracker.flush()
+
+        self.assertEqual(ExceptionFingerprint.objects.get().count, 2)
+        self.assertEqual(ExceptionCount.objects.get().count, 2)
+
+    def test_summary_orders_by_recent_occurrences(self):
+        with self.assertLogs('core.exceptions', level='ERROR'):
+            self.handle('rare', view_name='RareView')
+            for _ in range(3):
+                self.handle('frequent', view_name='FrequentView')
+        exception_tracker.flush()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        response = self.client.get(reverse('admin:logs_exceptionfingerprint_changelist'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item.view_name, item.recent_count) for item in response.context['cl'].result_list],
+            [('FrequentView', 3), ('RareView', 1)],
+        )
+        self.assertContains(response, '0.1/h')
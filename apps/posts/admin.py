@@ -1,10 +1,13 @@
-from django.contrib import admin
-from django.utils.html import format_html
+from django.contrib import admin, messages
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
 from unfold.admin import ModelAdmin
 from unfold.decorators import display
 
 from apps.posts.models import Post, PostCategory
+from apps.posts.service import invalidate_post_cache
+from apps.posts.service.duplicates import find_duplicates
 from apps.common.logging import AdminLogger, compare_model_fields
 
 
@@ -318,6 +321,27 @@ class PostAdmin(ModelAdmin):
                 extra_info='New post created and ready for editing',
             )
         super().save_model(request, obj, form, change)
+        invalidate_post_cache()
+        self.warn_about_duplicates(request, obj)
+
+    def warn_about_duplicates(self, request, obj):
+        """Point editors at existing posts with nearly the same text"""
+        duplicates = find_duplicates(obj)
+        if not duplicates:
+            return
+        links = format_html_join(
+            ', ',
+            '<a href="{}">{}</a> ({}%)',
+            (
+                (reverse('admin:posts_post_change', args=[post.pk]), post.title_uz, round(score * 100))
+                for post, score in duplicates
+            ),
+        )
+        self.message_user(
+            request,
+            format_html('⚠️ This post looks like a near duplicate of: {}', links),
+            level=messages.WARNING,
+        )
 
     def delete_model(self, request, obj):
         """Log post deletion"""
@@ -341,6 +365,7 @@ class PostAdmin(ModelAdmin):
             query_description=f'Bulk deleted {count} posts',
         )
         super().delete_queryset(request, queryset)
+        invalidate_post_cache()
 
 
 admin.site.register(PostCategory, PostCategoryAdmin)
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'apps.posts'
+
+    def ready(self):
+        from apps.posts import signals  # noqa: F401
+        from apps.posts.search import search_backend
+
+        search_backend.warm_up()
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.posts.models import Post
+from apps.posts.service.duplicates import backfill_signatures, missing_signatures
+
+
+class Command(BaseCommand):
+    help = 'Compute the MinHash signatures used for near-duplicate detection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Only posts that have no signature yet',
+        )
+
+    def handle(self, *args, **options):
+        queryset = missing_signatures() if options['missing'] else Post.objects.all()
+        start = time.perf_counter()
+        stored = backfill_signatures(queryset)
+        self.stdout.write(
+            self.style.SUCCESS(f'Stored signatures for {stored} posts in {time.perf_counter() - start:.1f}s')
+        )
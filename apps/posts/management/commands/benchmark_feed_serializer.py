@@ -0,0 +1,59 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.posts.models import Post
+from apps.posts.serializers import FEED_VALUES, PostFeedSerializer, PostListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare PostListSerializer with the fast PostFeedSerializer on a page of posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Posts per page')
+        parser.add_argument('--iterations', type=int, default=200, help='Serializations per serializer')
+        parser.add_argument('--lang', default='ru', help='Requested language')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        iterations = options['iterations']
+        request = Request(APIRequestFactory().get('/api/posts/', {'lang': options['lang']}))
+
+        queryset = Post.objects.filter(
+            status=Post.Status.PUBLISHED
+        ).select_related('category').order_by('-published_at', '-created_at')
+
+        instances = list(queryset[:rows])
+        values = list(queryset.for_list(options['lang']).values(*FEED_VALUES)[:rows])
+        if not instances:
+            self.stdout.write(self.style.WARNING('No published posts, run seed_sample_posts first'))
+            return
+
+        def run_list_serializer():
+            return PostListSerializer(instances, many=True, context={'request': request}).data
+
+        def run_feed_serializer():
+            return PostFeedSerializer(request).serialize(values)
+
+        if json.dumps(run_list_serializer()) != json.dumps(run_feed_serializer()):
+            self.stdout.write(self.style.ERROR('Output differs between serializers'))
+            return
+
+        list_time = self._measure(run_list_serializer, iterations)
+        feed_time = self._measure(run_feed_serializer, iterations)
+
+        self.stdout.write(f'Page size: {len(instances)} posts, {iterations} iterations')
+        self.stdout.write(f'PostListSerializer: {list_time * 1000:.3f} ms/page')
+        self.stdout.write(f'PostFeedSerializer: {feed_time * 1000:.3f} ms/page')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {list_time / feed_time:.1f}x'))
+
+    @staticmethod
+    def _measure(func, iterations):
+        func()  # warm up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.posts.service.related import update_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Compute related posts of posts changed since the last run, or of all posts with --full'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Refit the vocabulary and rebuild related posts of every published post')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = update_related_posts(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Related posts updated for {count} posts in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.posts.service.search_cache import bump_search_version
+from apps.posts.service.semantic import DEFAULT_DIMENSIONS, build_index, index_dir
+
+
+class Command(BaseCommand):
+    help = 'Build the semantic search index (LSA vectors) of all published posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dimensions', type=int, default=DEFAULT_DIMENSIONS, help='Vector dimensions')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = build_index(options['dimensions'])
+        if not count:
+            self.stdout.write(self.style.WARNING('Not enough published posts to build the index'))
+            return
+        bump_search_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} posts into {index_dir()} in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.service.view_counter import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Apply buffered post view counts to the database'
+
+    def handle(self, *args, **options):
+        flushed = view_counter.flush()
+        self.stdout.write(
+            self.style.SUCCESS(f'Flushed view counts for {flushed} posts')
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.service.feed_index import RedisFeedIndex, feed_index
+
+
+class Command(BaseCommand):
+    help = 'Reload the Redis feed index from the database'
+
+    def handle(self, *args, **options):
+        if not isinstance(feed_index.backend, RedisFeedIndex):
+            self.stdout.write(self.style.WARNING(
+                'Feed index is disabled, feeds are read from the database'
+            ))
+            return
+
+        feed_index.backend.load()
+        self.stdout.write(self.style.SUCCESS('Feed index reloaded'))
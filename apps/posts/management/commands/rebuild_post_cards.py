@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.models import Post
+from apps.posts.service import bump_content_version
+from apps.posts.service.cards import missing_cards, rebuild_cards
+
+
+class Command(BaseCommand):
+    help = 'Render the pre-rendered list cards of posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Only posts that have no card yet',
+        )
+
+    def handle(self, *args, **options):
+        queryset = missing_cards() if options['missing'] else Post.objects.all()
+        rebuilt = rebuild_cards(queryset)
+        bump_content_version()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt cards for {rebuilt} posts')
+        )
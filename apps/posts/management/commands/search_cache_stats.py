@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.service.search_cache import (
+    popular_queries,
+    prewarm_search_cache,
+    reset_search_cache_stats,
+    search_cache_stats,
+)
+
+
+class Command(BaseCommand):
+    help = 'Show search cache hit rate, saved search time and the most popular queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Popular queries to list')
+        parser.add_argument('--prewarm', action='store_true', help='Search the popular queries to fill the cache')
+        parser.add_argument('--reset', action='store_true', help='Reset the hit/miss statistics')
+
+    def handle(self, *args, **options):
+        stats = search_cache_stats()
+        self.stdout.write(f"Hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {stats['hit_rate']:.1%}")
+        self.stdout.write(f"Search time saved by hits: {stats['saved_seconds']:.1f}s")
+
+        # In-process counters only know this process' queries, Redis ones all of them
+        for item, count in popular_queries.top(options['top']):
+            self.stdout.write(f'{count:>8}  {item}')
+
+        if options['prewarm']:
+            warmed = prewarm_search_cache(options['top'])
+            self.stdout.write(self.style.SUCCESS(f'Pre-warmed {warmed} queries'))
+        if options['reset']:
+            reset_search_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Statistics reset'))
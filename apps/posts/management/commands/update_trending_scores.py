@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.service.trending import update_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending scores from the hourly view buckets and prune old buckets'
+
+    def handle(self, *args, **options):
+        counts = update_trending_scores()
+        for window, count in counts.items():
+            self.stdout.write(f'{window}: {count} posts')
+        self.stdout.write(self.style.SUCCESS('Trending scores updated'))
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def _vector_sql(lang, config):
+    parts = [
+        f"setweight(to_tsvector('{config}', coalesce({field}_{lang}, '')), '{weight}')"
+        for field, weight in (("title", "A"), ("short_description", "B"), ("content", "C"))
+    ]
+    return f"search_vector_{lang} = " + " || ".join(parts)
+
+
+BACKFILL_SQL = 'UPDATE "Posts" SET ' + ", ".join([
+    _vector_sql("uz", "simple"),
+    _vector_sql("ru", "russian"),
+    _vector_sql("en", "english"),
+])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_remove_post_content_remove_post_short_description_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector_en',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector_ru',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector_uz',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector_uz'], name='posts_search_uz_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector_ru'], name='posts_search_ru_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector_en'], name='posts_search_en_gin'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:06
+
+import re
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# Frozen copy of apps.common.utils.text.normalize_script as of this migration,
+# later changes to it must not change what this migration writes
+
+_TRANSLITERATION = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "ғ": "g", "д": "d", "е": "e",
+    "ё": "yo", "ж": "j", "з": "z", "и": "i", "й": "y", "к": "k", "қ": "q",
+    "л": "l", "м": "m", "н": "n", "о": "o", "ў": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ҳ": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "", "ы": "i", "ь": "", "э": "e",
+    "ю": "yu", "я": "ya",
+})
+_APOSTROPHES = re.compile(r"['`´ʻʼ‘’]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_script(text):
+    if not text:
+        return ""
+    text = text.casefold().translate(_TRANSLITERATION)
+    text = _APOSTROPHES.sub("", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def backfill_search_title(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    batch = []
+    for post in Post.objects.only('title_uz', 'title_ru', 'title_en').iterator(chunk_size=1000):
+        post.search_title = normalize_script(" ".join([post.title_uz, post.title_ru, post.title_en]))
+        batch.append(post)
+        if len(batch) >= 1000:
+            Post.objects.bulk_update(batch, ['search_title'])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ['search_title'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_search_vectors'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='post',
+            name='search_title',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_title, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_title'], name='posts_search_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
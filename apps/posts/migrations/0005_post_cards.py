@@ -0,0 +1,98 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:13
+
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations, models
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+# Frozen copy of apps.posts.service.cards.build_cards as of this migration,
+# later changes to it must not change what this migration writes
+
+LANGUAGES = ('uz', 'ru', 'en')
+FALLBACK_CHAIN = ('uz', 'ru', 'en')
+BATCH_SIZE = 500
+
+
+def _media_url(storage):
+    """Relative media URLs, made absolute per request when cards are spliced"""
+    def url(name):
+        if not name:
+            return None
+        if isinstance(storage, FileSystemStorage):
+            return storage.base_url + filepath_to_uri(name).lstrip('/')
+        return storage.url(name)
+    return url
+
+
+def _localized(post, field, lang):
+    for code in (lang, *FALLBACK_CHAIN):
+        value = getattr(post, f'{field}_{code}')
+        if value:
+            return value
+    return None
+
+
+def backfill_cards(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    image_url = _media_url(Post._meta.get_field('image').storage)
+    video_file_url = _media_url(Post._meta.get_field('video_file').storage)
+    format_datetime = serializers.DateTimeField().to_representation
+    renderer = JSONRenderer()
+    fields = [f'card_{lang}' for lang in LANGUAGES]
+
+    batch = []
+    for post in Post.objects.select_related('category').iterator(chunk_size=BATCH_SIZE):
+        category = post.category
+        for lang in LANGUAGES:
+            card = {
+                'id': post.pk,
+                'title': _localized(post, 'title', lang) or 'Untitled',
+                'slug': post.slug,
+                'category': {
+                    'id': category.pk,
+                    'name': category.name,
+                    'type': category.type,
+                    'description': category.description,
+                } if category is not None else None,
+                'short_description': _localized(post, 'short_description', lang) or '',
+                'image': image_url(post.image.name),
+                'video_url': post.video_url,
+                'video_file': video_file_url(post.video_file.name),
+                'type_tag': post.type_tag,
+                'published_at': format_datetime(post.published_at) if post.published_at else None,
+                'created_at': format_datetime(post.created_at),
+            }
+            setattr(post, f'card_{lang}', renderer.render(card).decode())
+        batch.append(post)
+        if len(batch) >= BATCH_SIZE:
+            Post.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_search_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='card_en',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='card_ru',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='card_uz',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:16
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The feed indexes are built concurrently so "Posts" stays writable meanwhile
+    atomic = False
+
+    dependencies = [
+        ('posts', '0005_post_cards'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='post',
+            name='Posts_slug_5a2469_idx',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='category_type',
+            field=models.CharField(blank=True, choices=[('news', 'News'), ('announcement', 'Official Announcement'), ('report', 'Report'), ('media', 'Media/Video')], default='', editable=False, max_length=20),
+        ),
+        migrations.RunSQL(
+            sql=(
+                'UPDATE "Posts" AS p SET category_type = c.type '
+                'FROM "PostCategories" AS c WHERE p.category_id = c.id'
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-published_at', '-created_at', '-id'], name='posts_published_feed_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['category_type', '-published_at', '-created_at', '-id'], name='posts_published_type_feed_idx'),
+        ),
+    ]
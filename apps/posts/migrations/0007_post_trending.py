@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_category_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(max_length=10)),
+                ('score', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_scores', to='posts.post')),
+            ],
+            options={
+                'verbose_name': 'Post Trending Score',
+                'verbose_name_plural': 'Post Trending Scores',
+                'db_table': 'PostTrendingScores',
+                'indexes': [models.Index(fields=['window', '-score'], name='post_trending_window_idx')],
+                'constraints': [models.UniqueConstraint(fields=('window', 'post'), name='post_trending_score_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostViewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_buckets', to='posts.post')),
+            ],
+            options={
+                'verbose_name': 'Post View Bucket',
+                'verbose_name_plural': 'Post View Buckets',
+                'db_table': 'PostViewBuckets',
+                'indexes': [models.Index(fields=['hour'], name='post_view_bucket_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'hour'), name='post_view_bucket_unique')],
+            },
+        ),
+    ]
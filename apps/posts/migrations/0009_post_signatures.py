@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:31
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_related_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSignature',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='posts.post')),
+                ('minhash', models.BinaryField()),
+                ('bands', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None)),
+            ],
+            options={
+                'verbose_name': 'Post Signature',
+                'verbose_name_plural': 'Post Signatures',
+                'db_table': 'PostSignatures',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['bands'], name='post_signature_bands_gin')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-17 15:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('posts', '0009_post_signatures'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['updated_at'], name='posts_updated_at_idx'),
+        ),
+    ]
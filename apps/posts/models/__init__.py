@@ -1,4 +1,5 @@
 from .post import Post, PostCategory
-__all__ = ["Post", "PostCategory"]
-
-
+from .duplicates import PostSignature
+from .related import RelatedPost
+from .trending import PostTrendingScore, PostViewBucket
+__all__ = ["Post", "PostCategory", "PostSignature", "PostTrendingScore", "PostViewBucket", "RelatedPost"]
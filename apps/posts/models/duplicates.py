@@ -0,0 +1,24 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+
+from apps.posts.models.post import Post
+
+
+class PostSignature(models.Model):
+    """MinHash signature of a post's text and its LSH band hashes, refreshed once a Post.save() commits"""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="signature")
+    minhash = models.BinaryField()
+    bands = ArrayField(models.BigIntegerField())
+
+    class Meta:
+        db_table = "PostSignatures"
+        verbose_name = "Post Signature"
+        verbose_name_plural = "Post Signatures"
+        indexes = [
+            # Candidate lookup: posts sharing at least one band hash
+            GinIndex(fields=["bands"], name="post_signature_bands_gin"),
+        ]
+
+    def __str__(self):
+        return f"Signature of {self.post_id}"
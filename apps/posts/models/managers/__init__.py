@@ -0,0 +1 @@
+from .post_manager import JSON_CARD_FIELD, PostQuerySet, localized_field
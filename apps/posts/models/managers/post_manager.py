@@ -0,0 +1,142 @@
+from django.db import models
+from django.db.models import Case, F, Func, Q, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, NullIf
+
+from apps.posts.utils import LANGUAGE_FALLBACK_CHAIN, normalize_language
+
+# Columns list/feed serializers read; everything else (content_* bodies,
+# other translations, search columns) stays in the database.
+LIST_FIELDS = (
+    "id",
+    "slug",
+    "category",
+    "category__id",
+    "category__name",
+    "category__type",
+    "category__description",
+    "image",
+    "video_url",
+    "video_file",
+    "type_tag",
+    "published_at",
+    "created_at",
+    "views_count",
+)
+
+# Columns read next to the stored card by feed endpoints
+CARD_VALUES = (
+    "id",
+    "category_type",
+    "published_at",
+    "created_at",
+    "views_count",
+)
+
+# Name of the card column built by PostQuerySet.for_json()
+JSON_CARD_FIELD = "json_card"
+
+
+def localized_field(field, lang):
+    """
+    First non-empty translation of a field in SQL:
+    COALESCE(NULLIF(<field>_<lang>, ''), NULLIF(<field>_uz, ''), ...)
+    following the uz -> ru -> en fallback chain.
+    """
+    languages = [lang] + [code for code in LANGUAGE_FALLBACK_CHAIN if code != lang]
+    return Coalesce(
+        *[NullIf(f"{field}_{code}", Value(""), output_field=models.TextField()) for code in languages],
+        output_field=models.TextField(),
+    )
+
+
+class JSONBuildObject(Func):
+    """json_build_object() from keyword arguments, keeping their order"""
+    function = "json_build_object"
+    output_field = models.JSONField()
+
+    def __init__(self, **fields):
+        expressions = []
+        for key, value in fields.items():
+            expressions.extend([Value(key), value])
+        super().__init__(*expressions)
+
+
+class JSONDateTime(Func):
+    """
+    Datetime formatted like DRF's DateTimeField: ISO 8601 in UTC with a "Z"
+    suffix and microseconds only when non-zero. Only use with columns, the
+    expression is repeated in the SQL.
+    """
+    template = (
+        "CASE WHEN mod(date_part('microseconds', %(expressions)s)::bigint, 1000000) = 0 "
+        "THEN to_char(%(expressions)s AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS\"Z\"') "
+        "ELSE to_char(%(expressions)s AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US\"Z\"') END"
+    )
+    output_field = models.TextField()
+
+
+def media_url(field, base_url):
+    """base_url || <file name>, NULL when no file is set"""
+    return Case(
+        When(Q(**{f"{field}__isnull": True}) | Q(**{field: ""}), then=Value(None)),
+        default=Concat(Value(base_url), F(field), output_field=models.TextField()),
+        output_field=models.TextField(),
+    )
+
+
+class PostQuerySet(models.QuerySet):
+    def for_list(self, lang):
+        """
+        Load only what list serializers need for the given language.
+        The resolved title/description are exposed as `display_title` and
+        `display_short_description`.
+        """
+        lang = normalize_language(lang)
+        return self.only(*LIST_FIELDS).annotate(
+            display_title=localized_field("title", lang),
+            display_short_description=localized_field("short_description", lang),
+        )
+
+    def for_cards(self, lang):
+        """
+        Rows for splicing pre-rendered cards (see apps.posts.service.cards):
+        the card of the given language plus the columns merged in per request
+        and used by pagination.
+        """
+        lang = normalize_language(lang)
+        return self.values(*CARD_VALUES, f"card_{lang}")
+
+    def for_json(self, lang, media_urls):
+        """
+        Like for_cards(), but the card is built by PostgreSQL with
+        json_build_object() in the PostListSerializer shape (without
+        views_count) and returned as text in the `json_card` column.
+        `media_urls` maps "image"/"video_file" to their absolute base URL.
+        """
+        lang = normalize_language(lang)
+        category = JSONBuildObject(
+            id=F("category__id"),
+            name=F("category__name"),
+            type=F("category__type"),
+            description=F("category__description"),
+        )
+        card = JSONBuildObject(
+            id=F("id"),
+            title=Coalesce(localized_field("title", lang), Value("Untitled"), output_field=models.TextField()),
+            slug=F("slug"),
+            category=Case(
+                When(category__isnull=True, then=Value(None)),
+                default=category,
+                output_field=models.JSONField(),
+            ),
+            short_description=Coalesce(
+                localized_field("short_description", lang), Value(""), output_field=models.TextField()
+            ),
+            image=media_url("image", media_urls["image"]),
+            video_url=F("video_url"),
+            video_file=media_url("video_file", media_urls["video_file"]),
+            type_tag=F("type_tag"),
+            published_at=JSONDateTime("published_at"),
+            created_at=JSONDateTime("created_at"),
+        )
+        return self.values(*CARD_VALUES, **{JSON_CARD_FIELD: Cast(card, models.TextField())})
@@ -1,12 +1,42 @@
-from django.db import IntegrityError, models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import IntegrityError, models, transaction
 from django.core.exceptions import ValidationError
 from decouple import config
 
 from apps.common.models import BaseModel
 from apps.common.utils.files import unique_image_path, unique_video_path
+from apps.common.utils.text import normalize_script
+from apps.posts.models.managers import PostQuerySet
 from apps.common.utils.utils import generate_unique_slug
 
 
+# PostgreSQL text search configuration per language.
+# PostgreSQL ships no Uzbek dictionary, so Uzbek uses plain lowercased tokens.
+SEARCH_CONFIGS = {
+    "uz": "simple",
+    "ru": "russian",
+    "en": "english",
+}
+
+# Fields that feed the search vectors, with their rank weights
+SEARCH_WEIGHTS = (
+    ("title", "A"),
+    ("short_description", "B"),
+    ("content", "C"),
+)
+
+
+def build_search_vector(lang):
+    """Weighted search vector over title, short description and content of one language"""
+    config = SEARCH_CONFIGS[lang]
+    vector = None
+    for field, weight in SEARCH_WEIGHTS:
+        part = SearchVector(f"{field}_{lang}", weight=weight, config=config)
+        vector = part if vector is None else vector + part
+    return vector
+
+
 class PostCategory(BaseModel):
     """Categories for posts (News, Announcements, Reports, Media)"""
     class CategoryType(models.TextChoices):
@@ -48,6 +78,14 @@ class Post(BaseModel):
         null=True,
         blank=True
     )
+    # Copy of category.type so feeds filter without a join, maintained in save()
+    category_type = models.CharField(
+        max_length=20,
+        choices=PostCategory.CategoryType.choices,
+        blank=True,
+        default="",
+        editable=False,
+    )
 
     short_description_uz = models.TextField(blank=True, help_text="Brief description (Uzbek)")
     short_description_ru = models.TextField(blank=True, help_text="Brief description (Russian)")
@@ -98,12 +136,43 @@ class Post(BaseModel):
     # Views tracking
     views_count = models.BigIntegerField(default=0)
 
+    # Full-text search vectors, maintained in save()
+    search_vector_uz = SearchVectorField(null=True, editable=False)
+    search_vector_ru = SearchVectorField(null=True, editable=False)
+    search_vector_en = SearchVectorField(null=True, editable=False)
+
+    # Script-normalized titles (all languages) for typo-tolerant autocomplete
+    search_title = models.TextField(blank=True, default="", editable=False)
+
+    # Pre-rendered list/feed JSON per language, maintained in save()
+    card_uz = models.TextField(blank=True, default="", editable=False)
+    card_ru = models.TextField(blank=True, default="", editable=False)
+    card_en = models.TextField(blank=True, default="", editable=False)
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ["-published_at", "-created_at"]
         indexes = [
             models.Index(fields=["status", "published_at"]),
             models.Index(fields=["category", "status"]),
-            models.Index(fields=["slug"]),
+            # Published feeds in their ORDER BY, all posts and per category type
+            models.Index(
+                fields=["-published_at", "-created_at", "-id"],
+                condition=models.Q(status="published"),
+                name="posts_published_feed_idx",
+            ),
+            models.Index(
+                fields=["category_type", "-published_at", "-created_at", "-id"],
+                condition=models.Q(status="published"),
+                name="posts_published_type_feed_idx",
+            ),
+            # Posts modified since a point in time, for in-process search indexes catching up
+            models.Index(fields=["updated_at"], name="posts_updated_at_idx"),
+            GinIndex(fields=["search_vector_uz"], name="posts_search_uz_gin"),
+            GinIndex(fields=["search_vector_ru"], name="posts_search_ru_gin"),
+            GinIndex(fields=["search_vector_en"], name="posts_search_en_gin"),
+            GinIndex(fields=["search_title"], name="posts_search_title_trgm", opclasses=["gin_trgm_ops"]),
         ]
         db_table = "Posts"
         verbose_name = "Post"
@@ -125,13 +194,75 @@ class Post(BaseModel):
         if not self.slug:
             # Use Uzbek title for slug generation (main language)
             self.slug = generate_unique_slug(self.__class__, self.title_uz, allow_unicode=True)
+
+        # Search results only change when a post enters, leaves or is edited in them
+        was_published = self.pk is not None and self.__class__.objects.filter(
+            pk=self.pk, status=self.Status.PUBLISHED
+        ).exists()
+
+        self.category_type = self.category.type if self.category else ""
+        self.search_title = normalize_script(" ".join([self.title_uz, self.title_ru, self.title_en]))
         try:
-            return super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
         except IntegrityError:
             if not self.slug:
                 self.slug = generate_unique_slug(self.__class__, self.title_uz, allow_unicode=True)
-                return super().save(*args, **kwargs)
-            raise
+                super().save(*args, **kwargs)
+            else:
+                raise
+
+        self.refresh_derived_columns()
+        self.refresh_feed_index()
+        # Derived data kept outside the row: computed once the save is committed,
+        # a failure is logged and doesn't fail the save
+        transaction.on_commit(self.refresh_signature, robust=True)
+        transaction.on_commit(self.refresh_semantic_vector, robust=True)
+        if was_published or self.status == self.Status.PUBLISHED:
+            self.invalidate_search_results()
+        self.invalidate_cached_responses()
+
+    def refresh_derived_columns(self):
+        """Recompute the per-language search vectors and re-render the list cards, in one UPDATE"""
+        # Cards are rendered by the service layer, which imports this module
+        from apps.posts.service.cards import build_cards
+
+        cards = build_cards(self)
+        for field, card in cards.items():
+            setattr(self, field, card)
+        self.__class__.objects.filter(pk=self.pk).update(
+            **{f"search_vector_{lang}": build_search_vector(lang) for lang in SEARCH_CONFIGS},
+            **cards,
+        )
+
+    def refresh_feed_index(self):
+        """Add, move or drop the post in the feed index once its cards are committed"""
+        from apps.posts.service.feed_index import feed_index
+
+        feed_index.sync([self.pk])
+
+    def refresh_signature(self):
+        """Recompute the MinHash signature used to spot near-duplicate posts"""
+        from apps.posts.service.duplicates import refresh_signature
+
+        refresh_signature(self)
+
+    def refresh_semantic_vector(self):
+        """Fold the post into the semantic search index, if one is built"""
+        from apps.posts.service.semantic import fold_in
+
+        fold_in([self.pk])
+
+    def invalidate_search_results(self):
+        """Drop cached search responses, after the search vectors are current"""
+        from apps.posts.service.search_cache import invalidate_search_cache
+
+        invalidate_search_cache()
+
+    def invalidate_cached_responses(self):
+        """Drop cached post responses, after the cards are current"""
+        from apps.posts.service.cache import invalidate_post_cache
+
+        invalidate_post_cache()
 
     def __str__(self):
         return self.title_uz
@@ -0,0 +1,24 @@
+from django.db import models
+
+from apps.posts.models.post import Post
+
+
+class RelatedPost(models.Model):
+    """One of the most similar posts of a post, by TF-IDF cosine similarity"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="related_posts")
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="related_to")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        db_table = "RelatedPosts"
+        verbose_name = "Related Post"
+        verbose_name_plural = "Related Posts"
+        ordering = ["post", "rank"]
+        constraints = [
+            # Also the index the related block is read from
+            models.UniqueConstraint(fields=["post", "rank"], name="related_post_rank_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.3f})"
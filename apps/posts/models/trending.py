@@ -0,0 +1,47 @@
+from django.db import models
+
+from apps.posts.models.post import Post
+
+
+class PostViewBucket(models.Model):
+    """Views of one post during one hour, written by the view counter flush"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="view_buckets")
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "PostViewBuckets"
+        verbose_name = "Post View Bucket"
+        verbose_name_plural = "Post View Buckets"
+        constraints = [
+            models.UniqueConstraint(fields=["post", "hour"], name="post_view_bucket_unique"),
+        ]
+        indexes = [
+            # Range scans of recent buckets and pruning of old ones
+            models.Index(fields=["hour"], name="post_view_bucket_hour_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} @ {self.hour:%Y-%m-%d %H:00}: {self.views}"
+
+
+class PostTrendingScore(models.Model):
+    """Decayed view score of a recently read post in one trending window"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="trending_scores")
+    window = models.CharField(max_length=10)
+    score = models.FloatField()
+
+    class Meta:
+        db_table = "PostTrendingScores"
+        verbose_name = "Post Trending Score"
+        verbose_name_plural = "Post Trending Scores"
+        constraints = [
+            models.UniqueConstraint(fields=["window", "post"], name="post_trending_score_unique"),
+        ]
+        indexes = [
+            # Top posts of a window straight from the index
+            models.Index(fields=["window", "-score"], name="post_trending_window_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} ({self.window}): {self.score:.2f}"
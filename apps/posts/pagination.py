@@ -0,0 +1,210 @@
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from apps.posts.service.cache import get_content_version
+
+COUNT_KEY_PREFIX = "posts:count"
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """
+    Paginator whose total count comes from a cached per-filter counter.
+
+    Counters are keyed by the compiled SQL of the filtered queryset and the
+    posts content version, so any write to posts resets them, and expire with
+    the cached responses.
+    """
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+
+        sql, params = self.object_list.query.sql_with_params()
+        digest = hashlib.md5(f"{sql}|{params!r}".encode()).hexdigest()
+        key = f"{COUNT_KEY_PREFIX}:{get_content_version()}:{digest}"
+
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, settings.POSTS_CACHE_TIMEOUT)
+        return count
+
+
+class PostPagination(PageNumberPagination):
+    """Pagination for posts"""
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    django_paginator_class = CachedCountPaginator
+
+
+class PostCursorPagination(CursorPagination):
+    """
+    Keyset pagination for posts on (published_at, created_at, id), newest first.
+
+    Unlike page numbers this never counts rows or scans an OFFSET, so deep
+    pages of infinite-scroll feeds cost the same as the first one. Ordering
+    matches the feeds: PostgreSQL sorts NULL published_at first on DESC.
+
+    Querysets ordered by an annotation first, such as the rank of search
+    results, keep that order and are paged on (rank, id) instead.
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-published_at', '-created_at', '-id')
+    # Leading annotation ordering the queryset being paged, None for feeds
+    rank = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.rank = self._rank_ordering(queryset)
+        if self.rank is None:
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            queryset = queryset.order_by(self.rank, '-id')
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(*position) if self.rank is None else self._after_rank(*position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        self.next_position = self._position(self.page[-1]) if self.has_next else None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        return None
+
+    def encode_cursor(self, position):
+        if self.rank is None:
+            published_at, created_at, pk = position
+            position = [published_at.isoformat() if published_at else None, created_at.isoformat(), pk]
+        payload = json.dumps(list(position), separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        if self.rank is not None:
+            return self._decode_rank_cursor(encoded)
+
+        try:
+            published_at, created_at, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = (
+                parse_datetime(published_at) if published_at else None,
+                parse_datetime(created_at),
+                int(pk),
+            )
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if position[1] is None or (published_at and position[0] is None):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _decode_rank_cursor(self, encoded):
+        try:
+            rank, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+            raise NotFound(self.invalid_cursor_message)
+        return rank, pk
+
+    @staticmethod
+    def _rank_ordering(queryset):
+        """Leading order_by() term of a queryset ordered by an annotation, None otherwise"""
+        if not isinstance(queryset, QuerySet) or not queryset.query.order_by:
+            return None
+        first = queryset.query.order_by[0]
+        if isinstance(first, str) and first.lstrip('-') in queryset.query.annotations:
+            return first
+        return None
+
+    def _position(self, post):
+        if self.rank is not None:
+            name = self.rank.lstrip('-')
+            if isinstance(post, dict):
+                return post[name], post['id']
+            return getattr(post, name), post.pk
+        if isinstance(post, dict):
+            return post['published_at'], post['created_at'], post['id']
+        return post.published_at, post.created_at, post.pk
+
+    def _after_rank(self, rank, pk):
+        """Filter for rows that come after the given (rank, id) position"""
+        name = self.rank.lstrip('-')
+        beyond = f'{name}__lt' if self.rank.startswith('-') else f'{name}__gt'
+        return Q(**{beyond: rank}) | Q(**{name: rank, 'id__lt': pk})
+
+    @staticmethod
+    def _after(published_at, created_at, pk):
+        """Filter for rows that come after the given position"""
+        same_dates_older = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+
+        if published_at is None:
+            # Unpublished-date rows come first, every dated row follows them
+            return Q(published_at__isnull=True) & same_dates_older | Q(published_at__isnull=False)
+
+        return (
+            Q(published_at__lt=published_at)
+            | Q(published_at=published_at) & same_dates_older
+        )
+
+
+PAGINATION_MODES = {
+    'page': PostPagination,
+    'cursor': PostCursorPagination,
+}
+
+
+def get_pagination_class(request):
+    """Pick pagination class from the `pagination` query param (page or cursor)"""
+    mode = request.query_params.get('pagination', 'page') if request is not None else 'page'
+    return PAGINATION_MODES.get(mode, PostPagination)
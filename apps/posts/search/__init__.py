@@ -0,0 +1,27 @@
+"""
+Pluggable post search backends.
+
+POSTS_SEARCH_BACKEND selects the implementation behind /api/posts/search/:
+"postgres" (full-text search in the database) or "memory" (an in-process
+inverted index, for boxes that should not run search queries).
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import SearchBackend
+
+SEARCH_BACKENDS = {
+    "postgres": "apps.posts.search.postgres.PostgresSearchBackend",
+    "memory": "apps.posts.search.inverted.InvertedIndexSearchBackend",
+}
+
+
+def _build_backend():
+    backend = settings.POSTS_SEARCH_BACKEND
+    return import_string(SEARCH_BACKENDS.get(backend, backend))()
+
+
+search_backend = _build_backend()
+
+__all__ = ["SEARCH_BACKENDS", "SearchBackend", "search_backend"]
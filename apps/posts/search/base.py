@@ -0,0 +1,30 @@
+class SearchBackend:
+    """
+    Interface of post search implementations.
+
+    `search()` returns the matching published posts, best first, as
+    something Django's Paginator can slice: either a queryset of feed rows
+    (serialized by the view) or, for backends with `renders_cards`, a
+    sequence of post ids whose stored cards the view splices. A backend
+    that can't answer yet returns None and the view searches the database.
+    """
+
+    # Results are post ids hydrated from stored cards, not feed rows
+    renders_cards = False
+
+    # Whether ?highlight=true headlines can be computed for the results,
+    # the view searches the database for highlighted searches otherwise
+    supports_headlines = False
+
+    def search(self, queryset, query):
+        """Matches of the query among published posts, `queryset` being the view's feed rows"""
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Prepare the backend when the app is loaded, without blocking it"""
+
+    def index(self, post):
+        """Add or refresh a saved post, drop it if it is no longer published"""
+
+    def remove(self, post_id):
+        """Drop a deleted post"""
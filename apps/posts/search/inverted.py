@@ -0,0 +1,375 @@
+"""
+In-process inverted index search backend.
+
+Each language has its own index: a postings list per term holding the
+documents that contain it, as delta-encoded document numbers (`array("I")`
+gaps) next to term frequencies (`array("H")`). Document numbers only grow,
+so adding a post appends to the end of its postings lists. A re-indexed or
+removed post leaves a tombstone that scoring skips. Once tombstones make up
+a quarter of the documents, the live documents are renumbered and the
+postings rewritten, so the per-document arrays don't grow forever.
+
+Queries are scored with BM25 per language, vectorized over the decoded
+postings, and a post ranks by its best language, like the PostgreSQL
+backend. Texts go through the same script normalization as the other text
+features, so Cyrillic and Latin spellings match each other.
+
+Writes go to the index under a lock and publish a new immutable snapshot:
+postings are copied on their first write after a snapshot, which keeps
+sharing every untouched term. Searches score the current snapshot without
+taking the lock.
+
+Each worker builds its index in a background thread, started when the app
+is loaded (or after a fork, on the first search), and searches are answered
+by the database until it is ready. Post saves and deletes the worker sees
+itself are applied at once. Writes in other workers bump the search version
+(see service.search_cache); the index then re-reads the posts modified
+since the newest one it holds.
+"""
+
+import logging
+import math
+import os
+import threading
+from array import array
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections
+
+from apps.posts.models import Post
+from apps.posts.search.base import SearchBackend
+from apps.posts.service.search_cache import SEARCH_VERSION_KEY
+from apps.posts.service.text_vectors import post_tokens, text_fields, tokenize
+from apps.posts.utils import SUPPORTED_LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Share of dead documents that triggers renumbering the documents
+COMPACT_RATIO = 0.25
+
+MAX_FREQUENCY = 0xFFFF
+
+# Transactions committing after a sync may carry an older updated_at
+SYNC_OVERLAP = timedelta(minutes=1)
+
+INDEX_FIELDS = ("id", "status", "updated_at", *(field for lang in SUPPORTED_LANGUAGES for field in text_fields(lang)))
+
+
+class Postings:
+    """Document numbers (as gaps) and term frequencies of one term"""
+
+    __slots__ = ("gaps", "frequencies", "last")
+
+    def __init__(self, gaps=None, frequencies=None, last=0):
+        self.gaps = array("I") if gaps is None else gaps
+        self.frequencies = array("H") if frequencies is None else frequencies
+        self.last = last
+
+    def copy(self):
+        return Postings(array("I", self.gaps), array("H", self.frequencies), self.last)
+
+    def add(self, doc, frequency):
+        self.gaps.append(doc - self.last)
+        self.frequencies.append(min(frequency, MAX_FREQUENCY))
+        self.last = doc
+
+    def decode(self):
+        """Return (document numbers, frequencies) arrays"""
+        docs = np.cumsum(np.frombuffer(self.gaps, dtype=np.uint32), dtype=np.int64)
+        return docs, np.frombuffer(self.frequencies, dtype=np.uint16).astype(np.float64)
+
+    def renumbered(self, live, numbers):
+        """Postings of the live documents under their new numbers, None when none is left"""
+        docs, frequencies = self.decode()
+        mask = live[docs]
+        docs = numbers[docs[mask]]
+        if not len(docs):
+            return None
+        return Postings(
+            array("I", np.diff(docs, prepend=0).astype(np.uint32).tobytes()),
+            array("H", frequencies[mask].astype(np.uint16).tobytes()),
+            int(docs[-1]),
+        )
+
+
+class LanguageSnapshot:
+    """Read-only view of a LanguageIndex, safe to score from any thread"""
+
+    def __init__(self, postings, doc_post_ids, doc_lengths, live, total_length, count):
+        self.postings = postings
+        self.doc_post_ids = doc_post_ids
+        self.doc_lengths = doc_lengths
+        self.live = live
+        self.average_length = total_length / count if count else 0
+        self.count = count
+
+    def score(self, terms):
+        """BM25 scores of the documents matching any term, as (post ids, scores) arrays"""
+        if not self.count:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        scores = np.zeros(len(self.doc_post_ids))
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            docs, frequencies = postings.decode()
+            mask = self.live[docs]
+            docs, frequencies = docs[mask], frequencies[mask]
+            if not len(docs):
+                continue
+            idf = math.log(1 + (self.count - len(docs) + 0.5) / (len(docs) + 0.5))
+            norms = K1 * (1 - B + B * self.doc_lengths[docs] / self.average_length)
+            scores += np.bincount(docs, weights=idf * frequencies * (K1 + 1) / (frequencies + norms),
+                                  minlength=len(scores))
+
+        matches = np.flatnonzero(scores)
+        return self.doc_post_ids[matches], scores[matches]
+
+
+class LanguageIndex:
+    """Inverted index of the texts of one language"""
+
+    def __init__(self):
+        self.postings = {}
+        # Terms whose postings were created or copied since the last snapshot
+        self.owned = set()
+        # Per document number, number 0 unused so every gap is positive
+        self.doc_post_ids = array("q", [0])
+        self.doc_lengths = array("I", [0])
+        self.live = bytearray(1)
+        self.post_docs = {}
+        self.total_length = 0
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.post_docs)
+
+    def add(self, post_id, tokens):
+        self.remove(post_id)
+        if not tokens:
+            return
+        doc = len(self.doc_post_ids)
+        self.doc_post_ids.append(post_id)
+        self.doc_lengths.append(len(tokens))
+        self.live.append(1)
+        self.post_docs[post_id] = doc
+        self.total_length += len(tokens)
+        for term, frequency in Counter(tokens).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = Postings()
+                self.owned.add(term)
+            elif term not in self.owned:
+                # Still shared with a published snapshot
+                postings = self.postings[term] = postings.copy()
+                self.owned.add(term)
+            postings.add(doc, frequency)
+
+    def remove(self, post_id):
+        doc = self.post_docs.pop(post_id, None)
+        if doc is None:
+            return
+        self.live[doc] = 0
+        self.total_length -= self.doc_lengths[doc]
+        self.dead += 1
+        if self.dead > COMPACT_RATIO * len(self.doc_post_ids):
+            self.compact()
+
+    def compact(self):
+        """Renumber the live documents and drop the dead ones from every array"""
+        live = np.frombuffer(self.live, dtype=np.uint8).astype(bool)
+        live[0] = False
+        numbers = np.cumsum(live)
+        postings = {}
+        for term, term_postings in self.postings.items():
+            term_postings = term_postings.renumbered(live, numbers)
+            if term_postings is not None:
+                postings[term] = term_postings
+        self.postings, self.owned = postings, set(postings)
+
+        docs = np.flatnonzero(live)
+        self.doc_post_ids = array("q", [0]) + array("q", np.frombuffer(self.doc_post_ids, dtype=np.int64)[docs].tobytes())
+        self.doc_lengths = array("I", [0]) + array("I", np.frombuffer(self.doc_lengths, dtype=np.uint32)[docs].tobytes())
+        self.live = bytearray(1) + bytearray(b"\x01" * len(docs))
+        self.post_docs = {post_id: int(numbers[doc]) for post_id, doc in self.post_docs.items()}
+        self.dead = 0
+
+    def snapshot(self):
+        """Freeze the current state, later writes copy the postings they touch"""
+        self.owned = set()
+        return LanguageSnapshot(
+            dict(self.postings),
+            np.array(self.doc_post_ids, dtype=np.int64),
+            np.array(self.doc_lengths, dtype=np.uint32),
+            np.frombuffer(bytes(self.live), dtype=np.uint8).astype(bool),
+            self.total_length,
+            len(self.post_docs),
+        )
+
+
+class InvertedIndex:
+    """Per-language inverted indexes of published posts"""
+
+    def __init__(self):
+        self.languages = {lang: LanguageIndex() for lang in SUPPORTED_LANGUAGES}
+        # Published posts, including those without any text
+        self.post_ids = set()
+        # Newest updated_at among the rows read from the database
+        self.modified_at = None
+
+    def add(self, row):
+        """Index a row holding INDEX_FIELDS, or drop it when the post is not published"""
+        if self.modified_at is None or row["updated_at"] > self.modified_at:
+            self.modified_at = row["updated_at"]
+        if row["status"] != Post.Status.PUBLISHED:
+            self.remove(row["id"])
+            return
+        self.post_ids.add(row["id"])
+        for lang, index in self.languages.items():
+            index.add(row["id"], post_tokens(row, lang))
+
+    def remove(self, post_id):
+        self.post_ids.discard(post_id)
+        for index in self.languages.values():
+            index.remove(post_id)
+
+    def snapshot(self):
+        return InvertedSnapshot({lang: index.snapshot() for lang, index in self.languages.items()})
+
+
+class InvertedSnapshot:
+    """Searchable, immutable state of an InvertedIndex"""
+
+    def __init__(self, languages):
+        self.languages = languages
+
+    def search(self, query):
+        """Post ids matching the query, best first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        results = [index.score(terms) for index in self.languages.values()]
+        post_ids = np.concatenate([ids for ids, _ in results])
+        scores = np.concatenate([values for _, values in results])
+        if not len(post_ids):
+            return []
+
+        # Best language per post: sort by score, keep the first row of every post
+        order = np.lexsort((-post_ids, -scores))
+        post_ids, scores = post_ids[order], scores[order]
+        _, first = np.unique(post_ids, return_index=True)
+        first.sort()
+        return post_ids[first].tolist()
+
+
+def _row(post):
+    return {field: getattr(post, field) for field in INDEX_FIELDS}
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+    """Searches an in-process inverted index, results are hydrated from stored cards"""
+
+    renders_cards = True
+
+    def __init__(self):
+        self.inverted = None
+        self.snapshot = None
+        self.version = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def warm_up(self):
+        self._ensure_builder()
+
+    def search(self, queryset, query):
+        snapshot = self.snapshot
+        if snapshot is None:
+            # Built in the background, the database answers meanwhile
+            self._ensure_builder()
+            return None
+        if cache.get(SEARCH_VERSION_KEY) != self.version and self._lock.acquire(blocking=False):
+            # Another request already catching up keeps serving the current snapshot
+            try:
+                self._catch_up()
+            finally:
+                self._lock.release()
+            snapshot = self.snapshot
+        return snapshot.search(query)
+
+    def index(self, post):
+        with self._lock:
+            # Not built yet: the build or the next catch-up reads the post
+            if self.inverted is not None:
+                self.inverted.add(_row(post))
+                self.snapshot = self.inverted.snapshot()
+
+    def remove(self, post_id):
+        with self._lock:
+            if self.inverted is not None:
+                self.inverted.remove(post_id)
+                self.snapshot = self.inverted.snapshot()
+
+    def build(self):
+        """Load the index of all published posts from the database"""
+        # Writes during the build bump the version, the first search after it catches up
+        version = cache.get(SEARCH_VERSION_KEY)
+        index = InvertedIndex()
+        rows = Post.objects.filter(status=Post.Status.PUBLISHED).values(*INDEX_FIELDS)
+        for row in rows.iterator(chunk_size=500):
+            index.add(row)
+        snapshot = index.snapshot()
+        with self._lock:
+            self.inverted, self.version, self.snapshot = index, version, snapshot
+        logger.info("[SEARCH] Inverted index built with %s posts", len(index.post_ids))
+
+    def _ensure_builder(self):
+        # One build per process, a worker forked during a build starts its own
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._build_in_background, name="search-index-builder",
+                                             daemon=True)
+            self._thread.start()
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception("[SEARCH] Failed to build the inverted index, retrying on the next search")
+            self._thread = None
+        finally:
+            connections.close_all()
+
+    def _catch_up(self):
+        version = cache.get(SEARCH_VERSION_KEY)
+        index = self.inverted
+        changed = Post.objects.all()
+        if index.modified_at is not None:
+            changed = changed.filter(updated_at__gte=index.modified_at - SYNC_OVERLAP)
+        for row in changed.values(*INDEX_FIELDS).iterator(chunk_size=500):
+            index.add(row)
+
+        # Deletes and queryset updates leave no updated_at behind, the count gives them away
+        published = Post.objects.filter(status=Post.Status.PUBLISHED)
+        if published.count() != len(index.post_ids):
+            published_ids = set(published.values_list("id", flat=True))
+            for post_id in index.post_ids - published_ids:
+                index.remove(post_id)
+            missing = published.filter(pk__in=published_ids - index.post_ids)
+            for row in missing.values(*INDEX_FIELDS).iterator(chunk_size=500):
+                index.add(row)
+        self.version = version
+        self.snapshot = index.snapshot()
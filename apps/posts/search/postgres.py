@@ -0,0 +1,11 @@
+from apps.posts.search.base import SearchBackend
+from apps.posts.service.search import full_text_search
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Full-text search over the per-language tsvector columns, see service.search"""
+
+    supports_headlines = True
+
+    def search(self, queryset, query):
+        return full_text_search(queryset, query)
@@ -1,8 +1,10 @@
+from .feed import FEED_VALUES, PostFeedSerializer
 from .post import PostListSerializer, PostDetailSerializer, PostCategorySerializer
 __all__ = [
+    "FEED_VALUES",
     "PostCategorySerializer",
     "PostDetailSerializer",
+    "PostFeedSerializer",
     "PostListSerializer",
 ]
 
-
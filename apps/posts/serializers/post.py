@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apps.posts.models import Post, PostCategory
+from apps.posts.utils import get_request_language
 
 
 class PostCategorySerializer(serializers.ModelSerializer):
@@ -9,7 +10,18 @@ class PostCategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "type", "description"]
 
 
-class PostListSerializer(serializers.ModelSerializer):
+class RequestLanguageMixin:
+    """Language of the serialized fields, resolved once per serializer instance"""
+
+    def get_language(self):
+        """Get requested language from context, default to 'uz'"""
+        if not hasattr(self, '_language'):
+            # Normalized like the cache keys, so cached payloads match their key
+            self._language = get_request_language(self.context.get('request'))
+        return self._language
+
+
+class PostListSerializer(RequestLanguageMixin, serializers.ModelSerializer):
     """Serializer for list view of posts with multi-language support"""
     category = PostCategorySerializer(read_only=True)
     image = serializers.SerializerMethodField()
@@ -36,15 +48,12 @@ class PostListSerializer(serializers.ModelSerializer):
             "views_count",
         ]
 
-    def get_language(self):
-        """Get requested language from context, default to 'uz'"""
-        request = self.context.get('request')
-        if request:
-            return request.query_params.get('lang', 'uz').lower()
-        return 'uz'
-
     def get_title(self, obj):
         """Return title in requested language with fallback"""
+        # Already resolved in SQL by PostQuerySet.for_list()
+        if hasattr(obj, 'display_title'):
+            return obj.display_title or "Untitled"
+
         lang = self.get_language()
         
         # Try requested language first
@@ -62,6 +71,9 @@ class PostListSerializer(serializers.ModelSerializer):
 
     def get_short_description(self, obj):
         """Return short description in requested language with fallback"""
+        if hasattr(obj, 'display_short_description'):
+            return obj.display_short_description or ""
+
         lang = self.get_language()
         
         # Try requested language first
@@ -96,7 +108,7 @@ class PostListSerializer(serializers.ModelSerializer):
         return None
 
 
-class PostDetailSerializer(serializers.ModelSerializer):
+class PostDetailSerializer(RequestLanguageMixin, serializers.ModelSerializer):
     """Serializer for detail view of posts with multi-language support"""
     category = PostCategorySerializer(read_only=True)
     image = serializers.SerializerMethodField()
@@ -127,13 +139,6 @@ class PostDetailSerializer(serializers.ModelSerializer):
             "views_count",
         ]
 
-    def get_language(self):
-        """Get requested language from context, default to 'uz'"""
-        request = self.context.get('request')
-        if request:
-            return request.query_params.get('lang', 'uz').lower()
-        return 'uz'
-
     def get_title(self, obj):
         """Return title in requested language with fallback"""
         lang = self.get_language()
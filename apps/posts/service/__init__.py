@@ -0,0 +1,8 @@
+from .cache import bump_content_version, cache_response, get_content_version, invalidate_post_cache
+
+__all__ = [
+    "bump_content_version",
+    "cache_response",
+    "get_content_version",
+    "invalidate_post_cache",
+]
@@ -0,0 +1,148 @@
+"""
+Response caching for the public post endpoints.
+
+Every cache key embeds a namespace version. Any write to posts or categories
+bumps that version, which orphans all previously cached responses at once
+instead of deleting them one by one. Stale entries simply expire.
+
+The same version also drives HTTP validators: the ETag is derived from the
+cache key and Last-Modified from the time of the last bump, so conditional
+requests are answered with 304 before any row is fetched.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from apps.posts.utils import get_request_language
+
+CONTENT_VERSION_KEY = "posts:content-version"
+CONTENT_MODIFIED_KEY = "posts:content-modified"
+RESPONSE_KEY_PREFIX = "posts:response"
+
+# Query params that change the payload of cached list endpoints
+DEFAULT_VARY_ON = ("page", "page_size", "pagination", "cursor")
+
+
+def _initial_version():
+    # Start from a clock value so a version key lost to eviction or a cache
+    # restart never goes back to a number used by still-cached responses.
+    return int(time.time() * 1000)
+
+
+def get_content_version():
+    """Return the current posts namespace version"""
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        cache.add(CONTENT_VERSION_KEY, _initial_version(), None)
+        version = cache.get(CONTENT_VERSION_KEY, _initial_version())
+    return version
+
+
+def get_content_state():
+    """Return (version, last modified unix time) of posts content in one cache round trip"""
+    values = cache.get_many([CONTENT_VERSION_KEY, CONTENT_MODIFIED_KEY])
+    version = values.get(CONTENT_VERSION_KEY)
+    modified = values.get(CONTENT_MODIFIED_KEY)
+
+    if version is None:
+        version = get_content_version()
+    if modified is None:
+        # Unknown modification time: claim "now" so clients revalidate fully
+        modified = int(time.time())
+        cache.add(CONTENT_MODIFIED_KEY, modified, None)
+    return version, modified
+
+
+def bump_content_version():
+    """Invalidate every cached post response in O(1)"""
+    cache.set(CONTENT_MODIFIED_KEY, int(time.time()), None)
+    try:
+        return cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        version = _initial_version()
+        cache.set(CONTENT_VERSION_KEY, version, None)
+        return version
+
+
+def invalidate_post_cache():
+    """Bump the content version once the current write is committed"""
+    # Bumped earlier, requests served during the transaction would cache the old rows under the new version
+    transaction.on_commit(bump_content_version)
+
+
+def build_response_cache_key(request, action, vary_on=DEFAULT_VARY_ON, version=None):
+    """Build cache key from action, normalized language and paging params"""
+    if version is None:
+        version = get_content_version()
+
+    # Media URLs are absolute, so the origin is part of the payload
+    parts = [
+        request.scheme,
+        request.get_host(),
+        get_request_language(request),
+    ]
+    parts.extend(f"{name}={request.query_params.get(name, '')}" for name in vary_on)
+    digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+
+    return f"{RESPONSE_KEY_PREFIX}:{version}:{action}:{digest}"
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # Let clients keep the payload but always revalidate it
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def cache_response(view_method=None, *, vary_on=DEFAULT_VARY_ON):
+    """
+    Cache successful responses of a viewset action and support conditional GET.
+
+    Usage:
+        @cache_response
+        def list(self, request, *args, **kwargs): ...
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            version, last_modified = get_content_state()
+            action = f"{self.basename}.{self.action}"
+            key = build_response_cache_key(request, action, vary_on=vary_on, version=version)
+            etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+            not_modified = get_conditional_response(
+                request._request, etag=etag, last_modified=last_modified
+            )
+            if not_modified is not None:
+                return _set_validators(not_modified, etag, last_modified)
+
+            data = cache.get(key)
+            if isinstance(data, bytes):
+                # Pre-rendered body (see service.cards)
+                response = HttpResponse(data, content_type="application/json")
+                return _set_validators(response, etag, last_modified)
+            if data is not None:
+                return _set_validators(Response(data), etag, last_modified)
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                data = response.data if isinstance(response, Response) else response.content
+                cache.set(key, data, settings.POSTS_CACHE_TIMEOUT)
+                _set_validators(response, etag, last_modified)
+            return response
+
+        return wrapper
+
+    if view_method is not None:
+        return decorator(view_method)
+    return decorator
@@ -0,0 +1,204 @@
+"""
+Pre-rendered post cards.
+
+A card is the JSON of one post as it appears in list/feed responses (the
+PostListSerializer shape) in one language, without `views_count`. Cards are
+rendered when a post or its category is saved and stored on the post, so
+feed endpoints splice stored text into the response body instead of
+serializing rows. View counts change all the time and are merged in per
+request.
+
+Local media URLs are stored relative to the site and made absolute for the
+requesting origin while splicing.
+"""
+
+import json
+
+from django.db.models import Q
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from apps.posts.models import Post
+from apps.posts.serializers import FEED_VALUES, PostFeedSerializer
+from apps.posts.serializers.feed import MediaURLBuilder
+from apps.posts.utils import LANGUAGE_FALLBACK_CHAIN, SUPPORTED_LANGUAGES
+
+# Post columns cards are rendered from
+CARD_SOURCE_FIELDS = (
+    "id",
+    "slug",
+    "category",
+    *(f"title_{lang}" for lang in SUPPORTED_LANGUAGES),
+    *(f"short_description_{lang}" for lang in SUPPORTED_LANGUAGES),
+    "image",
+    "video_url",
+    "video_file",
+    "type_tag",
+    "published_at",
+    "created_at",
+)
+
+# Posts per UPDATE statement when rebuilding cards
+REBUILD_BATCH_SIZE = 500
+
+CARD_CONTENT_TYPE = "application/json"
+
+
+def card_field(lang):
+    return f"card_{lang}"
+
+
+def _localized(post, field, lang):
+    for code in (lang, *LANGUAGE_FALLBACK_CHAIN):
+        value = getattr(post, f"{field}_{code}")
+        if value:
+            return value
+    return None
+
+
+def build_cards(post):
+    """Render the cards of a post in every language, keyed by card field name"""
+    category = post.category
+    row = {
+        "id": post.pk,
+        "slug": post.slug,
+        "category_id": category.pk if category else None,
+        "category__name": category.name if category else None,
+        "category__type": category.type if category else None,
+        "category__description": category.description if category else None,
+        "image": post.image.name,
+        "video_url": post.video_url,
+        "video_file": post.video_file.name,
+        "type_tag": post.type_tag,
+        "published_at": post.published_at,
+        "created_at": post.created_at,
+        "views_count": 0,
+    }
+
+    # No request: media URLs stay relative until splicing
+    serializer = PostFeedSerializer()
+    renderer = JSONRenderer()
+    cards = {}
+    for lang in SUPPORTED_LANGUAGES:
+        row["display_title"] = _localized(post, "title", lang)
+        row["display_short_description"] = _localized(post, "short_description", lang)
+        data = serializer.to_representation(row)
+        del data["views_count"]
+        cards[card_field(lang)] = renderer.render(data).decode()
+    return cards
+
+
+def rebuild_cards(queryset):
+    """Re-render and store the cards of all posts in the queryset, returns the number of posts"""
+    fields = [card_field(lang) for lang in SUPPORTED_LANGUAGES]
+    posts = queryset.select_related("category").only(*CARD_SOURCE_FIELDS, "category__name",
+                                                      "category__type", "category__description")
+
+    batch = []
+    total = 0
+    for post in posts.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        for field, card in build_cards(post).items():
+            setattr(post, field, card)
+        batch.append(post)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            Post.objects.bulk_update(batch, fields)
+            total += len(batch)
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, fields)
+        total += len(batch)
+    return total
+
+
+def missing_cards():
+    """Posts with at least one card not rendered yet"""
+    condition = Q()
+    for lang in SUPPORTED_LANGUAGES:
+        condition |= Q(**{card_field(lang): ""})
+    return Post.objects.filter(condition)
+
+
+def absolute_media_urls(request):
+    """Absolute base URL of the image and video storages, None unless both are local"""
+    urls = {}
+    for name in ("image", "video_file"):
+        urls[name] = MediaURLBuilder(Post._meta.get_field(name).storage, request).base_url
+        if urls[name] is None:
+            return None
+    return urls
+
+
+class CardRenderer:
+    """
+    Splices cards of `PostQuerySet.for_cards()` rows into JSON bytes.
+
+    With `field`, cards are read from that column instead, e.g. the ones
+    built by `PostQuerySet.for_json()`, which already have absolute media URLs.
+    """
+
+    def __init__(self, request, lang, field=None):
+        self.request = request
+        self.lang = lang
+        self.field = field or card_field(lang)
+        self.renderer = JSONRenderer()
+
+        # Stored relative media URL prefix -> absolute prefix for this request
+        self.media_prefixes = []
+        for name in ("image", "video_file") if field is None else ():
+            storage = Post._meta.get_field(name).storage
+            relative = MediaURLBuilder(storage).base_url
+            absolute = MediaURLBuilder(storage, request).base_url
+            if relative is not None and relative != absolute:
+                self.media_prefixes.append((
+                    f'"{name}":{json.dumps(relative)[:-1]}',
+                    f'"{name}":{json.dumps(absolute)[:-1]}',
+                ))
+
+    def render_list(self, rows):
+        """Render rows as a JSON array"""
+        field = self.field
+        missing = [row["id"] for row in rows if not row[field]]
+        fallback = self._render_missing(missing) if missing else {}
+
+        items = []
+        for row in rows:
+            card = row[field]
+            if card:
+                items.append(f'{card[:-1]},"views_count":{row["views_count"]}}}')
+            elif row["id"] in fallback:
+                items.append(fallback[row["id"]])
+
+        text = f"[{','.join(items)}]"
+        for relative, absolute in self.media_prefixes:
+            text = text.replace(relative, absolute)
+        return text.encode()
+
+    def render_object(self, items):
+        """Render (key, rows) pairs as a JSON object of arrays"""
+        parts = [
+            json.dumps(key).encode() + b":" + self.render_list(rows)
+            for key, rows in items
+        ]
+        return b"{" + b",".join(parts) + b"}"
+
+    def render_page(self, envelope, rows):
+        """Render a paginated response body, `results` is spliced in last"""
+        head = self.renderer.render({
+            key: value for key, value in envelope.items() if key != "results"
+        })
+        return head[:-1] + b',"results":' + self.render_list(rows) + b"}"
+
+    def _render_missing(self, post_ids):
+        # Cards not rendered yet (e.g. rows written with update()) are
+        # serialized the regular way, with relative media URLs like cards
+        rows = Post.objects.filter(pk__in=post_ids).for_list(self.lang).values(*FEED_VALUES)
+        serializer = PostFeedSerializer()
+        return {
+            row["id"]: self.renderer.render(serializer.to_representation(row)).decode()
+            for row in rows
+        }
+
+
+def card_response(content):
+    """Response for pre-rendered JSON bytes"""
+    return HttpResponse(content, content_type=CARD_CONTENT_TYPE)
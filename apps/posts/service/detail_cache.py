@@ -0,0 +1,208 @@
+"""
+Per-worker cache of rendered post detail payloads.
+
+Detail traffic is heavily skewed towards a few breaking stories, while
+crawlers walk the long tail once. The cache is bounded by payload size and
+uses TinyLFU admission: a count-min sketch estimates how often every key
+was requested recently, and a new payload only displaces LRU entries that
+were requested less often than it. One-off hits therefore never flush the
+hot set.
+
+Entries hold the rendered JSON without `views_count`. They are valid for
+one posts content version, so any post or category write drops them in
+every worker. The base view count is re-read from the database only when
+the view counter has flushed since the entry was stored.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.posts.service.cache import CONTENT_VERSION_KEY, get_content_version
+from apps.posts.service.view_counter import VIEWS_EPOCH_KEY
+
+# Approximate per-entry bookkeeping overhead in bytes (key, entry object, LRU node)
+ENTRY_OVERHEAD = 400
+
+# Rough average payload size, used to size the frequency sketch
+AVERAGE_ENTRY_SIZE = 8 * 1024
+
+
+class CountMinSketch:
+    """
+    Frequency estimates with 4-bit saturating counters.
+
+    All counters are halved every `sample_size` increments, so estimates
+    follow recent popularity instead of all-time totals.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, expected_entries):
+        width = 64
+        while width < expected_entries * 4:
+            width *= 2
+        self.mask = width - 1
+        self.table = bytearray(width * self.DEPTH)
+        self.width = width
+        self.sample_size = width * 10
+        self.additions = 0
+
+    def _indexes(self, key):
+        # Double hashing: one hash gives the slot in every row
+        h = hash(key)
+        step = (h >> 32) | 1
+        return [row * self.width + ((h + row * step) & self.mask) for row in range(self.DEPTH)]
+
+    def increment(self, key):
+        table = self.table
+        added = False
+        for index in self._indexes(key):
+            if table[index] < self.MAX_COUNT:
+                table[index] += 1
+                added = True
+        if added:
+            self.additions += 1
+            if self.additions >= self.sample_size:
+                self._reset()
+
+    def frequency(self, key):
+        table = self.table
+        return min(table[index] for index in self._indexes(key))
+
+    def _reset(self):
+        self.table = bytearray(count >> 1 for count in self.table)
+        self.additions //= 2
+
+
+class TinyLFUCache:
+    """Size-bounded LRU cache with TinyLFU admission, safe to share between threads"""
+
+    def __init__(self, max_bytes, expected_entries=None):
+        self.max_bytes = max_bytes
+        self.sketch = CountMinSketch(expected_entries or max(max_bytes // AVERAGE_ENTRY_SIZE, 1))
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejections = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value and record the access"""
+        with self._lock:
+            self.sketch.increment(key)
+            item = self.entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, size):
+        """Store a value of the given size in bytes, returns False if admission rejected it"""
+        size += ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+
+            victims = []
+            free = self.max_bytes - self.size
+            if free < size:
+                frequency = self.sketch.frequency(key)
+                for victim_key, (_, victim_size) in self.entries.items():
+                    if self.sketch.frequency(victim_key) >= frequency:
+                        # Candidate is not more popular than what it would displace
+                        self.rejections += 1
+                        return False
+                    victims.append(victim_key)
+                    free += victim_size
+                    if free >= size:
+                        break
+
+            for victim_key in victims:
+                self.size -= self.entries.pop(victim_key)[1]
+            self.entries[key] = (value, size)
+            self.size += size
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            item = self.entries.pop(key, None)
+            if item is not None:
+                self.size -= item[1]
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejections": self.rejections,
+        }
+
+
+class DetailEntry:
+    __slots__ = ("post_id", "body", "views_count", "version", "epoch")
+
+    def __init__(self, post_id, body, views_count, version, epoch):
+        self.post_id = post_id
+        # Rendered payload without views_count and the closing brace
+        self.body = body
+        self.views_count = views_count
+        self.version = version
+        self.epoch = epoch
+
+
+class PostDetailCache:
+    """Rendered post detail payloads keyed by (origin, slug, lang)"""
+
+    def __init__(self, max_bytes):
+        self.enabled = max_bytes > 0
+        self.cache = TinyLFUCache(max_bytes) if self.enabled else None
+
+    @staticmethod
+    def build_key(request, slug, lang):
+        # Media URLs are absolute, so the origin is part of the payload
+        return request.scheme, request.get_host(), slug, lang
+
+    @staticmethod
+    def get_state():
+        """Current (content version, views flush epoch) in one cache round trip"""
+        values = cache.get_many([CONTENT_VERSION_KEY, VIEWS_EPOCH_KEY])
+        version = values.get(CONTENT_VERSION_KEY)
+        if version is None:
+            version = get_content_version()
+        return version, values.get(VIEWS_EPOCH_KEY, 0)
+
+    def get(self, key, version):
+        """Return the entry for the key if it belongs to the given content version"""
+        if not self.enabled:
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if entry.version != version:
+            self.cache.delete(key)
+            return None
+        return entry
+
+    def set(self, key, entry):
+        if self.enabled:
+            self.cache.set(key, entry, len(entry.body))
+
+
+post_detail_cache = PostDetailCache(settings.POSTS_DETAIL_CACHE_MAX_BYTES)
@@ -0,0 +1,180 @@
+"""
+Near-duplicate post detection with MinHash and LSH.
+
+A post's text (titles, short descriptions and contents of all languages,
+script-normalized) is reduced to a set of word 3-gram shingles. The MinHash
+signature keeps, for each of NUM_PERMUTATIONS hash functions, the smallest
+hash over the shingles; the share of equal positions in two signatures
+estimates the Jaccard similarity of their shingle sets.
+
+For lookup the signature is cut into BANDS bands of ROWS_PER_BAND values
+and every band is hashed. Two posts become candidates when any band hash
+matches, which a GIN index on the band array answers without scanning the
+archive. With 16 bands of 8 rows, pairs above ~0.7 similarity are found
+with high probability and unrelated pairs almost never collide.
+"""
+
+import hashlib
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+
+from apps.common.utils.text import normalize_script
+from apps.posts.models import Post, PostSignature
+from apps.posts.utils import SUPPORTED_LANGUAGES
+
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+SHINGLE_SIZE = 3
+
+# Universal hashing (a * x + b) mod p with p the largest prime below 2 ** 32.
+# Shingle hashes are reduced mod p first, so a, x and b are all below 2 ** 32
+# and a * x + b stays below 2 ** 64: the uint64 product never wraps.
+_PRIME = np.uint64(4294967291)
+_random = np.random.default_rng(20240601)
+_A = _random.integers(1, int(_PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _random.integers(0, int(_PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+# Post columns signatures are computed from
+SIGNATURE_SOURCE_FIELDS = tuple(
+    f"{field}_{lang}"
+    for lang in SUPPORTED_LANGUAGES
+    for field in ("title", "short_description", "content")
+)
+
+# Candidates verified per lookup, band collisions beyond that are noise
+MAX_CANDIDATES = 200
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def post_text(post):
+    return " ".join(getattr(post, field) or "" for field in SIGNATURE_SOURCE_FIELDS)
+
+
+def shingles(text):
+    """32-bit hashes of the word shingles of a text"""
+    words = normalize_script(strip_tags(text)).split()
+    if len(words) >= SHINGLE_SIZE:
+        grams = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    else:
+        grams = {" ".join(words)} if words else set()
+    return np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(hashes):
+    """Signature of a set of shingle hashes, None for an empty set"""
+    if not len(hashes):
+        return None
+    hashes = hashes % _PRIME
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_hashes(signature):
+    """Signed 64-bit hash of every band, salted with the band number"""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes(),
+                digest_size=8,
+                salt=band.to_bytes(2, "little"),
+            ).digest(),
+            "little",
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def build_signature(post):
+    """Unsaved PostSignature of a post, None when the post has no text"""
+    signature = minhash(shingles(post_text(post)))
+    if signature is None:
+        return None
+    return PostSignature(post_id=post.pk, minhash=signature.tobytes(), bands=band_hashes(signature))
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(first == second))
+
+
+def refresh_signature(post):
+    """Store the signature of a saved post"""
+    signature = build_signature(post)
+    if signature is None:
+        PostSignature.objects.filter(post_id=post.pk).delete()
+    else:
+        signature.save()
+
+
+def find_duplicates(post, threshold=None):
+    """
+    Posts whose text is likely a near copy of this post's text.
+
+    Returns [(post, estimated similarity)], most similar first.
+    """
+    threshold = settings.POSTS_DUPLICATE_THRESHOLD if threshold is None else threshold
+    signature = build_signature(post)
+    if signature is None:
+        return []
+    values = np.frombuffer(signature.minhash, dtype=np.uint32)
+
+    # Posts sharing the most bands are the likeliest copies, they are verified first
+    shared_bands = RawSQL(
+        f'(SELECT count(*) FROM unnest("{PostSignature._meta.db_table}"."bands") AS band WHERE band = ANY(%s))',
+        (signature.bands,),
+    )
+    candidates = PostSignature.objects.filter(bands__overlap=signature.bands).exclude(
+        post_id=post.pk
+    ).annotate(shared_bands=shared_bands).order_by("-shared_bands", "-post_id").values_list(
+        "post_id", "minhash"
+    )[:MAX_CANDIDATES]
+
+    scores = {}
+    for post_id, other in candidates:
+        score = similarity(values, np.frombuffer(other, dtype=np.uint32))
+        if score >= threshold:
+            scores[post_id] = score
+
+    posts = Post.objects.filter(pk__in=scores).only("id", "slug", "title_uz", "status")
+    return sorted(((other, scores[other.pk]) for other in posts), key=lambda item: -item[1])
+
+
+def backfill_signatures(queryset):
+    """Compute and store the signatures of all posts in the queryset, returns the number stored"""
+    posts = queryset.only("id", *SIGNATURE_SOURCE_FIELDS).order_by("pk")
+
+    batch = []
+    total = 0
+    for post in posts.iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        signature = build_signature(post)
+        if signature is not None:
+            batch.append(signature)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            total += _store(batch)
+            batch = []
+    if batch:
+        total += _store(batch)
+    return total
+
+
+def _store(signatures):
+    PostSignature.objects.bulk_create(
+        signatures,
+        update_conflicts=True,
+        unique_fields=["post"],
+        update_fields=["minhash", "bands"],
+    )
+    return len(signatures)
+
+
+def missing_signatures():
+    """Posts without a stored signature"""
+    return Post.objects.filter(signature__isnull=True)
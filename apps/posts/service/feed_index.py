@@ -0,0 +1,315 @@
+"""
+Sorted-set index of published post feeds.
+
+Every feed (all posts and one per category type) is a sorted set of post
+ids in feed order, next to a per-post record holding the stored cards and
+the view count. A feed page is then one range read plus one multi-get of
+cards, without touching PostgreSQL.
+
+Feed order is (-published_at, -created_at, -id) with unpublished dates
+first. In Redis the score is published_at in microseconds (+inf when
+unset) and the member is "<created_at µs>:<id>", zero padded, so
+ZREVRANGE returns exactly the database order.
+
+The index is shared by all workers and kept in sync from Post.save, post
+deletes, category changes and view count flushes, writes once they are
+committed. Without Redis there is no
+index and feeds are read from the database.
+"""
+
+import logging
+import math
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from apps.common.redis import get_redis_client
+from apps.posts.models import Post, PostCategory
+from apps.posts.service.cards import card_field
+from apps.posts.utils import SUPPORTED_LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+ALL_POSTS_FEED = "all"
+
+CARD_FIELDS = tuple(card_field(lang) for lang in SUPPORTED_LANGUAGES)
+
+# Columns loaded into the index
+INDEX_VALUES = ("id", "category_type", "published_at", "created_at", "views_count", *CARD_FIELDS)
+
+# Posts per pipeline when loading the Redis index
+LOAD_BATCH_SIZE = 500
+
+
+def feed_name(category_type=None):
+    return category_type or ALL_POSTS_FEED
+
+
+def _microseconds(value):
+    return int(value.timestamp()) * 1_000_000 + value.microsecond
+
+
+def feed_score(published_at):
+    return math.inf if published_at is None else _microseconds(published_at)
+
+
+def feed_member(post_id, created_at):
+    return f"{_microseconds(created_at):020d}:{post_id:020d}"
+
+
+def member_id(member):
+    if isinstance(member, bytes):
+        member = member.decode()
+    return int(member.rsplit(":", 1)[1])
+
+
+def published_posts():
+    return Post.objects.filter(status=Post.Status.PUBLISHED).order_by(
+        "-published_at", "-created_at", "-id"
+    )
+
+
+class RedisFeedIndex:
+    """Feeds as Redis sorted sets, posts as hashes of cards and view count"""
+
+    PREFIX = "posts:feed"
+    READY_KEY = f"{PREFIX}:ready"
+    LOCK_KEY = f"{PREFIX}:loading"
+    LOCK_TIMEOUT = 300
+
+    def __init__(self, client):
+        self.client = client
+        self.feeds = [ALL_POSTS_FEED, *PostCategory.CategoryType.values]
+
+    def feed_key(self, feed):
+        return f"{self.PREFIX}:{feed}"
+
+    def post_key(self, post_id):
+        return f"{self.PREFIX}:post:{post_id}"
+
+    def is_ready(self):
+        """Whether the index is loaded, starts loading it in the background if not"""
+        if self.client.exists(self.READY_KEY):
+            return True
+        if self.client.set(self.LOCK_KEY, 1, nx=True, ex=self.LOCK_TIMEOUT):
+            threading.Thread(target=self._load_in_background, name="feed-index-loader", daemon=True).start()
+        # Requests during the load are served from the database
+        return False
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception("[FEED] Failed to load the feed index")
+        finally:
+            self.client.delete(self.LOCK_KEY)
+            connections.close_all()
+
+    def load(self):
+        """Rebuild the whole index from the database, dropping posts no longer published"""
+        self.client.delete(self.READY_KEY, *(self.feed_key(feed) for feed in self.feeds))
+        rows = published_posts().values(*INDEX_VALUES)
+
+        loaded = set()
+        pipe = self.client.pipeline(transaction=False)
+        for count, row in enumerate(rows.iterator(chunk_size=LOAD_BATCH_SIZE), start=1):
+            self._add(pipe, row)
+            loaded.add(self.post_key(row["id"]))
+            if count % LOAD_BATCH_SIZE == 0:
+                pipe.execute()
+
+        # Records of posts unpublished or deleted while the index was stale
+        for key in self.client.scan_iter(match=self.post_key("*"), count=LOAD_BATCH_SIZE):
+            if (key.decode() if isinstance(key, bytes) else key) not in loaded:
+                pipe.delete(key)
+        pipe.set(self.READY_KEY, 1)
+        pipe.execute()
+
+    def sync(self, rows):
+        """Add, move or drop posts after a write, rows as loaded by `index_rows()`"""
+        rows = list(rows)
+        old_members = self._members([row["id"] for row in rows])
+
+        pipe = self.client.pipeline(transaction=False)
+        for row, member in zip(rows, old_members):
+            self._remove(pipe, row["id"], member)
+            if row["status"] == Post.Status.PUBLISHED:
+                self._add(pipe, row)
+        pipe.execute()
+
+    def remove(self, post_ids):
+        post_ids = list(post_ids)
+        old_members = self._members(post_ids)
+
+        pipe = self.client.pipeline(transaction=False)
+        for post_id, member in zip(post_ids, old_members):
+            self._remove(pipe, post_id, member)
+        pipe.execute()
+
+    def add_views(self, counts):
+        pipe = self.client.pipeline(transaction=False)
+        for post_id, amount in counts.items():
+            # A record without cards is served from the database until the next sync
+            pipe.hincrby(self.post_key(post_id), "views_count", amount)
+        pipe.execute()
+
+    def count(self, feed):
+        return self.client.zcard(self.feed_key(feed))
+
+    def read(self, feed, lang, start, stop):
+        members = self.client.zrevrange(self.feed_key(feed), start, stop - 1)
+        return self.read_posts([member_id(member) for member in members], lang)
+
+    def read_posts(self, post_ids, lang):
+        field = card_field(lang)
+        pipe = self.client.pipeline(transaction=False)
+        for post_id in post_ids:
+            pipe.hmget(self.post_key(post_id), field, "member", "views_count")
+        records = pipe.execute()
+
+        return [
+            {"id": post_id, field: (card or b"").decode(), "views_count": int(views or 0)}
+            for post_id, (card, member, views) in zip(post_ids, records)
+            # Posts without a member are not published (or only hold views)
+            if member
+        ]
+
+    def _members(self, post_ids):
+        # Current members, scores and ids alone can't locate a post in a feed
+        pipe = self.client.pipeline(transaction=False)
+        for post_id in post_ids:
+            pipe.hget(self.post_key(post_id), "member")
+        return pipe.execute()
+
+    def _add(self, pipe, row):
+        member = feed_member(row["id"], row["created_at"])
+        score = feed_score(row["published_at"])
+        pipe.zadd(self.feed_key(ALL_POSTS_FEED), {member: score})
+        if row["category_type"]:
+            pipe.zadd(self.feed_key(row["category_type"]), {member: score})
+        pipe.hset(self.post_key(row["id"]), mapping={
+            **{field: row[field] for field in CARD_FIELDS},
+            "views_count": row["views_count"],
+            "member": member,
+        })
+
+    def _remove(self, pipe, post_id, member):
+        if member:
+            for feed in self.feeds:
+                pipe.zrem(self.feed_key(feed), member)
+        pipe.delete(self.post_key(post_id))
+
+
+class FeedIndexSlice:
+    """
+    Lazy sequence over one feed in the index.
+
+    Behaves enough like a queryset for Django's Paginator: count() reads the
+    feed size and slicing reads one page of card rows.
+    """
+
+    def __init__(self, index, feed, lang):
+        self.index = index
+        self.feed = feed
+        self.lang = lang
+
+    def count(self):
+        return self.index.count(self.feed)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop, _ = item.indices(self.count() if item.stop is None else item.stop)
+        if stop <= start:
+            return []
+        return self.index.read(self.feed, self.lang, start, stop)
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def index_rows(post_ids):
+    """Rows for FeedIndex.sync(), including posts that are no longer published"""
+    return Post.objects.filter(pk__in=post_ids).values(*INDEX_VALUES, "status")
+
+
+class FeedIndex:
+    """Entry point used by views and signals"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def source(self, lang, category_type=None):
+        """Sequence of card rows for a feed, None when the index can't serve it"""
+        if self.backend is None:
+            return None
+        try:
+            if not self.backend.is_ready():
+                return None
+        except Exception:
+            logger.exception("[FEED] Feed index unavailable, serving feeds from the database")
+            return None
+        return FeedIndexSlice(self.backend, feed_name(category_type), lang)
+
+    def posts(self, post_ids, lang):
+        """Card rows of the published posts among post_ids in that order, None when the index can't serve them"""
+        if self.source(lang) is None:
+            return None
+        try:
+            return self.backend.read_posts(post_ids, lang)
+        except Exception:
+            logger.exception("[FEED] Feed index unavailable, reading cards from the database")
+            return None
+
+    def sync(self, post_ids):
+        """Add, move or drop posts once the current write is committed"""
+        if self.backend is None:
+            return
+        post_ids = list(post_ids)
+        # Synced earlier, the index could hold rows that are rolled back or not visible yet
+        transaction.on_commit(lambda: self._call("sync", index_rows(post_ids)))
+
+    def remove(self, post_ids):
+        """Drop posts once the current delete is committed"""
+        if self.backend is None:
+            return
+        post_ids = list(post_ids)
+        transaction.on_commit(lambda: self._call("remove", post_ids))
+
+    def add_views(self, counts):
+        self._call("add_views", counts)
+
+    def _call(self, method, *args):
+        if self.backend is None:
+            return
+        try:
+            getattr(self.backend, method)(*args)
+        except Exception:
+            # A stale Redis index is worse than none: force a reload
+            logger.exception("[FEED] Failed to update feed index, scheduling a reload")
+            if isinstance(self.backend, RedisFeedIndex):
+                try:
+                    self.backend.client.delete(RedisFeedIndex.READY_KEY)
+                except Exception:
+                    pass
+
+
+def _build_backend():
+    backend = settings.POSTS_FEED_INDEX_BACKEND
+    if backend == "redis":
+        client = get_redis_client()
+        if client is not None:
+            return RedisFeedIndex(client)
+        logger.warning("[FEED] Redis feed index requested but REDIS_URL is not usable, feeds are read from the database")
+    return None
+
+
+feed_index = FeedIndex(_build_backend())
@@ -0,0 +1,228 @@
+"""
+Precomputed related posts.
+
+A batch job vectorizes all published posts per language (see
+text_vectors), takes the cosine similarity of two posts as the best one
+over the languages both are written in, and stores the top
+RELATED_POSTS_LIMIT neighbours of every post. The related block of an
+article is then one indexed read of those rows.
+
+The full run fits the vocabulary and IDF weights and saves them with the
+TF-IDF rows of every post under POSTS_RELATED_INDEX_DIR. The incremental
+run loads them, transforms only the posts changed since (by updated_at, or
+published or unpublished without it) and re-scores those posts, the posts
+whose lists they enter and the posts that listed them. Terms first seen
+after the full run are ignored until the next one.
+"""
+
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from scipy import sparse
+
+from apps.posts.models import Post, RelatedPost
+from apps.posts.service.text_vectors import TfidfVectorizer, load_corpus
+from apps.posts.utils import SUPPORTED_LANGUAGES
+
+RELATED_POSTS_LIMIT = 6
+
+# Pairs below this similarity share little more than common words
+MIN_SIMILARITY = 0.05
+
+# Upper bound on the dense similarity block computed at once (rows x posts)
+SIMILARITY_BLOCK_CELLS = 5_000_000
+
+# Transactions committing after a run may carry an older updated_at
+SYNC_OVERLAP = timedelta(minutes=1)
+
+CURRENT_FILE = "CURRENT"
+
+
+def index_dir():
+    return Path(settings.POSTS_RELATED_INDEX_DIR)
+
+
+class SimilarityIndex:
+    """TF-IDF matrices of all published posts, one per language, rows in `post_ids` order"""
+
+    def __init__(self, post_ids, vectorizers, matrices, synced_at):
+        self.post_ids = post_ids
+        self.positions = {post_id: position for position, post_id in enumerate(post_ids.tolist())}
+        self.vectorizers = vectorizers
+        self.matrices = matrices
+        # When the posts the rows were computed from were read
+        self.synced_at = synced_at
+
+    @classmethod
+    def build(cls):
+        """Fit the vectorizers on all published posts"""
+        started = timezone.now()
+        post_ids, documents = load_corpus(Post.objects.filter(status=Post.Status.PUBLISHED).order_by("id"))
+        vectorizers = {lang: TfidfVectorizer().fit(docs) for lang, docs in documents.items()}
+        matrices = [vectorizers[lang].transform(docs) for lang, docs in documents.items()]
+        return cls(post_ids, vectorizers, matrices, started)
+
+    @classmethod
+    def load(cls):
+        """The index saved by the last run, None before the first full run"""
+        try:
+            path = index_dir() / (index_dir() / CURRENT_FILE).read_text().strip()
+            state = json.loads((path / "state.json").read_text())
+            vectorizers, matrices = {}, []
+            for lang in SUPPORTED_LANGUAGES:
+                vectorizer = TfidfVectorizer()
+                terms = json.loads((path / f"vocabulary-{lang}.json").read_text())
+                vectorizer.vocabulary = {term: column for column, term in enumerate(terms)}
+                vectorizer.idf = np.load(path / f"idf-{lang}.npy")
+                vectorizers[lang] = vectorizer
+                matrices.append(sparse.load_npz(path / f"matrix-{lang}.npz").tocsr())
+            post_ids = np.load(path / "post_ids.npy")
+        except FileNotFoundError:
+            return None
+        return cls(post_ids, vectorizers, matrices, datetime.fromisoformat(state["synced_at"]))
+
+    def save(self):
+        """Write the index to a new build directory and make it current"""
+        root = index_dir()
+        build = root / f"build-{int(time.time() * 1000)}"
+        build.mkdir(parents=True)
+        for (lang, vectorizer), matrix in zip(self.vectorizers.items(), self.matrices):
+            terms = sorted(vectorizer.vocabulary, key=vectorizer.vocabulary.get)
+            (build / f"vocabulary-{lang}.json").write_text(json.dumps(terms))
+            np.save(build / f"idf-{lang}.npy", vectorizer.idf)
+            sparse.save_npz(build / f"matrix-{lang}.npz", matrix)
+        np.save(build / "post_ids.npy", self.post_ids)
+        (build / "state.json").write_text(json.dumps({"synced_at": self.synced_at.isoformat()}))
+
+        (root / f"{CURRENT_FILE}.tmp").write_text(build.name)
+        os.replace(root / f"{CURRENT_FILE}.tmp", root / CURRENT_FILE)
+        for old in root.glob("build-*"):
+            if old != build:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def update(self, post_ids, documents, removed_ids, synced_at):
+        """Put the changed posts' rows, transformed with the saved vectorizers, in place of their
+        old ones and drop the removed posts' rows, returns the rows of the changed posts"""
+        keep = ~np.isin(self.post_ids, np.concatenate([post_ids, removed_ids]))
+        self.matrices = [
+            sparse.vstack([matrix[keep], self.vectorizers[lang].transform(documents[lang])], format="csr")
+            for lang, matrix in zip(self.vectorizers, self.matrices)
+        ]
+        self.post_ids = np.concatenate([self.post_ids[keep], post_ids])
+        self.positions = {post_id: position for position, post_id in enumerate(self.post_ids.tolist())}
+        self.synced_at = synced_at
+        return np.arange(len(self.post_ids) - len(post_ids), len(self.post_ids))
+
+    def __len__(self):
+        return len(self.post_ids)
+
+    def similarities(self, rows):
+        """Dense (len(rows), len(self)) block of similarities, zero on the diagonal"""
+        block = np.zeros((len(rows), len(self)))
+        for matrix in self.matrices:
+            np.maximum(block, (matrix[rows] @ matrix.T).toarray(), out=block)
+        block[np.arange(len(rows)), rows] = 0
+        return block
+
+    def blocks(self, rows):
+        """Yield (rows, similarities) in blocks of bounded size"""
+        size = max(SIMILARITY_BLOCK_CELLS // max(len(self), 1), 1)
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            yield chunk, self.similarities(chunk)
+
+    def neighbours(self, rows, limit=RELATED_POSTS_LIMIT):
+        """Yield (post id, [(related post id, score), ...]) for the given rows, best first"""
+        limit = min(limit, len(self) - 1)
+        for chunk, block in self.blocks(rows):
+            if limit <= 0:
+                for row in chunk:
+                    yield int(self.post_ids[row]), []
+                continue
+            top = np.argpartition(-block, limit - 1, axis=1)[:, :limit]
+            scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            scores = np.take_along_axis(scores, order, axis=1)
+            for row, columns, values in zip(chunk, top, scores):
+                yield int(self.post_ids[row]), [
+                    (int(self.post_ids[column]), float(score))
+                    for column, score in zip(columns, values)
+                    if score >= MIN_SIMILARITY
+                ]
+
+
+def store_neighbours(neighbours):
+    """Replace the related posts of every post in `neighbours`, returns the number of posts"""
+    neighbours = list(neighbours)
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=[post_id for post_id, _ in neighbours]).delete()
+        RelatedPost.objects.bulk_create(
+            [
+                RelatedPost(post_id=post_id, related_id=related_id, rank=rank, score=score)
+                for post_id, related in neighbours
+                for rank, (related_id, score) in enumerate(related)
+            ],
+            batch_size=1000,
+        )
+    return len(neighbours)
+
+
+def _entry_thresholds(index):
+    """Per row of the index, the similarity a new post needs to enter its related list"""
+    thresholds = np.full(len(index), MIN_SIMILARITY)
+    last = RelatedPost.objects.filter(rank=RELATED_POSTS_LIMIT - 1).values_list("post_id", "score")
+    for post_id, score in last.iterator(chunk_size=5000):
+        position = index.positions.get(post_id)
+        if position is not None:
+            thresholds[position] = max(score, MIN_SIMILARITY)
+    return thresholds
+
+
+def update_related_posts(full=False):
+    """Recompute related posts of all published posts, or only of changed posts and those they affect"""
+    index = None if full else SimilarityIndex.load()
+    if index is None:
+        index = SimilarityIndex.build()
+        index.save()
+        RelatedPost.objects.exclude(post_id__in=index.post_ids.tolist()).delete()
+        return store_neighbours(index.neighbours(np.arange(len(index))))
+
+    started = timezone.now()
+    published = Post.objects.filter(status=Post.Status.PUBLISHED)
+    published_ids = np.array(published.values_list("id", flat=True), dtype=np.int64)
+    # Queryset updates leave no updated_at behind, ids missing from the index give them away
+    missing_ids = published_ids[~np.isin(published_ids, index.post_ids)].tolist()
+    changed = published.filter(Q(id__in=missing_ids) | Q(updated_at__gte=index.synced_at - SYNC_OVERLAP))
+    changed_ids, documents = load_corpus(changed.order_by("id"))
+    removed_ids = index.post_ids[~np.isin(index.post_ids, published_ids)]
+    if not len(changed_ids) and not len(removed_ids):
+        return 0
+
+    changed_rows = index.update(changed_ids, documents, removed_ids, started)
+    RelatedPost.objects.filter(post_id__in=removed_ids.tolist()).delete()
+
+    # Older posts whose lists a changed post now belongs to, or belonged to before
+    thresholds = _entry_thresholds(index)
+    affected = np.zeros(len(index), dtype=bool)
+    for _, block in index.blocks(changed_rows):
+        affected |= (block > thresholds).any(axis=0)
+    affected[changed_rows] = True
+    listing = RelatedPost.objects.filter(related_id__in=[*changed_ids.tolist(), *removed_ids.tolist()])
+    for post_id in listing.values_list("post_id", flat=True).distinct():
+        position = index.positions.get(post_id)
+        if position is not None:
+            affected[position] = True
+
+    count = store_neighbours(index.neighbours(np.flatnonzero(affected)))
+    index.save()
+    return count
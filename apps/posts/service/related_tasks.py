@@ -0,0 +1,15 @@
+import logging
+
+from celery import shared_task
+
+from apps.posts.service.related import update_related_posts
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def update_related_posts_task(full=False):
+    """Periodic job: find related posts of newly published posts, or of all posts with full=True"""
+    count = update_related_posts(full=full)
+    logger.info("[RELATED] Related posts updated for %s posts", count)
+    return count
@@ -0,0 +1,74 @@
+"""
+PostgreSQL full-text search over posts.
+
+Each language has its own weighted tsvector column (title > short
+description > content) with a GIN index. A query matches a post when it
+matches any of the language vectors, and results are ranked by the best
+per-language rank.
+"""
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q, TextField, Value
+from django.db.models.functions import Cast, Concat, Greatest, Left
+
+from apps.posts.models import Post
+from apps.posts.models.post import SEARCH_CONFIGS
+
+# Upper bound on the text ts_headline has to parse per result
+HEADLINE_MAX_CHARS = 5000
+
+HEADLINE_OPTIONS = {
+    "start_sel": "<mark>",
+    "stop_sel": "</mark>",
+    "max_words": 35,
+    "min_words": 15,
+    "max_fragments": 2,
+}
+
+
+def build_search_query(query, lang):
+    return SearchQuery(query, config=SEARCH_CONFIGS[lang], search_type="websearch")
+
+
+def full_text_search(queryset, query):
+    """Filter queryset by query and annotate `search_rank`, best matches first"""
+    matches = Q()
+    ranks = []
+    for lang in SEARCH_CONFIGS:
+        search_query = build_search_query(query, lang)
+        matches |= Q(**{f"search_vector_{lang}": search_query})
+        ranks.append(SearchRank(F(f"search_vector_{lang}"), search_query))
+
+    return queryset.filter(matches).annotate(
+        # ts_rank returns a real, which reads back as a different double. Cursor pages
+        # filter on the ranks they were given, those must compare equal
+        search_rank=Cast(Greatest(*ranks), FloatField())
+    ).order_by("-search_rank", "-published_at", "-created_at")
+
+
+def get_headlines(post_ids, query, lang):
+    """
+    Return {post_id: highlighted snippet} for the given page of posts.
+
+    Only the requested language is highlighted and the source text is cut to
+    HEADLINE_MAX_CHARS, so the cost is bounded by the page size.
+    """
+    if not post_ids:
+        return {}
+
+    text = Left(
+        Concat(
+            f"short_description_{lang}", Value(" "), f"content_{lang}",
+            output_field=TextField(),
+        ),
+        HEADLINE_MAX_CHARS,
+    )
+    rows = Post.objects.filter(pk__in=post_ids).annotate(
+        headline=SearchHeadline(
+            text,
+            build_search_query(query, lang),
+            config=SEARCH_CONFIGS[lang],
+            **HEADLINE_OPTIONS,
+        )
+    ).values_list("pk", "headline")
+    return {pk: (headline or "").strip() for pk, headline in rows}
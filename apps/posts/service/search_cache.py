@@ -0,0 +1,308 @@
+"""
+Search result cache and popular query statistics.
+
+Search responses are cached under a normalized query: case and whitespace
+never change full-text results, and semantic search already compares
+script-normalized tokens, so in that mode "Prezident", "prezident " and
+"президент" share one entry. Keyword search keeps the script, PostgreSQL
+stems Cyrillic and Latin text differently.
+
+Keys embed a search version that is bumped when a published post changes,
+is published, unpublished or deleted, or when a category changes. Other
+post writes (drafts) keep cached results.
+
+Every served query is counted in a small top-k counter (Space-Saving in
+process, a trimmed sorted set in Redis). After an invalidation the most
+popular queries are searched again in the background so the first reader
+after a publish doesn't pay for them.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from apps.common.redis import get_redis_client
+from apps.common.utils.text import normalize_script
+from apps.posts.utils import get_request_language
+
+logger = logging.getLogger(__name__)
+
+SEARCH_VERSION_KEY = "posts:search-version"
+SEARCH_KEY_PREFIX = "posts:search"
+
+STATS_HITS_KEY = f"{SEARCH_KEY_PREFIX}:stats:hits"
+STATS_MISSES_KEY = f"{SEARCH_KEY_PREFIX}:stats:misses"
+STATS_SAVED_KEY = f"{SEARCH_KEY_PREFIX}:stats:saved-us"
+
+# Query params that change the payload of search responses
+SEARCH_VARY_ON = ("page", "page_size", "pagination", "cursor", "highlight", "mode")
+
+# Queries tracked by the popular query counter
+POPULAR_CAPACITY = 200
+
+
+def normalize_query(query, mode=None):
+    """Cache identity of a search query"""
+    if mode == "semantic":
+        return normalize_script(query)
+    return " ".join(query.casefold().split())
+
+
+def get_search_version():
+    version = cache.get(SEARCH_VERSION_KEY)
+    if version is None:
+        # Clock based, like the content version, so evictions never reuse a number
+        cache.add(SEARCH_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(SEARCH_VERSION_KEY, 0)
+    return version
+
+
+def bump_search_version():
+    try:
+        return cache.incr(SEARCH_VERSION_KEY)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(SEARCH_VERSION_KEY, version, None)
+        return version
+
+
+def build_search_key(request, query, version):
+    parts = [
+        request.scheme,
+        request.get_host(),
+        get_request_language(request),
+        normalize_query(query, request.query_params.get("mode")),
+    ]
+    parts.extend(f"{name}={request.query_params.get(name, '')}" for name in SEARCH_VARY_ON)
+    digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+    return f"{SEARCH_KEY_PREFIX}:{version}:{digest}"
+
+
+class SpaceSavingCounter:
+    """
+    Approximate top-k counter in fixed memory (Space-Saving).
+
+    When full, a new item replaces the least counted one and inherits its
+    count, so frequent items are never lost and counts are overestimated by
+    at most the count of the replaced item.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        with self._lock:
+            if item in self.counts or len(self.counts) < self.capacity:
+                self.counts[item] = self.counts.get(item, 0) + 1
+                return
+            smallest = min(self.counts, key=self.counts.get)
+            self.counts[item] = self.counts.pop(smallest) + 1
+
+    def top(self, limit):
+        with self._lock:
+            items = sorted(self.counts.items(), key=lambda item: -item[1])
+        return items[:limit]
+
+
+class RedisPopularCounter:
+    """Counter shared by all workers, trimmed to the capacity every TRIM_EVERY additions"""
+
+    KEY = f"{SEARCH_KEY_PREFIX}:popular"
+    TRIM_EVERY = 100
+
+    def __init__(self, client, capacity):
+        self.client = client
+        self.capacity = capacity
+        self.additions = 0
+
+    def add(self, item):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zincrby(self.KEY, 1, item)
+        self.additions += 1
+        if self.additions % self.TRIM_EVERY == 0:
+            pipe.zremrangebyrank(self.KEY, 0, -self.capacity - 1)
+        pipe.execute()
+
+    def top(self, limit):
+        return [
+            (item.decode(), int(count))
+            for item, count in self.client.zrevrange(self.KEY, 0, limit - 1, withscores=True)
+        ]
+
+
+def _build_popular_counter():
+    if settings.POSTS_SEARCH_POPULAR_BACKEND == "redis":
+        client = get_redis_client()
+        if client is not None:
+            return RedisPopularCounter(client, POPULAR_CAPACITY)
+        logger.warning("[SEARCH] Redis popular query counter requested but REDIS_URL is not usable, using memory")
+    return SpaceSavingCounter(POPULAR_CAPACITY)
+
+
+popular_queries = _build_popular_counter()
+
+
+def record_query(request, query):
+    """Count a served query with what is needed to search it again"""
+    mode = request.query_params.get("mode", "")
+    item = json.dumps([request.scheme, request.get_host(), get_request_language(request), mode,
+                       normalize_query(query, mode)], ensure_ascii=False)
+    try:
+        popular_queries.add(item)
+    except Exception:
+        logger.exception("[SEARCH] Failed to count search query")
+
+
+def _incr(key, amount=1):
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+
+def search_cache_stats():
+    values = cache.get_many([STATS_HITS_KEY, STATS_MISSES_KEY, STATS_SAVED_KEY])
+    hits = values.get(STATS_HITS_KEY, 0)
+    misses = values.get(STATS_MISSES_KEY, 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "saved_seconds": values.get(STATS_SAVED_KEY, 0) / 1_000_000,
+    }
+
+
+def reset_search_cache_stats():
+    cache.delete_many([STATS_HITS_KEY, STATS_MISSES_KEY, STATS_SAVED_KEY])
+
+
+def _instrument(response, status, duration):
+    # Cache outcome and the database/serialization time spent or saved, in ms
+    response["X-Search-Cache"] = status
+    response["Server-Timing"] = f'search;desc="{status.lower()}";dur={duration * 1000:.1f}'
+    return response
+
+
+def cache_search(view_method):
+    """
+    Cache successful responses of the search action.
+
+    Hits return the stored data and add the time the original search took
+    to the saved time statistic.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "")
+        if not normalize_query(query):
+            return view_method(self, request, *args, **kwargs)
+
+        prewarm = getattr(request._request, "search_prewarm", False)
+        if not prewarm:
+            record_query(request, query)
+
+        key = build_search_key(request, query, get_search_version())
+        cached = cache.get(key)
+        if cached is not None and not prewarm:
+            data, duration = cached
+            _incr(STATS_HITS_KEY)
+            _incr(STATS_SAVED_KEY, int(duration * 1_000_000))
+            if isinstance(data, bytes):
+                # Pre-rendered body (see service.cards)
+                return _instrument(HttpResponse(data, content_type="application/json"), "HIT", duration)
+            return _instrument(Response(data), "HIT", duration)
+
+        start = time.perf_counter()
+        response = view_method(self, request, *args, **kwargs)
+        duration = time.perf_counter() - start
+        if response.status_code == 200:
+            data = response.data if isinstance(response, Response) else response.content
+            cache.set(key, (data, duration), settings.POSTS_SEARCH_CACHE_TIMEOUT)
+            if not prewarm:
+                _incr(STATS_MISSES_KEY)
+        return _instrument(response, "MISS", duration)
+
+    return wrapper
+
+
+def prewarm_search_cache(limit=None):
+    """Search the most popular queries again to fill the cache, returns the number of queries"""
+    # Imported here: the view module imports this one
+    from rest_framework.test import APIRequestFactory
+
+    from apps.posts.views import PostViewSet
+
+    limit = settings.POSTS_SEARCH_PREWARM_QUERIES if limit is None else limit
+    view = PostViewSet.as_view({"get": "search"})
+    factory = APIRequestFactory()
+
+    warmed = 0
+    for item, _ in popular_queries.top(limit):
+        scheme, host, lang, mode, query = json.loads(item)
+        params = {"q": query, "lang": lang, **({"mode": mode} if mode else {})}
+        request = factory.get("/api/posts/search/", params, HTTP_HOST=host, secure=scheme == "https")
+        request.search_prewarm = True
+        try:
+            view(request)
+            warmed += 1
+        except Exception:
+            logger.exception("[SEARCH] Failed to pre-warm query %r", query)
+    return warmed
+
+
+class _Prewarmer:
+    """Runs one background pre-warm at a time, again if invalidated meanwhile"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending = False
+
+    def schedule(self):
+        with self._lock:
+            if self._running:
+                self._pending = True
+                return
+            self._running = True
+        threading.Thread(target=self._run, name="search-prewarm", daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                prewarm_search_cache()
+            except Exception:
+                logger.exception("[SEARCH] Search cache pre-warm failed")
+            finally:
+                close_old_connections()
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+                self._pending = False
+
+
+_prewarmer = _Prewarmer()
+
+
+def invalidate_search_cache():
+    """Orphan all cached search results and pre-warm popular queries once the write is committed"""
+    bump_search_version()
+
+    def after_commit():
+        # Searches running during the transaction may have cached what it replaced
+        bump_search_version()
+        if settings.POSTS_SEARCH_PREWARM_QUERIES > 0:
+            _prewarmer.schedule()
+
+    transaction.on_commit(after_commit)
@@ -0,0 +1,262 @@
+"""
+Cross-lingual semantic search over an in-process vector index.
+
+Every published post is one document of all its languages, tokenized after
+script normalization, so Cyrillic and Latin spellings share terms and words
+of different languages co-occur in translated posts. Latent semantic
+analysis (truncated SVD of the TF-IDF matrix) maps those documents into a
+dense space where a Russian query lands near posts that only have an Uzbek
+body.
+
+The index is a set of NumPy files written by `build_semantic_index` into a
+build directory of POSTS_SEMANTIC_INDEX_DIR; the CURRENT file names the
+active build. Workers memory-map the vectors once and reload only when a
+new build appears. Posts published after a build are folded in: projected
+with the stored components and written to a small delta file next to it.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from scipy.sparse.linalg import svds
+
+from apps.posts.models import Post
+from apps.posts.service.text_vectors import TfidfVectorizer, load_corpus, post_tokens, text_fields, tokenize
+from apps.posts.utils import SUPPORTED_LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIMENSIONS = 200
+
+# Results considered per query, enough for the first pages
+MAX_RESULTS = 100
+
+# Cosine similarity below which a post is not a result
+MIN_SCORE = 0.1
+
+# Rows of the memory-mapped matrix multiplied at once
+SEARCH_BATCH_ROWS = 65536
+
+CURRENT_FILE = "CURRENT"
+DELTA_FILE = "delta.npz"
+LOCK_FILE = "delta.lock"
+
+
+def index_dir():
+    return Path(settings.POSTS_SEMANTIC_INDEX_DIR)
+
+
+def multilingual_documents(documents):
+    """Join per-language token lists into one document per post"""
+    return [sum(tokens, []) for tokens in zip(*documents.values())]
+
+
+def current_build():
+    """Name of the active build directory, None before the first build"""
+    try:
+        return (index_dir() / CURRENT_FILE).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(np.float32)
+
+
+def _save(path, array):
+    # np.save appends .npy to names without it, keep the temporary name explicit
+    with open(f"{path}.tmp", "wb") as file:
+        np.save(file, array)
+    os.replace(f"{path}.tmp", path)
+
+
+def build_index(dimensions=DEFAULT_DIMENSIONS):
+    """Build a new index of all published posts and make it current, returns the number of posts"""
+    queryset = Post.objects.filter(status=Post.Status.PUBLISHED).order_by("id")
+    post_ids, documents = load_corpus(queryset)
+    documents = multilingual_documents(documents)
+
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(documents)
+    dimensions = min(dimensions, min(matrix.shape) - 1)
+    if dimensions < 1:
+        logger.warning("[SEMANTIC] Not enough posts or terms to build the semantic index")
+        return 0
+
+    # Document vectors are the documents projected on the right singular vectors
+    _, _, components = svds(matrix, k=dimensions)
+    components = components.T.astype(np.float32)
+    vectors = _normalize_rows(matrix @ components)
+
+    root = index_dir()
+    previous = current_build()
+    build = root / f"build-{int(time.time() * 1000)}"
+    build.mkdir(parents=True)
+    _save(build / "post_ids.npy", post_ids)
+    _save(build / "vectors.npy", vectors)
+    _save(build / "components.npy", components)
+    _save(build / "idf.npy", vectorizer.idf)
+    (build / "vocabulary.json").write_text(json.dumps(sorted(vectorizer.vocabulary, key=vectorizer.vocabulary.get)))
+
+    (root / f"{CURRENT_FILE}.tmp").write_text(build.name)
+    os.replace(root / f"{CURRENT_FILE}.tmp", root / CURRENT_FILE)
+
+    # Workers keep mapping replaced builds until they reload, which unlinking doesn't break.
+    # The previous build stays for workers that read CURRENT just before the switch.
+    for old in root.glob("build-*"):
+        if old.name not in (build.name, previous):
+            shutil.rmtree(old, ignore_errors=True)
+    return len(post_ids)
+
+
+class SemanticIndex:
+    """One worker's view of the current index build and its delta"""
+
+    def __init__(self):
+        self.build = None
+        self.delta_mtime = None
+        self.vectorizer = None
+        self.components = None
+        self.post_ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.delta_ids = np.zeros(0, dtype=np.int64)
+        self.delta_vectors = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def is_ready(self):
+        """Whether a build exists, (re)loading it or its delta when they changed"""
+        build = current_build()
+        if build is None:
+            return False
+
+        with self._lock:
+            try:
+                if build != self.build:
+                    self._load(build)
+                path = index_dir() / build / DELTA_FILE
+                mtime = path.stat().st_mtime_ns if path.exists() else None
+                if mtime != self.delta_mtime:
+                    self._load_delta(path, mtime)
+            except OSError:
+                # Removed by newer builds between reading CURRENT and loading it,
+                # search falls back to keywords until the next call reads CURRENT again
+                logger.warning("[SEMANTIC] Semantic index build %s is gone, using keyword search", build)
+                return False
+        return True
+
+    def _load(self, build):
+        # Everything is read before anything is replaced, a missing file keeps the loaded build
+        path = index_dir() / build
+        vectorizer = TfidfVectorizer()
+        terms = json.loads((path / "vocabulary.json").read_text())
+        vectorizer.vocabulary = {term: column for column, term in enumerate(terms)}
+        vectorizer.idf = np.load(path / "idf.npy")
+        components = np.load(path / "components.npy")
+        post_ids = np.load(path / "post_ids.npy", mmap_mode="r")
+        vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.vectorizer, self.components = vectorizer, components
+        self.post_ids, self.vectors = post_ids, vectors
+        self.delta_ids = np.zeros(0, dtype=np.int64)
+        self.delta_vectors = np.zeros((0, self.components.shape[1]), dtype=np.float32)
+        self.delta_mtime = None
+        self.build = build
+
+    def _load_delta(self, path, mtime):
+        if mtime is None:
+            self.delta_ids = np.zeros(0, dtype=np.int64)
+            self.delta_vectors = np.zeros((0, self.components.shape[1]), dtype=np.float32)
+        else:
+            with np.load(path) as delta:
+                self.delta_ids, self.delta_vectors = delta["post_ids"], delta["vectors"]
+        self.delta_mtime = mtime
+
+    def embed(self, documents):
+        """Project token lists into the index space, one normalized row each"""
+        return _normalize_rows(self.vectorizer.transform(documents) @ self.components)
+
+    def search(self, query_tokens, limit=MAX_RESULTS):
+        """Return [(post id, score)] of the posts closest to the query, best first"""
+        query = self.embed([query_tokens])[0]
+        if not query.any():
+            return []
+
+        scores = {}
+        for start in range(0, len(self.post_ids), SEARCH_BATCH_ROWS):
+            stop = start + SEARCH_BATCH_ROWS
+            scores.update(self._top(np.asarray(self.post_ids[start:stop]),
+                                    np.asarray(self.vectors[start:stop]), query, limit))
+        if len(self.delta_ids):
+            # Folded-in vectors replace the built ones of re-published posts
+            for post_id in self.delta_ids.tolist():
+                scores.pop(post_id, None)
+            scores.update(self._top(self.delta_ids, self.delta_vectors, query, limit))
+        return sorted(scores.items(), key=lambda item: -item[1])[:limit]
+
+    @staticmethod
+    def _top(post_ids, vectors, query, limit):
+        scores = vectors @ query
+        top = np.flatnonzero(scores >= MIN_SCORE)
+        if len(top) > limit:
+            top = top[np.argpartition(-scores[top], limit - 1)[:limit]]
+        return zip(post_ids[top].tolist(), scores[top].tolist())
+
+
+def fold_in(post_ids):
+    """Add published posts to the delta of the current build, drop the others from it"""
+    try:
+        if semantic_index.is_ready():
+            _fold_in(list(post_ids))
+    except OSError:
+        # Search keeps serving the last build, the next build includes the posts
+        logger.exception("[SEMANTIC] Failed to fold posts %s into the semantic index", post_ids)
+
+
+def _fold_in(post_ids):
+    rows = Post.objects.filter(pk__in=post_ids).values(
+        "id", "status", *(field for lang in SUPPORTED_LANGUAGES for field in text_fields(lang))
+    )
+    published = [row for row in rows if row["status"] == Post.Status.PUBLISHED]
+    if not published and not np.isin(semantic_index.delta_ids, post_ids).any():
+        return
+    vectors = semantic_index.embed([
+        sum((post_tokens(row, lang) for lang in SUPPORTED_LANGUAGES), []) for row in published
+    ])
+
+    path = index_dir() / semantic_index.build
+    with open(path / LOCK_FILE, "w") as lock:
+        # Admin saves in different workers may fold in at the same time
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        delta = path / DELTA_FILE
+        if delta.exists():
+            with np.load(delta) as data:
+                old_ids, old_vectors = data["post_ids"], data["vectors"]
+        else:
+            old_ids = np.zeros(0, dtype=np.int64)
+            old_vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+        keep = ~np.isin(old_ids, post_ids)
+        new_ids = np.concatenate([old_ids[keep], np.array([row["id"] for row in published], dtype=np.int64)])
+        new_vectors = np.concatenate([old_vectors[keep], vectors])
+        with open(f"{delta}.tmp", "wb") as file:
+            np.savez(file, post_ids=new_ids, vectors=new_vectors)
+        os.replace(f"{delta}.tmp", delta)
+
+
+semantic_index = SemanticIndex()
+
+
+def semantic_search(query, limit=MAX_RESULTS):
+    """Return [(post id, score)] for a query, best first, or None when no index is built"""
+    if not semantic_index.is_ready():
+        return None
+    return semantic_index.search(tokenize(query), limit)
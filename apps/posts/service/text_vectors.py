@@ -0,0 +1,103 @@
+"""
+Sparse TF-IDF vectors of post texts.
+
+Texts are tokenized after script normalization, so Cyrillic and Latin
+spellings of a word share one term. Each language is vectorized separately
+from its title, short description and content, the title counted twice.
+Rows are L2-normalized, so a sparse dot product is the cosine similarity.
+"""
+
+import math
+from collections import Counter
+
+import numpy as np
+from django.utils.html import strip_tags
+from scipy import sparse
+
+from apps.common.utils.text import normalize_script
+from apps.posts.utils import SUPPORTED_LANGUAGES
+
+# Shorter tokens are mostly particles and suffix fragments
+MIN_TOKEN_LENGTH = 3
+
+# Fields of one language that make up a post's text, with their repeat counts
+TEXT_FIELDS = (("title", 2), ("short_description", 1), ("content", 1))
+
+
+def tokenize(text):
+    return [token for token in normalize_script(strip_tags(text)).split() if len(token) >= MIN_TOKEN_LENGTH]
+
+
+def text_fields(lang):
+    return [f"{field}_{lang}" for field, _ in TEXT_FIELDS]
+
+
+def post_tokens(row, lang):
+    """Tokens of one language of a post row holding `text_fields(lang)`"""
+    tokens = []
+    for field, repeat in TEXT_FIELDS:
+        tokens.extend(tokenize(row[f"{field}_{lang}"] or "") * repeat)
+    return tokens
+
+
+def load_corpus(queryset, languages=SUPPORTED_LANGUAGES):
+    """Return (post ids, {lang: token lists}) for the posts of a queryset, in one query"""
+    fields = [field for lang in languages for field in text_fields(lang)]
+    post_ids, documents = [], {lang: [] for lang in languages}
+    for row in queryset.values("id", *fields).iterator(chunk_size=500):
+        post_ids.append(row["id"])
+        for lang in languages:
+            documents[lang].append(post_tokens(row, lang))
+    return np.array(post_ids, dtype=np.int64), documents
+
+
+class TfidfVectorizer:
+    """
+    Vocabulary and IDF weights fitted on a corpus.
+
+    Terms found in fewer than `min_df` documents or in more than `max_df`
+    of them carry no similarity signal and are left out.
+    """
+
+    def __init__(self, min_df=2, max_df=0.5):
+        self.min_df = min_df
+        self.max_df = max_df
+        self.vocabulary = {}
+        self.idf = np.zeros(0)
+
+    def fit(self, documents):
+        frequencies = Counter()
+        for tokens in documents:
+            frequencies.update(set(tokens))
+
+        total = len(documents)
+        max_count = max(self.max_df * total, self.min_df)
+        terms = sorted(term for term, count in frequencies.items() if self.min_df <= count <= max_count)
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        # Smoothed IDF, as if one extra document contained every term
+        self.idf = np.array([math.log((1 + total) / (1 + frequencies[term])) + 1 for term in terms])
+        return self
+
+    def transform(self, documents):
+        """CSR matrix with one L2-normalized row per document, empty rows for texts without known terms"""
+        vocabulary = self.vocabulary
+        indptr, indices, data = [0], [], []
+        for tokens in documents:
+            counts = Counter(vocabulary[token] for token in tokens if token in vocabulary)
+            indices.extend(counts.keys())
+            # Sublinear term frequency: the tenth mention adds little
+            data.extend(1 + math.log(count) for count in counts.values())
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr)),
+            shape=(len(documents), len(vocabulary)),
+        )
+        matrix = matrix.multiply(self.idf).tocsr() if len(vocabulary) else matrix
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return (sparse.diags(1 / norms) @ matrix).tocsr()
+
+    def fit_transform(self, documents):
+        return self.fit(documents).transform(documents)
+
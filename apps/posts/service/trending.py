@@ -0,0 +1,94 @@
+"""
+Trending posts from hourly view buckets.
+
+The view counter flush adds every post's new views to its bucket of the
+current hour. A periodic job turns the buckets of the last days into a
+hotness score per window: each bucket counts with its views halved every
+`half_life` hours of age, so a post read a lot an hour ago beats one read a
+lot yesterday. Scores are stored in an indexed table, the trending endpoint
+reads the top of one window from that index.
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from apps.posts.models import Post, PostTrendingScore, PostViewBucket
+
+TrendingWindow = namedtuple("TrendingWindow", ["hours", "half_life"])
+
+TRENDING_WINDOWS = {
+    "24h": TrendingWindow(hours=24, half_life=6),
+    "7d": TrendingWindow(hours=7 * 24, half_life=24),
+}
+
+DEFAULT_TRENDING_WINDOW = "24h"
+
+# Buckets older than the longest window no longer affect any score
+BUCKET_RETENTION_HOURS = max(window.hours for window in TRENDING_WINDOWS.values())
+
+# Score rows per INSERT statement
+SCORE_BATCH_SIZE = 1000
+
+
+def load_buckets(since):
+    """Return (post ids, bucket start unix times, views) arrays of published posts since a time"""
+    rows = PostViewBucket.objects.filter(
+        hour__gte=since, post__status=Post.Status.PUBLISHED
+    ).values_list("post_id", "hour", "views")
+
+    post_ids, hours, views = [], [], []
+    for post_id, hour, count in rows.iterator(chunk_size=5000):
+        post_ids.append(post_id)
+        hours.append(hour.timestamp())
+        views.append(count)
+    return (
+        np.array(post_ids, dtype=np.int64),
+        np.array(hours, dtype=np.float64),
+        np.array(views, dtype=np.float64),
+    )
+
+
+def compute_scores(post_ids, hours, views, now):
+    """
+    Decayed scores of every window, as {window: (post ids, scores)}.
+
+    Bucket age is measured from the middle of the hour, so the current
+    bucket is not weighted above completed ones.
+    """
+    ids, positions = np.unique(post_ids, return_inverse=True)
+    ages = np.maximum(now.timestamp() - hours - 1800, 0) / 3600
+
+    scores = {}
+    for name, window in TRENDING_WINDOWS.items():
+        in_window = ages < window.hours
+        weights = views[in_window] * np.exp2(-ages[in_window] / window.half_life)
+        totals = np.bincount(positions[in_window], weights=weights, minlength=len(ids))
+        active = totals > 0
+        scores[name] = (ids[active], totals[active])
+    return scores
+
+
+def update_trending_scores(now=None):
+    """Recompute the scores of all windows and prune expired buckets, returns scored posts per window"""
+    now = now or timezone.now()
+    since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=BUCKET_RETENTION_HOURS)
+    scores = compute_scores(*load_buckets(since), now=now)
+
+    with transaction.atomic():
+        for name, (post_ids, totals) in scores.items():
+            PostTrendingScore.objects.filter(window=name).delete()
+            PostTrendingScore.objects.bulk_create(
+                [
+                    PostTrendingScore(post_id=post_id, window=name, score=score)
+                    for post_id, score in zip(post_ids.tolist(), totals.tolist())
+                ],
+                batch_size=SCORE_BATCH_SIZE,
+            )
+        PostViewBucket.objects.filter(hour__lt=since).delete()
+
+    return {name: len(post_ids) for name, (post_ids, _) in scores.items()}
+
@@ -0,0 +1,15 @@
+import logging
+
+from celery import shared_task
+
+from apps.posts.service.trending import update_trending_scores
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def update_trending_scores_task():
+    """Periodic job: recompute trending scores from the hourly view buckets"""
+    counts = update_trending_scores()
+    logger.info("[TRENDING] Scores updated: %s", counts)
+    return counts
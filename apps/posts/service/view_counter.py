@@ -0,0 +1,205 @@
+"""
+Write-buffered post view counter.
+
+Detail views only record an increment in a counter store. A background
+flusher periodically drains the store and applies all pending increments to
+Post.views_count with one batched UPDATE ... FROM (VALUES ...) statement,
+and adds them to the post's view bucket of the current hour for trending.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from apps.common.redis import get_redis_client
+from apps.posts.models import Post, PostViewBucket
+
+logger = logging.getLogger(__name__)
+
+# Rows per UPDATE statement when flushing
+FLUSH_BATCH_SIZE = 1000
+
+# Bumped after every flush that changed Post.views_count
+VIEWS_EPOCH_KEY = "posts:views:epoch"
+
+# Sent after buffered views were written, with `counts` (post id -> views added)
+views_flushed = Signal()
+
+
+class InMemoryViewCountStore:
+    """Per-process store, each worker buffers and flushes its own increments"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, post_id, amount=1):
+        """Add views and return the pending total for the post"""
+        with self._lock:
+            self._counts[post_id] += amount
+            return self._counts[post_id]
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._counts.get(post_id, 0)
+
+    def drain(self):
+        """Take all pending increments, leaving the store empty"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return dict(counts)
+
+
+class RedisViewCountStore:
+    """Shared store backed by a Redis hash, pending counts are seen by all workers"""
+
+    HASH_KEY = "posts:views:pending"
+
+    def __init__(self, client):
+        self.client = client
+
+    def increment(self, post_id, amount=1):
+        return int(self.client.hincrby(self.HASH_KEY, post_id, amount))
+
+    def pending(self, post_id):
+        return int(self.client.hget(self.HASH_KEY, post_id) or 0)
+
+    def drain(self):
+        # RENAME is atomic: increments arriving after it start a fresh hash
+        draining_key = f"{self.HASH_KEY}:draining:{uuid.uuid4().hex}"
+        try:
+            self.client.rename(self.HASH_KEY, draining_key)
+        except Exception:
+            # Nothing to drain (no such key)
+            return {}
+
+        pipe = self.client.pipeline()
+        pipe.hgetall(draining_key)
+        pipe.delete(draining_key)
+        values, _ = pipe.execute()
+        return {int(post_id): int(amount) for post_id, amount in values.items()}
+
+
+def apply_view_counts(counts):
+    """Add buffered views to Post.views_count and the hourly view buckets in batched statements"""
+    items = [(post_id, amount) for post_id, amount in counts.items() if amount]
+    if not items:
+        return 0
+
+    table = connection.ops.quote_name(Post._meta.db_table)
+    buckets = connection.ops.quote_name(PostViewBucket._meta.db_table)
+    hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = items[start:start + FLUSH_BATCH_SIZE]
+                values = ", ".join(["(%s::bigint, %s::bigint)"] * len(batch))
+                cursor.execute(
+                    f"UPDATE {table} AS p SET views_count = p.views_count + v.delta "
+                    f"FROM (VALUES {values}) AS v(id, delta) WHERE p.id = v.id",
+                    [value for item in batch for value in item],
+                )
+                # Joined with the posts so views of deleted posts are dropped
+                cursor.execute(
+                    f"INSERT INTO {buckets} AS b (post_id, hour, views) "
+                    f"SELECT v.id, %s, v.delta FROM (VALUES {values}) AS v(id, delta) "
+                    f"JOIN {table} AS p ON p.id = v.id "
+                    f"ON CONFLICT (post_id, hour) DO UPDATE SET views = b.views + EXCLUDED.views",
+                    [hour, *(value for item in batch for value in item)],
+                )
+    return len(items)
+
+
+def bump_views_epoch():
+    """Mark view counts read from the database before this flush as stale"""
+    try:
+        return cache.incr(VIEWS_EPOCH_KEY)
+    except ValueError:
+        cache.add(VIEWS_EPOCH_KEY, 1, None)
+        return cache.get(VIEWS_EPOCH_KEY, 1)
+
+
+class ViewCountBuffer:
+    """Buffers view increments and flushes them from a background thread"""
+
+    def __init__(self, store, flush_interval):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def record(self, post_id):
+        """Record one view and return the number of views not yet flushed"""
+        self._ensure_flusher()
+        return self.store.increment(post_id)
+
+    def pending(self, post_id):
+        return self.store.pending(post_id)
+
+    def flush(self):
+        """Apply all pending increments to the database"""
+        counts = self.store.drain()
+        if not counts:
+            return 0
+        try:
+            flushed = apply_view_counts(counts)
+        except Exception:
+            logger.exception("[VIEWS] Failed to flush %s view counters, re-queued", len(counts))
+            for post_id, amount in counts.items():
+                self.store.increment(post_id, amount)
+            return 0
+        bump_views_epoch()
+        for receiver, response in views_flushed.send_robust(sender=self.__class__, counts=counts):
+            if isinstance(response, Exception):
+                logger.error("[VIEWS] views_flushed receiver %s failed: %r", receiver, response)
+        return flushed
+
+    def _ensure_flusher(self):
+        # Started lazily so each forked worker gets its own thread, and again if it died
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                atexit.register(self.flush)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="view-count-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                # An unreachable store or database must not stop later flushes
+                logger.exception("[VIEWS] View count flush failed")
+
+
+def _build_store():
+    if settings.POSTS_VIEW_COUNTER_BACKEND == "redis":
+        client = get_redis_client()
+        if client is not None:
+            return RedisViewCountStore(client)
+        logger.warning("[VIEWS] Redis view counter requested but REDIS_URL is not usable, using memory")
+    return InMemoryViewCountStore()
+
+
+view_counter = ViewCountBuffer(
+    store=_build_store(),
+    flush_interval=settings.POSTS_VIEW_COUNTER_FLUSH_INTERVAL,
+)
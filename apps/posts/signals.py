@@ -0,0 +1,79 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.posts.models import Post, PostCategory
+from apps.posts.search import search_backend
+from apps.posts.service.cache import invalidate_post_cache
+from apps.posts.service.cards import rebuild_cards
+from apps.posts.service.feed_index import feed_index
+from apps.posts.service.search_cache import invalidate_search_cache
+from apps.posts.service.view_counter import views_flushed
+
+
+@receiver(post_save, sender=PostCategory)
+def sync_category_posts(sender, instance, created, **kwargs):
+    """Copy the category type to its posts and re-render their cards"""
+    if not created:
+        posts = Post.objects.filter(category=instance)
+        posts.exclude(category_type=instance.type).update(category_type=instance.type)
+        rebuild_cards(posts)
+        feed_index.sync(posts.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=PostCategory)
+def remember_category_posts(sender, instance, **kwargs):
+    # Posts lose the category with a bulk UPDATE, remember which ones
+    instance._card_post_ids = list(instance.posts.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=PostCategory)
+def sync_uncategorized_posts(sender, instance, **kwargs):
+    post_ids = getattr(instance, "_card_post_ids", None)
+    if post_ids:
+        posts = Post.objects.filter(pk__in=post_ids)
+        posts.update(category_type="")
+        rebuild_cards(posts)
+        feed_index.sync(post_ids)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_feed_index(sender, instance, **kwargs):
+    feed_index.remove([instance.pk])
+
+
+@receiver(views_flushed)
+def add_views_to_feed_index(sender, counts, **kwargs):
+    feed_index.add_views(counts)
+
+
+@receiver(post_save, sender=Post)
+def index_searchable_post(sender, instance, **kwargs):
+    search_backend.index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_backend(sender, instance, **kwargs):
+    search_backend.remove(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_search_results(sender, instance, **kwargs):
+    if instance.status == Post.Status.PUBLISHED:
+        invalidate_search_cache()
+
+
+@receiver(post_save, sender=PostCategory)
+@receiver(post_delete, sender=PostCategory)
+def invalidate_category_search_results(sender, **kwargs):
+    # Results embed the category of every post
+    invalidate_search_cache()
+
+
+# Post.save invalidates by itself once its cards are refreshed, post_save fires before that
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=PostCategory)
+@receiver(post_delete, sender=PostCategory)
+def invalidate_post_responses(sender, **kwargs):
+    """Drop all cached post/category responses after any write"""
+    invalidate_post_cache()
+
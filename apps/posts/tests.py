@@ -1,3 +1,1137 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from apps.common.renderers import ORJSONRenderer
+from apps.posts.models import Post, PostCategory, PostSignature, PostTrendingScore, PostViewBucket, RelatedPost
+from apps.posts.pagination import COUNT_KEY_PREFIX
+from apps.posts.search.inverted import COMPACT_RATIO, InvertedIndexSearchBackend, LanguageIndex
+from apps.posts.serializers import FEED_VALUES, PostDetailSerializer, PostFeedSerializer, PostListSerializer
+from apps.posts.service.detail_cache import ENTRY_OVERHEAD, TinyLFUCache, post_detail_cache
+from apps.posts.service.duplicates import (
+    _A,
+    _B,
+    _PRIME,
+    backfill_signatures,
+    find_duplicates,
+    minhash,
+    shingles,
+    similarity,
+)
+from apps.posts.service.feed_index import RedisFeedIndex, feed_index, feed_member, member_id
+from apps.posts.service import bump_content_version, get_content_version
+from apps.posts.service.search_cache import (
+    SpaceSavingCounter,
+    bump_search_version,
+    popular_queries,
+    prewarm_search_cache,
+    reset_search_cache_stats,
+    search_cache_stats,
+)
+from apps.posts.service.semantic import CURRENT_FILE, build_index, current_build, index_dir
+from apps.posts.service.related import RELATED_POSTS_LIMIT, update_related_posts
+from apps.posts.service.text_vectors import TfidfVectorizer
+from apps.posts.service.trending import update_trending_scores
+from apps.posts.service.view_counter import (
+    InMemoryViewCountStore,
+    RedisViewCountStore,
+    ViewCountBuffer,
+    view_counter,
+)
+
+try:
+    import fakeredis  # type: ignore
+except Exception:
+    fakeredis = None  # optional, only needed by the Redis feed index tests
+
+
+class ORJSONRendererParityTests(TestCase):
+    """ORJSONRenderer must produce the same bytes as the stock JSONRenderer"""
+
+    endpoints = (
+        ('/api/posts/', {}),
+        ('/api/posts/', {'lang': 'ru', 'page_size': 100}),
+        ('/api/posts/', {'pagination': 'cursor'}),
+        ('/api/posts/homepage/', {}),
+        ('/api/posts/news/', {'lang': 'en'}),
+        ('/api/posts/latest-news/', {}),
+        ('/api/posts/announcements/', {}),
+        ('/api/posts/latest-announcements/', {}),
+        ('/api/posts/media/', {}),
+        ('/api/posts/latest-videos/', {}),
+        ('/api/posts/reports/', {}),
+        ('/api/posts/suggest/', {'q': 'sarlavha'}),
+        ('/api/posts/search/', {'q': 'iqtisodiyot', 'highlight': 'true'}),
+        ('/api/posts/search/', {}),
+        ('/api/posts/missing-slug/', {}),
+        ('/api/categories/', {}),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        categories = [
+            PostCategory.objects.create(name=f'Category {category_type}', type=category_type)
+            for category_type in PostCategory.CategoryType.values
+        ]
+        for index in range(20):
+            Post.objects.create(
+                title_uz=f'Sarlavha {index} “iqtisodiyot”',
+                title_ru=f'Заголовок {index}\u2028' if index % 2 else '',
+                short_description_uz='Qisqa tavsif <b>&</b>',
+                content_uz='Iqtisodiyot haqida matn',
+                category=categories[index % len(categories)] if index % 5 else None,
+                status=Post.Status.PUBLISHED,
+                published_at=now - timedelta(hours=index, microseconds=index) if index % 3 else None,
+                views_count=index * 1000,
+            )
+        cls.post = Post.objects.filter(status=Post.Status.PUBLISHED).first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assertRendersSame(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_post_viewset_actions(self):
+        endpoints = [*self.endpoints, (f'/api/posts/{self.post.slug}/', {'lang': 'en'})]
+        for url, params in endpoints:
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                # Feeds are pre-rendered from stored cards and have no `data`
+                data = response.data if hasattr(response, 'data') else json.loads(response.content)
+                self.assertRendersSame(data)
+
+    def test_native_types(self):
+        self.assertRendersSame({
+            'datetime': timezone.now(),
+            'date': timezone.now().date(),
+            'decimal': Decimal('1.10'),
+            'lazy': gettext_lazy('Posts'),
+            'text': 'line\u2028paragraph\u2029',
+            1: 'non-string key',
+        })
+
+    def test_recorded_detail_response(self):
+        # A post detail response and the bytes the stock JSONRenderer gave for it
+        # before ORJSONRenderer, with the values DRF hands the renderer unconverted:
+        # datetimes, a Decimal and a lazy choice label
+        data = {
+            'id': 1042,
+            'title': 'Prezident “Yangi O‘zbekiston” strategiyasi haqida\u2028gapirdi',
+            'slug': 'prezident-yangi-ozbekiston-strategiyasi-haqida-gapirdi',
+            'category': {
+                'id': 3,
+                'name': 'Yangiliklar',
+                'type': 'news',
+                'description': 'Новости — главное за день',
+            },
+            'short_description': 'Краткое описание <b>&</b> «экономика» ✓',
+            'content': '<p>Iqtisodiyot haqida matn 📈\u2029</p>',
+            'image': 'http://testserver/media/posts/images/rasm.jpg',
+            'video_url': None,
+            'video_file': None,
+            'type_tag': gettext_lazy('News'),
+            'status': 'published',
+            'published_at': datetime(2026, 10, 16, 9, 30, 5, 123456, tzinfo=dt_timezone.utc),
+            'created_at': datetime(2026, 10, 16, 9, 12, tzinfo=dt_timezone.utc),
+            'updated_at': datetime(2026, 10, 16, 9, 31, 2, 1, tzinfo=dt_timezone.utc),
+            'reading_time': Decimal('4.50'),
+            'views_count': 15234,
+        }
+        recorded = (
+            '{"id":1042,"title":"Prezident “Yangi O‘zbekiston” strategiyasi haqida\\u2028gapirdi",'
+            '"slug":"prezident-yangi-ozbekiston-strategiyasi-haqida-gapirdi",'
+            '"category":{"id":3,"name":"Yangiliklar","type":"news","description":"Новости — главное за день"},'
+            '"short_description":"Краткое описание <b>&</b> «экономика» ✓",'
+            '"content":"<p>Iqtisodiyot haqida matn 📈\\u2029</p>",'
+            '"image":"http://testserver/media/posts/images/rasm.jpg","video_url":null,"video_file":null,'
+            '"type_tag":"News","status":"published","published_at":"2026-10-16T09:30:05.123456Z",'
+            '"created_at":"2026-10-16T09:12:00Z","updated_at":"2026-10-16T09:31:02.000001Z",'
+            '"reading_time":4.5,"views_count":15234}'
+        ).encode()
+
+        self.assertEqual(ORJSONRenderer().render(data), recorded)
+
+    def test_empty_body(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class PostCardTests(TestCase):
+    """Feeds spliced from stored cards must match the feed serializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = PostCategory.objects.create(name='News', type=PostCategory.CategoryType.NEWS)
+        for index in range(5):
+            Post.objects.create(
+                title_uz=f'Sarlavha {index}',
+                title_en=f'Title {index}' if index % 2 else '',
+                short_description_ru='Описание',
+                image=f'posts/images/photo {index}.jpg' if index % 2 else None,
+                category=cls.category if index % 3 else None,
+                status=Post.Status.PUBLISHED,
+                published_at=timezone.now() - timedelta(days=index),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_results(self, lang):
+        response = self.client.get('/api/posts/', {'lang': lang})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(response.content)['results']
+
+    def serialize_feed(self, lang):
+        request = self.client.get('/api/posts/', {'lang': lang}).wsgi_request
+        rows = Post.objects.order_by('-published_at', '-created_at').for_list(lang).values(*FEED_VALUES)
+        return PostFeedSerializer(Request(request)).serialize(rows)
+
+    def test_cards_match_feed_serializer(self):
+        for lang in ('uz', 'ru', 'en'):
+            with self.subTest(lang=lang):
+                self.assertEqual(self.get_results(lang), self.serialize_feed(lang))
+
+    def test_views_count_is_merged(self):
+        Post.objects.update(views_count=42)
+        self.assertEqual({post['views_count'] for post in self.get_results('uz')}, {42})
+
+    def test_missing_cards_fall_back_to_serializer(self):
+        Post.objects.update(card_en='')
+        self.assertEqual(self.get_results('en'), self.serialize_feed('en'))
+
+    def test_category_rename_rebuilds_cards(self):
+        self.category.name = 'Latest news'
+        self.category.save()
+        names = {post['category']['name'] for post in self.get_results('uz') if post['category']}
+        self.assertEqual(names, {'Latest news'})
+
+    def test_category_delete_rebuilds_cards(self):
+        self.category.delete()
+        self.assertEqual({post['category'] for post in self.get_results('uz')}, {None})
+
+
+class PostPaginationTests(TestCase):
+    """Cursor pages must follow the feed order, page counts must expire"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.posts = [
+            Post.objects.create(
+                title_uz=f'Sarlavha {index}',
+                status=Post.Status.PUBLISHED,
+                # Pairs share a publish time, every third post has none
+                published_at=None if index % 3 == 0 else now - timedelta(hours=index // 2),
+            )
+            for index in range(11)
+        ]
+        # Ties on created_at too, only the id orders those
+        Post.objects.filter(pk__in=[post.pk for post in cls.posts[:4]]).update(created_at=now)
+
+    def setUp(self):
+        cache.clear()
+
+    def walk_cursor_pages(self, page_size):
+        ids, pages = [], []
+        url, params = '/api/posts/', {'pagination': 'cursor', 'page_size': page_size}
+        while url:
+            data = json.loads(self.client.get(url, params).content)
+            pages.append(data)
+            ids.extend(post['id'] for post in data['results'])
+            url, params = data['next'], {}
+        return ids, pages
+
+    def test_cursor_pages_follow_feed_order(self):
+        expected = list(
+            Post.objects.filter(status=Post.Status.PUBLISHED)
+            .order_by('-published_at', '-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+        for page_size in (1, 2, 3, 5, 20):
+            with self.subTest(page_size=page_size):
+                ids, _ = self.walk_cursor_pages(page_size)
+                self.assertEqual(ids, expected)
+
+    def test_undated_posts_come_first(self):
+        undated = {post.pk for post in self.posts if post.published_at is None}
+        # Page boundaries inside, at the end of and right after the undated posts
+        for page_size in (2, len(undated), len(undated) + 1):
+            with self.subTest(page_size=page_size):
+                ids, _ = self.walk_cursor_pages(page_size)
+                self.assertEqual(set(ids[:len(undated)]), undated)
+                self.assertEqual(len(ids), len(set(ids)))
+
+    def test_links(self):
+        _, pages = self.walk_cursor_pages(4)
+        self.assertEqual([len(page['results']) for page in pages], [4, 4, 3])
+        self.assertIn('pagination=cursor', pages[0]['next'])
+        self.assertIn('cursor=', pages[0]['next'])
+        self.assertIsNone(pages[-1]['next'])
+        # Keyset pages only go forward
+        self.assertNotIn('previous', pages[0])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/posts/', {'pagination': 'cursor', 'cursor': 'bm90IGpzb24='})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_pages_keep_search_rank(self):
+        now = timezone.now()
+        best = Post.objects.create(title_uz='Metro metro metro', content_uz='Metro bekati va metro liniyasi',
+                                   status=Post.Status.PUBLISHED, published_at=now - timedelta(days=3))
+        Post.objects.create(title_uz='Metro', content_uz='Yangi bekat', status=Post.Status.PUBLISHED,
+                            published_at=now - timedelta(days=2))
+        Post.objects.create(title_uz='Bekat', content_uz='Metro haqida', status=Post.Status.PUBLISHED,
+                            published_at=now)
+        ranked = [post['id'] for post in self.client.get('/api/posts/search/', {'q': 'metro'}).data['results']]
+        self.assertEqual(ranked[0], best.pk)
+
+        ids, url, params = [], '/api/posts/search/', {'q': 'metro', 'pagination': 'cursor', 'page_size': 1}
+        while url:
+            data = json.loads(self.client.get(url, params).content)
+            ids.extend(post['id'] for post in data['results'])
+            url, params = data['next'], {}
+        self.assertEqual(ids, ranked)
+
+    @override_settings(POSTS_CACHE_TIMEOUT=60)
+    def test_page_count_expires(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.client.get('/api/posts/', {'page_size': 5})
+        timeouts = [call.args[2] for call in cache_set.call_args_list if call.args[0].startswith(COUNT_KEY_PREFIX)]
+        self.assertEqual(timeouts, [60])
+
+
+class PostResponseCacheTests(TestCase):
+    """Cached post responses: invalidation, conditional requests, stable pages"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = PostCategory.objects.create(name='Yangiliklar', type=PostCategory.CategoryType.NEWS)
+        cls.posts = [
+            Post.objects.create(
+                title_uz=f'Sarlavha {index}',
+                category=cls.category,
+                status=Post.Status.PUBLISHED,
+                published_at=timezone.now() - timedelta(hours=index),
+            )
+            for index in range(12)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, **params):
+        response = self.client.get('/api/posts/', params)
+        return [post['title'] for post in json.loads(response.content)['results']]
+
+    def test_write_invalidates_cached_list(self):
+        self.titles()
+        with self.assertNumQueries(0):
+            self.titles()
+
+        post = self.posts[0]
+        post.title_uz = 'Yangi sarlavha'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertEqual(self.titles()[0], 'Yangi sarlavha')
+
+    def test_version_is_bumped_on_commit(self):
+        version = get_content_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.posts[1].save()
+            self.assertEqual(get_content_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_content_version(), version)
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get('/api/posts/')
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+        other_language = self.client.get('/api/posts/', {'lang': 'ru'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(other_language.status_code, 200)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/posts/')
+        cached = self.client.get('/api/posts/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_content_version()
+        # Same second as the bump, an ETag tells the versions apart
+        changed = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+    def test_cursor_pages_skip_nothing_when_posts_are_published(self):
+        first = json.loads(self.client.get('/api/posts/', {'pagination': 'cursor', 'page_size': 5}).content)
+        Post.objects.create(title_uz='Eng yangi', status=Post.Status.PUBLISHED, published_at=timezone.now())
+
+        ids = [post['id'] for post in first['results']]
+        url = first['next']
+        while url:
+            page = json.loads(self.client.get(url).content)
+            ids.extend(post['id'] for post in page['results'])
+            url = page['next']
+        # The new post is above the cursor, it shows up on a fresh first page
+        self.assertEqual(ids, [post.pk for post in self.posts])
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        query_counts = []
+        for page_size in (2, 12):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get('/api/posts/', {'page_size': page_size})
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_list_serializers_query_once(self):
+        request = Request(self.client.get('/api/posts/').wsgi_request)
+        with self.assertNumQueries(1):
+            data = PostListSerializer(
+                Post.objects.select_related('category'), many=True, context={'request': request}
+            ).data
+        self.assertEqual(len(data), len(self.posts))
+
+        with self.assertNumQueries(1):
+            rows = PostFeedSerializer(request).serialize(Post.objects.for_list('uz').values(*FEED_VALUES))
+        self.assertEqual(len(rows), len(self.posts))
+
+
+class TinyLFUCacheTests(TestCase):
+
+    def test_one_off_keys_do_not_evict_hot_keys(self):
+        detail_cache = TinyLFUCache(max_bytes=20 * (1000 + ENTRY_OVERHEAD), expected_entries=20)
+        for round_number in range(500):
+            keys = [f'hot-{(round_number + offset) % 10}' for offset in range(3)]
+            keys += [f'cold-{round_number}-{offset}' for offset in range(3)]
+            for key in keys:
+                if detail_cache.get(key) is None:
+                    detail_cache.set(key, key, 1000)
+
+        hot_keys = [key for key in detail_cache.entries if key.startswith('hot-')]
+        self.assertEqual(len(hot_keys), 10)
+        self.assertLessEqual(detail_cache.size, detail_cache.max_bytes)
+
+    def test_oversized_values_are_rejected(self):
+        detail_cache = TinyLFUCache(max_bytes=1000)
+        self.assertFalse(detail_cache.set('key', 'value', 1000))
+        self.assertIsNone(detail_cache.get('key'))
+
+
+class PostDetailCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            title_uz='Sarlavha',
+            title_ru='Заголовок',
+            content_uz='Matn',
+            status=Post.Status.PUBLISHED,
+            published_at=timezone.now(),
+        )
+
+    def setUp(self):
+        cache.clear()
+        post_detail_cache.cache.clear()
+        self.url = f'/api/posts/{self.post.slug}/'
+
+    def get_detail(self, lang='ru'):
+        return json.loads(self.client.get(self.url, {'lang': lang}).content)
+
+    def test_cached_payload_matches_serializer(self):
+        self.get_detail()
+        with self.assertNumQueries(0):
+            data = self.get_detail()
+
+        self.post.refresh_from_db()
+        request = Request(self.client.get(self.url, {'lang': 'ru'}).wsgi_request)
+        expected = PostDetailSerializer(self.post, context={'request': request}).data
+        data.pop('views_count')
+        expected.pop('views_count')
+        self.assertEqual(data, expected)
+
+    def test_padded_language_is_cached_as_normalized(self):
+        self.assertEqual(self.get_detail('ru ')['title'], 'Заголовок')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_detail('RU')['title'], 'Заголовок')
+
+    def test_views_count_includes_pending_and_flushed_views(self):
+        first = self.get_detail()['views_count']
+        view_counter.flush()
+        self.assertEqual(self.get_detail()['views_count'], first + 1)
+        self.assertEqual(self.get_detail()['views_count'], first + 2)
+
+    def test_save_invalidates_entries(self):
+        self.get_detail()
+        self.post.title_ru = 'Новый заголовок'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        self.assertEqual(self.get_detail()['title'], 'Новый заголовок')
+
+    def test_delete_invalidates_entries(self):
+        self.get_detail()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.get(pk=self.post.pk).delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@override_settings(POSTS_FEED_RENDERING='database')
+class DatabaseFeedRenderingTests(TestCase):
+    """Feeds built with json_build_object must match PostListSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = PostCategory.objects.create(name='Media', type=PostCategory.CategoryType.MEDIA,
+                                               description='Videos')
+        now = timezone.now().replace(microsecond=0)
+        for index in range(6):
+            Post.objects.create(
+                title_uz=f'Sarlavha {index}',
+                title_ru=f'Заголовок "{index}"' if index % 3 else '',
+                short_description_en='Description' if index % 2 else '',
+                image=f'post/{index}.jpg' if index % 2 else None,
+                video_file=f'post_videos/{index}.mp4' if index == 2 else None,
+                video_url='https://example.com/watch' if index == 4 else None,
+                category=category if index % 2 else None,
+                status=Post.Status.PUBLISHED,
+                # Whole seconds and microseconds are formatted differently
+                published_at=now - timedelta(hours=index, microseconds=index * 10),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def serialize(self, queryset, response):
+        request = Request(response.wsgi_request)
+        data = PostListSerializer(queryset, many=True, context={'request': request}).data
+        return json.loads(JSONRenderer().render(data))
+
+    def test_list_matches_list_serializer(self):
+        posts = Post.objects.select_related('category').order_by('-published_at', '-created_at')
+        for lang in ('uz', 'ru', 'en'):
+            with self.subTest(lang=lang):
+                response = self.client.get('/api/posts/', {'lang': lang})
+                results = json.loads(response.content)['results']
+                self.assertEqual(results, self.serialize(posts, response))
+
+    def test_category_feed_matches_list_serializer(self):
+        posts = Post.objects.filter(category__type=PostCategory.CategoryType.MEDIA).order_by(
+            '-published_at', '-created_at'
+        )
+        response = self.client.get('/api/posts/latest-videos/', {'lang': 'en'})
+        self.assertEqual(json.loads(response.content), self.serialize(posts[:4], response))
+
+
+class FeedIndexTests(TestCase):
+    """Feeds served from the feed index must match the database feeds"""
+
+    endpoints = (
+        ('/api/posts/', {'page_size': 5}),
+        ('/api/posts/', {'lang': 'ru', 'page': 2, 'page_size': 5}),
+        ('/api/posts/homepage/', {}),
+        ('/api/posts/news/', {'lang': 'en'}),
+        ('/api/posts/latest-news/', {}),
+        ('/api/posts/reports/', {}),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        categories = [
+            PostCategory.objects.create(name=f'Category {category_type}', type=category_type)
+            for category_type in PostCategory.CategoryType.values
+        ]
+        for index in range(16):
+            Post.objects.create(
+                title_uz=f'Sarlavha {index}',
+                category=categories[index % len(categories)],
+                status=Post.Status.PUBLISHED if index % 5 else Post.Status.DRAFT,
+                # Same publish time for pairs, created_at and id break the tie
+                published_at=now - timedelta(hours=index // 2) if index % 7 else None,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.backend = feed_index.backend
+
+    def tearDown(self):
+        feed_index.backend = self.backend
+
+    def get_feeds(self):
+        responses = []
+        for url, params in self.endpoints:
+            cache.clear()
+            responses.append(self.client.get(url, params).content)
+        return responses
+
+    @skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_redis_index_matches_database(self):
+        feed_index.backend = None
+        expected = self.get_feeds()
+
+        feed_index.backend = RedisFeedIndex(fakeredis.FakeRedis())
+        feed_index.backend.load()
+        self.assertEqual(self.get_feeds(), expected)
+
+    @skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_load_drops_unpublished_posts(self):
+        backend = RedisFeedIndex(fakeredis.FakeRedis())
+        backend.load()
+        post = Post.objects.filter(status=Post.Status.PUBLISHED).first()
+        Post.objects.filter(pk=post.pk).update(status=Post.Status.DRAFT)
+
+        backend.load()
+        self.assertFalse(backend.client.exists(backend.post_key(post.pk)))
+        self.assertEqual(backend.read_posts([post.pk], 'uz'), [])
+
+    @skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_writes_reach_the_index_once_committed(self):
+        feed_index.backend = backend = RedisFeedIndex(fakeredis.FakeRedis())
+        backend.load()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title_uz='Yangi', status=Post.Status.PUBLISHED, published_at=timezone.now())
+            self.assertFalse(backend.client.exists(backend.post_key(post.pk)))
+        self.assertEqual([row['id'] for row in backend.read_posts([post.pk], 'uz')], [post.pk])
+
+        key = backend.post_key(post.pk)
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                post.delete()
+                raise RuntimeError('rolled back')
+        self.assertTrue(backend.client.exists(key))
+
+    @skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_unloaded_index_is_not_loaded_in_the_request(self):
+        backend = RedisFeedIndex(fakeredis.FakeRedis())
+        with mock.patch.object(RedisFeedIndex, 'load') as load, mock.patch('threading.Thread.start'):
+            self.assertFalse(backend.is_ready())
+        load.assert_not_called()
+
+    def test_member_order_matches_feed_order(self):
+        now = timezone.now()
+        members = [
+            feed_member(2, now),
+            feed_member(10, now),
+            feed_member(3, now - timedelta(microseconds=1)),
+        ]
+        self.assertEqual(sorted(members, reverse=True), [members[1], members[0], members[2]])
+        self.assertEqual(member_id(members[1].encode()), 10)
+
+
+class ViewCounterTests(TestCase):
+    """Views are buffered by record() and applied to the posts by flush()"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(title_uz='Sarlavha', status=Post.Status.PUBLISHED, views_count=10)
+        cls.other = Post.objects.create(title_uz='Boshqa', status=Post.Status.PUBLISHED)
+
+    def make_buffer(self, store=None):
+        buffer = ViewCountBuffer(store or InMemoryViewCountStore(), flush_interval=60)
+        # No background thread, flushes are called by the tests
+        buffer._ensure_flusher = lambda: None
+        return buffer
+
+    def assert_round_trip(self, buffer):
+        self.assertEqual([buffer.record(self.post.pk) for _ in range(3)], [1, 2, 3])
+        buffer.record(self.other.pk)
+        self.assertEqual(buffer.pending(self.post.pk), 3)
+
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(buffer.pending(self.post.pk), 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 13)
+        self.assertEqual(PostViewBucket.objects.get(post=self.post).views, 3)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_increment_drain_flush(self):
+        self.assert_round_trip(self.make_buffer())
+
+    @skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_redis_increment_drain_flush(self):
+        self.assert_round_trip(self.make_buffer(RedisViewCountStore(fakeredis.FakeRedis())))
+
+    def test_failed_flush_requeues(self):
+        buffer = self.make_buffer()
+        buffer.record(self.post.pk)
+        with mock.patch('apps.posts.service.view_counter.apply_view_counts', side_effect=RuntimeError), \
+                self.assertLogs('apps.posts.service.view_counter', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending(self.post.pk), 1)
+
+    def test_flusher_survives_errors(self):
+        buffer = self.make_buffer()
+        buffer.record(self.post.pk)
+        drain = buffer.store.drain
+        buffer.store.drain = mock.Mock(side_effect=[RuntimeError('store unreachable'), drain()])
+        buffer._stopped = mock.Mock(wait=mock.Mock(side_effect=[False, False, True]))
+
+        with mock.patch('apps.posts.service.view_counter.close_old_connections'), \
+                self.assertLogs('apps.posts.service.view_counter', 'ERROR'):
+            buffer._run()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 11)
+
+
+class TrendingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.posts = [
+            Post.objects.create(
+                title_uz=f'Sarlavha {index}',
+                status=Post.Status.PUBLISHED,
+                published_at=timezone.now() - timedelta(days=30),
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def add_views(self, post, hours_ago, views):
+        PostViewBucket.objects.create(post=post, hour=self.hour - timedelta(hours=hours_ago), views=views)
+
+    def get_trending(self, **params):
+        response = self.client.get('/api/posts/trending/', params)
+        return [post['id'] for post in json.loads(response.content)]
+
+    def test_flush_fills_hourly_buckets(self):
+        for _ in range(3):
+            self.client.get(f'/api/posts/{self.posts[0].slug}/')
+        view_counter.flush()
+        bucket = PostViewBucket.objects.get(post=self.posts[0])
+        self.assertEqual((bucket.hour, bucket.views), (self.hour, 3))
+
+    def test_recent_views_outweigh_old_views(self):
+        self.add_views(self.posts[0], hours_ago=1, views=100)
+        self.add_views(self.posts[1], hours_ago=20, views=300)
+        self.add_views(self.posts[2], hours_ago=100, views=10_000)
+        update_trending_scores()
+
+        self.assertEqual(self.get_trending(), [self.posts[0].pk, self.posts[1].pk])
+        self.assertEqual(self.get_trending(window='7d')[0], self.posts[2].pk)
+        self.assertEqual(self.get_trending(window='7d', limit=1), [self.posts[2].pk])
+
+    def test_expired_buckets_are_pruned(self):
+        self.add_views(self.posts[0], hours_ago=24 * 8, views=5)
+        self.assertEqual(update_trending_scores(), {'24h': 0, '7d': 0})
+        self.assertFalse(PostViewBucket.objects.exists())
+        self.assertFalse(PostTrendingScore.objects.exists())
+
+    def test_unknown_window(self):
+        self.assertEqual(self.client.get('/api/posts/trending/', {'window': '1y'}).status_code, 400)
+
+
+class RelatedPostTests(TestCase):
+
+    texts = (
+        ('Toshkentda yangi metro bekati ochildi', 'Metro bekati qurilishi yakunlandi, yangi metro liniyasi yo‘lovchilarni kutmoqda'),
+        ('Metro liniyasi kengaytirildi', 'Toshkent metro liniyasi yangi bekatlar bilan kengaytirildi'),
+        ('Futbol terma jamoasi g‘alaba qozondi', 'Terma jamoa futbol bo‘yicha saralash o‘yinida g‘alaba qozondi'),
+        ('Futbol chempionati boshlandi', 'Chempionat futbol jamoasi uchun muhim o‘yinlar bilan boshlandi'),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.posts = [
+            Post.objects.create(title_uz=title, content_uz=content, status=Post.Status.PUBLISHED,
+                                published_at=timezone.now())
+            for title, content in cls.texts
+        ]
+        # Older than the overlap an incremental run re-reads
+        Post.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(POSTS_RELATED_INDEX_DIR=directory.name))
+
+    def get_related(self, post):
+        # The post, then its related posts
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/posts/{post.slug}/related/')
+        return [item['id'] for item in json.loads(response.content)]
+
+    def test_related_posts_share_topic(self):
+        self.assertEqual(update_related_posts(full=True), len(self.posts))
+        self.assertEqual(self.get_related(self.posts[0])[0], self.posts[1].pk)
+        self.assertEqual(self.get_related(self.posts[2])[0], self.posts[3].pk)
+        self.assertLessEqual(RelatedPost.objects.filter(post=self.posts[0]).count(), RELATED_POSTS_LIMIT)
+
+    def test_incremental_update_adds_new_posts(self):
+        update_related_posts(full=True)
+        post = Post.objects.create(title_uz='Yangi metro bekati', content_uz='Metro bekati yo‘lovchilar uchun ochildi',
+                                   status=Post.Status.PUBLISHED, published_at=timezone.now())
+        self.assertGreaterEqual(update_related_posts(), 1)
+        self.assertIn(self.posts[0].pk, self.get_related(post))
+        self.assertIn(post.pk, self.get_related(self.posts[0]))
+
+    def test_incremental_update_transforms_only_changed_posts(self):
+        update_related_posts(full=True)
+        post = Post.objects.create(title_uz='Futbol jamoasi', content_uz='Futbol jamoasi o‘yinida g‘alaba qozondi',
+                                   status=Post.Status.PUBLISHED, published_at=timezone.now())
+        with mock.patch.object(TfidfVectorizer, 'fit', side_effect=AssertionError('refitted')), \
+                mock.patch.object(TfidfVectorizer, 'transform', autospec=True,
+                                  side_effect=TfidfVectorizer.transform) as transform:
+            update_related_posts()
+        self.assertEqual({len(call.args[1]) for call in transform.call_args_list}, {1})
+        self.assertIn(self.posts[2].pk, self.get_related(post))
+
+    def test_posts_without_neighbours_are_not_rescored(self):
+        update_related_posts(full=True)
+        Post.objects.create(title_uz='Ob-havo', content_uz='Ertaga yomg‘ir yog‘adi',
+                            status=Post.Status.PUBLISHED, published_at=timezone.now())
+        self.assertEqual(update_related_posts(), 1)
+        self.assertFalse(RelatedPost.objects.filter(post__title_uz='Ob-havo').exists())
+        Post.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(update_related_posts(), 0)
+
+    def test_unpublished_posts_leave_related_lists(self):
+        update_related_posts(full=True)
+        self.assertIn(self.posts[1].pk, self.get_related(self.posts[0]))
+        Post.objects.filter(pk=self.posts[1].pk).update(status=Post.Status.DRAFT)
+        update_related_posts()
+        self.assertNotIn(self.posts[1].pk, self.get_related(self.posts[0]))
+
+    def test_unknown_and_unpublished_slugs(self):
+        draft = Post.objects.create(title_uz='Qoralama', status=Post.Status.DRAFT)
+        for slug in ('missing', draft.slug):
+            with self.subTest(slug=slug):
+                self.assertEqual(self.client.get(f'/api/posts/{slug}/related/').status_code, 404)
+
+
+class DuplicatePostTests(TestCase):
+
+    story = (
+        'Toshkent shahrida yangi metro liniyasi ochildi. Yangi liniya o‘n ikki bekatdan iborat bo‘lib, '
+        'shaharning janubiy tumanlarini markaz bilan bog‘laydi. Loyiha uch yil davomida amalga oshirildi '
+        'va unga xorijiy investitsiyalar jalb qilindi. Yo‘lovchilar uchun yo‘l haqi o‘zgarmaydi.'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.original = Post.objects.create(title_uz='Yangi metro liniyasi', content_uz=cls.story)
+            cls.other = Post.objects.create(
+                title_uz='Futbol', content_uz='Terma jamoa saralash bosqichida g‘alaba qozondi va finalga chiqdi.'
+            )
+
+    def test_reposted_copy_is_found(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            copy = Post.objects.create(
+                title_uz='Yangi metro liniyasi', content_uz=self.story.replace('uch yil', 'uch yildan ortiq')
+            )
+        duplicates = find_duplicates(copy)
+        self.assertEqual([post.pk for post, _ in duplicates], [self.original.pk])
+        self.assertGreaterEqual(duplicates[0][1], 0.8)
+
+    def test_candidates_sharing_most_bands_are_verified_first(self):
+        signature = PostSignature.objects.get(post=self.original)
+        noise = [Post.objects.create(title_uz=f'Shovqin {index}') for index in range(5)]
+        PostSignature.objects.bulk_create([
+            PostSignature(post=post, minhash=bytes(len(signature.minhash)), bands=[signature.bands[0], index])
+            for index, post in enumerate(noise)
+        ])
+        # Rewritten, the original's row comes after the noise in the table
+        PostSignature.objects.filter(post=self.original).update(bands=signature.bands)
+
+        copy = Post(pk=0, title_uz='Yangi metro liniyasi', content_uz=self.story)
+        with mock.patch('apps.posts.service.duplicates.MAX_CANDIDATES', 1):
+            self.assertEqual([post.pk for post, _ in find_duplicates(copy)], [self.original.pk])
+
+    def test_cyrillic_copy_is_found(self):
+        copy = Post(pk=0, title_uz='Янги метро линияси', content_uz=self.story.replace('Toshkent', 'Тошкент'))
+        self.assertEqual([post.pk for post, _ in find_duplicates(copy)], [self.original.pk])
+
+    def test_unrelated_posts_are_not_flagged(self):
+        self.assertEqual(find_duplicates(self.other), [])
+
+    def test_minhash_matches_exact_modular_hashing(self):
+        # Shingle hashes plus values wider than 32 bits, which must not wrap either
+        hashes = np.append(shingles(self.story), np.array([2 ** 32 + 7, 2 ** 63 + 5], dtype=np.uint64))
+        expected = [
+            min((a * x + b) % int(_PRIME) for x in hashes.tolist())
+            for a, b in zip(_A.tolist(), _B.tolist())
+        ]
+        self.assertEqual(minhash(hashes).tolist(), expected)
+
+    def test_estimate_is_close_to_exact_jaccard(self):
+        words = [f'soz{index}' for index in range(600)]
+        for start in (0, 100, 200, 300):
+            with self.subTest(start=start):
+                first, second = shingles(' '.join(words[:300])), shingles(' '.join(words[start:start + 300]))
+                exact = len(np.intersect1d(first, second)) / len(np.union1d(first, second))
+                estimate = similarity(minhash(first), minhash(second))
+                # 128 permutations: standard error below 0.045
+                self.assertAlmostEqual(estimate, exact, delta=0.15)
+
+    def test_backfill(self):
+        PostSignature.objects.all().delete()
+        self.assertEqual(backfill_signatures(Post.objects.all()), 2)
+        self.assertEqual(backfill_signatures(Post.objects.all()), 2)
+        self.assertEqual(PostSignature.objects.count(), 2)
+
+
+class SemanticSearchTests(TestCase):
+
+    economy = ('Iqtisodiyot va bozor narxlari', 'Экономика и рыночные цены')
+    sport = ('Musobaqa va jamoa natijalari', 'Соревнование и результаты команды')
+
+    @classmethod
+    def setUpTestData(cls):
+        for uz, ru in (cls.economy, cls.sport) * 3:
+            Post.objects.create(title_uz=uz, content_uz=uz, title_ru=ru, content_ru=ru,
+                                status=Post.Status.PUBLISHED, published_at=timezone.now())
+        cls.uzbek_only = Post.objects.create(title_uz='Iqtisodiyot o‘sishi', content_uz='Bozor narxlari va iqtisodiyot',
+                                             status=Post.Status.PUBLISHED, published_at=timezone.now())
+        Post.objects.create(title_uz='Musobaqa', content_uz='Jamoa natijalari va musobaqa',
+                            status=Post.Status.PUBLISHED, published_at=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(POSTS_SEMANTIC_INDEX_DIR=directory.name))
+
+    def search(self, query):
+        response = self.client.get('/api/posts/search/', {'q': query, 'mode': 'semantic', 'lang': 'ru'})
+        return [post['id'] for post in response.data['results']]
+
+    def test_russian_query_finds_uzbek_only_post(self):
+        build_index(dimensions=2)
+        self.assertIn(self.uzbek_only.pk, self.search('экономика'))
+        self.assertNotIn(self.uzbek_only.pk, self.search('соревнование'))
+
+    def test_published_posts_are_folded_in(self):
+        build_index(dimensions=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title_uz='Iqtisodiyot', content_uz='Bozor narxlari',
+                                       status=Post.Status.PUBLISHED, published_at=timezone.now())
+        self.assertIn(post.pk, self.search('экономика'))
+
+        post.status = Post.Status.DRAFT
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertNotIn(post.pk, self.search('экономика'))
+
+    def test_failed_fold_in_does_not_fail_the_save(self):
+        build_index(dimensions=2)
+        with mock.patch('apps.posts.service.semantic._fold_in', side_effect=RuntimeError('disk full')), \
+                self.assertLogs(level='ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title_uz='Iqtisodiyot', content_uz='Bozor narxlari',
+                                       status=Post.Status.PUBLISHED, published_at=timezone.now())
+        self.assertTrue(PostSignature.objects.filter(post=post).exists())
+
+    def test_keyword_search_without_index(self):
+        self.assertIn(self.uzbek_only.pk, self.search('iqtisodiyot'))
+
+    def test_cursor_pages_keep_semantic_rank(self):
+        build_index(dimensions=2)
+        ranked = self.search('экономика')
+        ids, url = [], '/api/posts/search/'
+        params = {'q': 'экономика', 'mode': 'semantic', 'lang': 'ru', 'pagination': 'cursor', 'page_size': 2}
+        while url:
+            data = json.loads(self.client.get(url, params).content)
+            ids.extend(post['id'] for post in data['results'])
+            url, params = data['next'], {}
+        self.assertEqual(ids, ranked)
+
+    def test_rebuild_keeps_previous_build(self):
+        build_index(dimensions=2)
+        first = current_build()
+        build_index(dimensions=2)
+        second = current_build()
+        build_index(dimensions=2)
+
+        builds = {path.name for path in index_dir().glob('build-*')}
+        self.assertEqual(builds, {second, current_build()})
+        self.assertNotIn(first, builds)
+
+    def test_keyword_search_when_build_is_removed(self):
+        (index_dir() / CURRENT_FILE).write_text('build-0')
+        self.assertIn(self.uzbek_only.pk, self.search('iqtisodiyot'))
+
+
+class SearchCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(title_uz='Prezident qarori', content_uz='Prezident yangi qaror imzoladi',
+                                       status=Post.Status.PUBLISHED, published_at=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        reset_search_cache_stats()
+        popular_queries.counts.clear()
+
+    def search(self, query, **params):
+        return self.client.get('/api/posts/search/', {'q': query, **params})
+
+    def test_normalized_queries_share_entry(self):
+        self.assertEqual(self.search('prezident')['X-Search-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.search('  Prezident ')
+        self.assertEqual(response['X-Search-Cache'], 'HIT')
+        self.assertEqual([post['id'] for post in response.data['results']], [self.post.pk])
+
+        stats = search_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+        self.assertGreater(stats['saved_seconds'], 0)
+
+    def test_semantic_mode_ignores_script(self):
+        self.search('Prezident', mode='semantic')
+        self.assertEqual(self.search('президент', mode='semantic')['X-Search-Cache'], 'HIT')
+        # PostgreSQL full-text search does not fold scripts
+        self.assertEqual(self.search('президент')['X-Search-Cache'], 'MISS')
+
+    def test_publish_invalidates(self):
+        self.search('prezident')
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Post.objects.create(title_uz='Prezident tashrifi', status=Post.Status.PUBLISHED,
+                                        published_at=timezone.now())
+        response = self.search('prezident')
+        self.assertEqual(response['X-Search-Cache'], 'MISS')
+        self.assertIn(other.pk, [post['id'] for post in response.data['results']])
+
+    def test_draft_saves_keep_cache(self):
+        self.search('prezident')
+        Post.objects.create(title_uz='Prezident', status=Post.Status.DRAFT)
+        self.assertEqual(self.search('prezident')['X-Search-Cache'], 'HIT')
+
+    def test_prewarm_popular_queries(self):
+        for _ in range(3):
+            self.search('qaror')
+        self.assertIn('qaror', popular_queries.top(1)[0][0])
+        self.post.save()
+
+        self.assertGreaterEqual(prewarm_search_cache(limit=1), 1)
+        self.assertEqual(self.search('qaror')['X-Search-Cache'], 'HIT')
+
+    def test_space_saving_keeps_frequent_items(self):
+        counter = SpaceSavingCounter(capacity=3)
+        for index in range(100):
+            counter.add('frequent')
+            counter.add(f'rare-{index}')
+        self.assertEqual(counter.top(1)[0], ('frequent', 100))
+        self.assertEqual(len(counter.counts), 3)
+
+
+class InvertedIndexSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.budget = Post.objects.create(
+            title_uz='Budjet qabul qilindi', content_uz='Davlat budjeti va soliq',
+            title_ru='Бюджет принят', status=Post.Status.PUBLISHED, published_at=timezone.now(),
+        )
+        cls.tax = Post.objects.create(
+            title_uz='Soliq islohoti', content_uz='Yangi soliq stavkalari, soliq imtiyozlari va budjet',
+            status=Post.Status.PUBLISHED, published_at=timezone.now(),
+        )
+        cls.draft = Post.objects.create(title_uz='Budjet loyihasi', status=Post.Status.DRAFT)
+
+    def setUp(self):
+        cache.clear()
+        self.backend = backend = InvertedIndexSearchBackend()
+        backend.build()
+        for target in ('apps.posts.views.search_backend', 'apps.posts.signals.search_backend'):
+            patcher = mock.patch(target, backend)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def search(self, query, **params):
+        response = self.client.get('/api/posts/search/', {'q': query, **params})
+        return [post['id'] for post in json.loads(response.content)['results']]
+
+    def test_bm25_ranking(self):
+        self.assertEqual(self.search('soliq'), [self.tax.pk, self.budget.pk])
+        self.assertEqual(self.search('budjet'), [self.budget.pk, self.tax.pk])
+
+    @mock.patch.object(feed_index, 'backend', None)
+    def test_cyrillic_query_and_cards(self):
+        self.search('budjet')
+        # The index ranks the posts, only the cards of the page are read
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/posts/search/', {'q': 'бюджет', 'lang': 'ru'})
+        results = json.loads(response.content)['results']
+        self.assertEqual([post['id'] for post in results], [self.budget.pk])
+        self.assertEqual(results[0]['title'], 'Бюджет принят')
+
+    def test_highlighted_search_uses_the_database(self):
+        response = self.client.get('/api/posts/search/', {'q': 'soliq', 'highlight': 'true'})
+        results = json.loads(response.content)['results']
+        self.assertEqual({post['id'] for post in results}, {self.tax.pk, self.budget.pk})
+        self.assertIn('<mark>', results[0]['headline'])
+
+    def test_saves_and_deletes_update_index(self):
+        self.search('budjet')
+        self.draft.status = Post.Status.PUBLISHED
+        self.draft.save()
+        self.assertIn(self.draft.pk, self.search('loyihasi'))
+
+        self.tax.status = Post.Status.DRAFT
+        self.tax.save()
+        self.assertNotIn(self.tax.pk, self.search('soliq'))
+
+        Post.objects.get(pk=self.budget.pk).delete()
+        self.assertEqual(self.search('budjet'), [self.draft.pk])
+
+    def test_writes_of_other_workers_are_caught_up(self):
+        self.search('budjet')
+        # Update without the post_save signal, only the versions change
+        Post.objects.filter(pk=self.tax.pk).update(status=Post.Status.DRAFT)
+        Post.objects.filter(pk=self.draft.pk).update(status=Post.Status.PUBLISHED, updated_at=timezone.now())
+        bump_search_version()
+        bump_content_version()
+        self.assertEqual(set(self.search('budjet')), {self.budget.pk, self.draft.pk})
+
+    def test_database_answers_until_the_index_is_built(self):
+        backend = InvertedIndexSearchBackend()
+        with mock.patch('apps.posts.views.search_backend', backend), \
+                mock.patch.object(InvertedIndexSearchBackend, '_ensure_builder') as ensure_builder:
+            self.assertEqual(self.search('soliq'), [self.tax.pk, self.budget.pk])
+        ensure_builder.assert_called_once()
+
+    def test_snapshot_is_not_changed_by_writes(self):
+        snapshot = self.backend.snapshot
+        self.draft.status = Post.Status.PUBLISHED
+        self.draft.save()
+        self.assertEqual(snapshot.search('loyihasi'), [])
+        self.assertEqual(self.backend.snapshot.search('loyihasi'), [self.draft.pk])
+
+    def test_compaction_renumbers_documents(self):
+        index = LanguageIndex()
+        for round_number in range(10):
+            for post_id in range(20):
+                index.add(post_id, ['common', f'post{post_id}'] + ['round'] * round_number)
+        snapshot = index.snapshot()
+        post_ids, scores = snapshot.score(['common'])
+        self.assertEqual(sorted(post_ids.tolist()), list(range(20)))
+        self.assertEqual(snapshot.score(['post7'])[0].tolist(), [7])
+        # Dead documents are dropped from the per-document arrays, not only from the postings
+        self.assertLessEqual(len(index.doc_post_ids), 1 + len(index) / (1 - COMPACT_RATIO) + 1)
+        self.assertEqual(len(index.doc_post_ids), len(index.doc_lengths))
+        self.assertEqual(len(index.doc_post_ids), len(index.live))
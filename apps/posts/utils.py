@@ -0,0 +1,25 @@
+SUPPORTED_LANGUAGES = ("uz", "ru", "en")
+DEFAULT_LANGUAGE = "uz"
+
+# Fallback chain used when a translation is missing: uz -> ru -> en
+LANGUAGE_FALLBACK_CHAIN = ("uz", "ru", "en")
+
+
+def normalize_language(lang):
+    """
+    Normalize a `lang` query value to one of the supported languages.
+
+    Unknown values fall back to Uzbek, which is exactly what the serializers
+    end up rendering for them, so both map to the same cache entries.
+    """
+    lang = (lang or DEFAULT_LANGUAGE).strip().lower()
+    if lang in SUPPORTED_LANGUAGES:
+        return lang
+    return DEFAULT_LANGUAGE
+
+
+def get_request_language(request):
+    """Get normalized language from the request query params, default to 'uz'"""
+    if request is None:
+        return DEFAULT_LANGUAGE
+    return normalize_language(request.query_params.get('lang'))
@@ -1,24 +1,54 @@
-from django.db.models import Q, F
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordDistance
+from django.db.models import Case, F, IntegerField, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils.functional import cached_property
 from drf_spectacular.utils import extend_schema
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 
+from apps.common.utils.text import normalize_script
 from apps.posts.models import Post, PostCategory
+from apps.posts.models.managers import JSON_CARD_FIELD
+from apps.posts.pagination import PostCursorPagination, PostPagination, get_pagination_class
+from apps.posts.search import search_backend
+from apps.posts.search.postgres import PostgresSearchBackend
 from apps.posts.serializers import (
-    PostListSerializer,
-    PostDetailSerializer,
+    FEED_VALUES,
     PostCategorySerializer,
+    PostDetailSerializer,
+    PostFeedSerializer,
+    PostListSerializer,
+)
+from apps.posts.service import cache_response
+from apps.posts.service.cards import CardRenderer, absolute_media_urls, card_response
+from apps.posts.service.detail_cache import DetailEntry, post_detail_cache
+from apps.posts.service.feed_index import feed_index
+from apps.posts.service.search import get_headlines
+from apps.posts.service.search_cache import cache_search
+from apps.posts.service.semantic import semantic_search
+from apps.posts.service.trending import DEFAULT_TRENDING_WINDOW, TRENDING_WINDOWS
+from apps.posts.service.view_counter import view_counter
+from apps.posts.utils import LANGUAGE_FALLBACK_CHAIN, get_request_language
+
+
+# Homepage blocks: (response key, category type, number of posts)
+HOMEPAGE_BLOCKS = (
+    ('latest_news', PostCategory.CategoryType.NEWS, 15),
+    ('latest_announcements', PostCategory.CategoryType.ANNOUNCEMENT, 4),
+    ('latest_videos', PostCategory.CategoryType.MEDIA, 4),
 )
 
+# Autocomplete: trigram matching needs at least a few characters
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
 
-class PostPagination(PageNumberPagination):
-    """Pagination for posts"""
-    page_size = 12
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+TRENDING_DEFAULT_LIMIT = 10
+TRENDING_MAX_LIMIT = 50
 
 
 @extend_schema(tags=["Posts"])
@@ -36,117 +66,287 @@ class PostViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     pagination_class = PostPagination
 
+    @property
+    def paginator(self):
+        """Page-number or keyset pagination, selected with ?pagination=page|cursor"""
+        if not hasattr(self, '_paginator'):
+            self._paginator = get_pagination_class(self.request)()
+        return self._paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            return queryset
+        lang = get_request_language(self.request)
+        if self.action == 'search':
+            # List rows only need one translation and no article bodies
+            return queryset.for_list(lang).values(*FEED_VALUES)
+        # Feeds splice pre-rendered cards
+        if self.json_media_urls is not None:
+            return queryset.for_json(lang, self.json_media_urls)
+        return queryset.for_cards(lang)
+
+    @cached_property
+    def json_media_urls(self):
+        """Media base URLs when feed cards are built by PostgreSQL, else None"""
+        if settings.POSTS_FEED_RENDERING != 'database':
+            return None
+        # SQL can only prepend a base URL, which needs local storage
+        return absolute_media_urls(self.request)
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return PostDetailSerializer
         return PostListSerializer
 
+    def serialize_feed(self, rows):
+        """Serialize list rows with the fast feed serializer"""
+        return PostFeedSerializer(self.request).serialize(rows)
+
+    def get_feed_source(self, category_type=None):
+        """Feed index sequence of a feed, None when it has to come from the database"""
+        # The index holds stored cards in page order, cursors need the table
+        if self.json_media_urls is not None or isinstance(self.paginator, PostCursorPagination):
+            return None
+        return feed_index.source(get_request_language(self.request), category_type)
+
+    def get_feed(self, category_type=None):
+        """Card rows of published posts, of one category type if given"""
+        source = self.get_feed_source(category_type)
+        if source is not None:
+            return source
+        queryset = self.filter_queryset(self.get_queryset())
+        if category_type is not None:
+            queryset = queryset.filter(category_type=category_type)
+        return queryset
+
+    def get_card_renderer(self):
+        field = JSON_CARD_FIELD if self.json_media_urls is not None else None
+        return CardRenderer(self.request, get_request_language(self.request), field=field)
+
+    def feed_response(self, queryset):
+        """Paginate a feed queryset and splice its cards into the response"""
+        renderer = self.get_card_renderer()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            envelope = self.get_paginated_response([]).data
+            return card_response(renderer.render_page(envelope, page))
+        return card_response(renderer.render_list(list(queryset)))
+
+    def latest_response(self, queryset):
+        """Splice the cards of a sliced feed queryset into the response"""
+        return card_response(self.get_card_renderer().render_list(list(queryset)))
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return self.feed_response(self.get_feed())
+
     def retrieve(self, request, *args, **kwargs):
         """Get single post and increment view count"""
-        instance = self.get_object()
-
-        # Increment view count
-        Post.objects.filter(pk=instance.pk).update(
-            views_count=F('views_count') + 1
+        version, epoch = post_detail_cache.get_state()
+        key = post_detail_cache.build_key(
+            request, kwargs[self.lookup_field], get_request_language(request)
         )
-        instance.refresh_from_db()
 
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        entry = post_detail_cache.get(key, version)
+        if entry is not None and entry.epoch != epoch:
+            # Views were flushed since the entry was stored, refresh the base count
+            views_count = Post.objects.filter(pk=entry.post_id).values_list('views_count', flat=True).first()
+            if views_count is None:
+                entry = None
+            else:
+                entry.views_count, entry.epoch = views_count, epoch
+
+        if entry is None:
+            instance = self.get_object()
+            data = self.get_serializer(instance).data
+            del data['views_count']
+            entry = DetailEntry(
+                post_id=instance.pk,
+                body=JSONRenderer().render(data)[:-1],
+                views_count=instance.views_count,
+                version=version,
+                epoch=epoch,
+            )
+            post_detail_cache.set(key, entry)
+
+        # Buffer the view, it is written to the database by the flusher
+        pending_views = view_counter.record(entry.post_id)
+        return card_response(b'%s,"views_count":%d}' % (entry.body, entry.views_count + pending_views))
+
+    @action(detail=True, methods=['get'], url_path='related')
+    def related(self, request, slug=None):
+        """Posts most similar to this one, precomputed by the related posts job"""
+        # Unknown and unpublished posts are a 404, like the other post actions
+        post = self.get_object()
+        queryset = self.get_queryset().filter(related_to__post=post['id']).order_by('related_to__rank')
+
+        return self.latest_response(queryset)
+
+    @action(detail=False, methods=['get'], url_path='homepage')
+    @cache_response
+    def homepage(self, request):
+        """Get latest news, announcements and videos for homepage in one response"""
+        sources = [
+            (key, self.get_feed_source(category_type), limit)
+            for key, category_type, limit in HOMEPAGE_BLOCKS
+        ]
+        if all(source is not None for _, source, _ in sources):
+            return card_response(self.get_card_renderer().render_object(
+                (key, source[:limit]) for key, source, limit in sources
+            ))
+
+        limits = [
+            When(category_type=category_type, then=Value(limit))
+            for _, category_type, limit in HOMEPAGE_BLOCKS
+        ]
+
+        # Number rows per category type and keep the top N of each block
+        queryset = self.get_queryset().filter(
+            category_type__in=[category_type for _, category_type, _ in HOMEPAGE_BLOCKS]
+        ).annotate(
+            block_position=Window(
+                expression=RowNumber(),
+                partition_by=F('category_type'),
+                order_by=[F('published_at').desc(), F('created_at').desc()],
+            ),
+            block_limit=Case(*limits, output_field=IntegerField()),
+        ).filter(block_position__lte=F('block_limit'))
+
+        posts_by_type = {category_type: [] for _, category_type, _ in HOMEPAGE_BLOCKS}
+        for row in queryset:
+            posts_by_type[row['category_type']].append(row)
+
+        return card_response(self.get_card_renderer().render_object(
+            (key, posts_by_type[category_type])
+            for key, category_type, _ in HOMEPAGE_BLOCKS
+        ))
 
     @action(detail=False, methods=['get'], url_path='news')
+    @cache_response
     def news(self, request):
         """Get all news posts"""
-        queryset = self.get_queryset().filter(
-            category__type=PostCategory.CategoryType.NEWS
-        )
+        queryset = self.get_feed(PostCategory.CategoryType.NEWS)
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.feed_response(queryset)
 
     @action(detail=False, methods=['get'], url_path='latest-news')
+    @cache_response
     def latest_news(self, request):
         """Get latest news for homepage"""
-        queryset = self.get_queryset().filter(
-            category__type=PostCategory.CategoryType.NEWS
-        )[:15]
+        queryset = self.get_feed(PostCategory.CategoryType.NEWS)[:15]
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.latest_response(queryset)
 
     @action(detail=False, methods=['get'], url_path='announcements')
+    @cache_response
     def announcements(self, request):
         """Get all official announcements"""
-        queryset = self.get_queryset().filter(
-            category__type=PostCategory.CategoryType.ANNOUNCEMENT
-        )
+        queryset = self.get_feed(PostCategory.CategoryType.ANNOUNCEMENT)
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.feed_response(queryset)
 
     @action(detail=False, methods=['get'], url_path='latest-announcements')
+    @cache_response
     def latest_announcements(self, request):
         """Get latest announcements for homepage"""
-        queryset = self.get_queryset().filter(
-            category__type=PostCategory.CategoryType.ANNOUNCEMENT
-        )[:4]
+        queryset = self.get_feed(PostCategory.CategoryType.ANNOUNCEMENT)[:4]
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.latest_response(queryset)
 
     @action(detail=False, methods=['get'], url_path='media')
+    @cache_response
     def media(self, request):
         """Get all media/video posts"""
-        queryset = self.get_queryset().filter(
-            category__type=PostCategory.CategoryType.MEDIA
-        )
+        queryset = self.get_feed(PostCategory.CategoryType.MEDIA)
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.feed_response(queryset)
 
     @action(detail=False, methods=['get'], url_path='latest-videos')
+    @cache_response
     def latest_videos(self, request):
         """Get latest videos for homepage"""
-        queryset = self.get_queryset().filter(
-            category__type=PostCategory.CategoryType.MEDIA
-        )[:4]
+        queryset = self.get_feed(PostCategory.CategoryType.MEDIA)[:4]
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.latest_response(queryset)
 
     @action(detail=False, methods=['get'], url_path='reports')
+    @cache_response
     def reports(self, request):
         """Get all reports"""
-        queryset = self.get_queryset().filter(
-            category__type=PostCategory.CategoryType.REPORT
-        )
-
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        queryset = self.get_feed(PostCategory.CategoryType.REPORT)
+
+        return self.feed_response(queryset)
+
+    @action(detail=False, methods=['get'], url_path='trending')
+    def trending(self, request):
+        """
+        Most read posts of the last `window` (24h or 7d), recent views weigh more.
+        Returns up to `limit` (default 10, max 50) posts, scores are refreshed periodically.
+        """
+        window = request.query_params.get('window', DEFAULT_TRENDING_WINDOW)
+        if window not in TRENDING_WINDOWS:
+            return Response(
+                {"detail": f"Unknown window, expected one of: {', '.join(TRENDING_WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        try:
+            limit = min(int(request.query_params.get('limit', TRENDING_DEFAULT_LIMIT)), TRENDING_MAX_LIMIT)
+        except ValueError:
+            limit = TRENDING_DEFAULT_LIMIT
+
+        # Not cached per content version: scores change without post writes
+        queryset = self.get_queryset().filter(trending_scores__window=window).order_by(
+            '-trending_scores__score', '-id'
+        )[:max(limit, 1)]
+
+        return self.latest_response(queryset)
+
+    @action(detail=False, methods=['get'], url_path='suggest')
+    @cache_response(vary_on=('q', 'limit'))
+    def suggest(self, request):
+        """
+        Typo-tolerant title autocomplete, works with Latin and Cyrillic input.
+        Returns up to `limit` (default 8, max 20) posts as id/title/slug.
+        """
+        query = normalize_script(request.query_params.get('q', ''))
+        if len(query) < SUGGEST_MIN_LENGTH:
+            return Response([])
+
+        try:
+            limit = min(int(request.query_params.get('limit', SUGGEST_DEFAULT_LIMIT)), SUGGEST_MAX_LIMIT)
+        except ValueError:
+            limit = SUGGEST_DEFAULT_LIMIT
+
+        rows = Post.objects.filter(
+            status=Post.Status.PUBLISHED,
+            search_title__trigram_word_similar=query,
+        ).annotate(
+            distance=TrigramWordDistance(query, 'search_title'),
+        ).order_by('distance', '-published_at').values(
+            'id', 'slug', 'title_uz', 'title_ru', 'title_en',
+        )[:max(limit, 1)]
+
+        lang = get_request_language(request)
+        languages = [lang, *LANGUAGE_FALLBACK_CHAIN]
+        return Response([
+            {
+                'id': row['id'],
+                'title': next((row[f'title_{code}'] for code in languages if row[f'title_{code}']), "Untitled"),
+                'slug': row['slug'],
+            }
+            for row in rows
+        ])
 
     @action(detail=False, methods=['get'], url_path='search')
+    @cache_search
     def search(self, request):
-        """Search posts by title or description in all languages"""
+        """
+        Full-text search posts in all languages, best matches first.
+        Pass highlight=true to get a `headline` snippet for each result.
+        Pass mode=semantic to match by meaning across languages instead of keywords.
+        """
         query = request.query_params.get('q', '')
 
         if not query:
@@ -155,26 +355,71 @@ class PostViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Search across all language fields
-        queryset = self.get_queryset().filter(
-            Q(title_uz__icontains=query) |
-            Q(title_ru__icontains=query) |
-            Q(title_en__icontains=query) |
-            Q(short_description_uz__icontains=query) |
-            Q(short_description_ru__icontains=query) |
-            Q(short_description_en__icontains=query) |
-            Q(content_uz__icontains=query) |
-            Q(content_ru__icontains=query) |
-            Q(content_en__icontains=query)
-        )
+        highlight = request.query_params.get('highlight', '').lower() in ('1', 'true')
+        # The database answers highlighted searches of backends without headlines
+        use_backend = search_backend.supports_headlines or not highlight
+
+        queryset = None
+        if request.query_params.get('mode') == 'semantic':
+            queryset = self._semantic_search(query)
+        elif search_backend.renders_cards and use_backend and not isinstance(self.paginator, PostCursorPagination):
+            post_ids = search_backend.search(None, query)
+            if post_ids is not None:
+                return self._card_search_response(post_ids)
+        if queryset is None:
+            # Cursor pages need a queryset, which only the database backend returns,
+            # and it answers while an in-process index is still loading
+            backend = search_backend if use_backend and not search_backend.renders_cards else PostgresSearchBackend()
+            queryset = backend.search(self.get_queryset(), query)
 
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            data = self.serialize_feed(page)
+            data = self._with_headlines(data, query) if highlight else data
+            return self.get_paginated_response(data)
+
+        data = self.serialize_feed(queryset)
+        data = self._with_headlines(data, query) if highlight else data
+        return Response(data)
+
+    def _semantic_search(self, query):
+        """Published posts closest to the query in the semantic index, None without an index"""
+        matches = semantic_search(query)
+        if matches is None:
+            return None
+        ranks = [When(pk=post_id, then=Value(rank)) for rank, (post_id, _) in enumerate(matches)]
+        return self.get_queryset().filter(pk__in=[post_id for post_id, _ in matches]).annotate(
+            semantic_rank=Case(*ranks, output_field=IntegerField()),
+        ).order_by('semantic_rank')
+
+    def _card_search_response(self, post_ids):
+        """Paginate ranked post ids and splice the stored cards of the page"""
+        lang = get_request_language(self.request)
+        page = self.paginate_queryset(post_ids)
+        page_ids = post_ids if page is None else page
+
+        rows = feed_index.posts(page_ids, lang)
+        if rows is None:
+            cards = {
+                row['id']: row
+                for row in Post.objects.filter(pk__in=page_ids, status=Post.Status.PUBLISHED).for_cards(lang)
+            }
+            rows = [cards[post_id] for post_id in page_ids if post_id in cards]
+
+        renderer = CardRenderer(self.request, lang)
+        if page is not None:
+            envelope = self.get_paginated_response([]).data
+            return card_response(renderer.render_page(envelope, rows))
+        return card_response(renderer.render_list(rows))
+
+    def _with_headlines(self, data, query):
+        """Attach highlighted snippets in the requested language to search results"""
+        headlines = get_headlines(
+            [item['id'] for item in data], query, get_request_language(self.request)
+        )
+        for item in data:
+            item['headline'] = headlines.get(item['id'], '')
+        return data
 
 
 @extend_schema(tags=["Categories"])
@@ -184,3 +429,7 @@ class PostCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PostCategorySerializer
     permission_classes = [AllowAny]
     pagination_class = None
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
@@ -3,49 +3,65 @@ import traceback
 
 from rest_framework.views import exception_handler
 
+from apps.logs.fingerprints import exception_tracker
+
 logger = logging.getLogger(__name__)
 
 
 def custom_exception_handler(exc, context):
     """
-    Custom exception handler that logs all exceptions.
+    Custom exception handler that logs exceptions by fingerprint.
+
+    Every exception is counted under its fingerprint (type, view and stack,
+    see apps.logs.fingerprints). Only the first occurrences of a fingerprint
+    per hour are logged: server errors with their full traceback, client
+    errors (validation, permission, throttling) as one line. Later ones only
+    increment the counter.
     """
     # Call REST framework's default exception handler first
     response = exception_handler(exc, context)
 
-    # Log the exception
     view = context.get("view")
     request = context.get("request")
+    status_code = response.status_code if response is not None else 500
+    view_name = view.__class__.__name__ if view else "Unknown"
+    path = request.path if request else "Unknown"
+    exc_message = str(exc) if exc else "Unknown error"
+
+    try:
+        fingerprint, sample = exception_tracker.record(exc, view_name, status_code, exc_message, path)
+    except Exception:
+        logger.exception("[EXCEPTION] Failed to fingerprint %s", type(exc).__name__)
+        fingerprint, sample = None, True
+    if not sample or status_code < 400:
+        return response
+
     user_id = None
     if request and hasattr(request, "user") and request.user.is_authenticated:
         user_id = request.user.pk
 
-    # Get exception details
-    exc_type = type(exc).__name__
-    exc_message = str(exc) if exc else "Unknown error"
-    view_name = view.__class__.__name__ if view else "Unknown"
-    path = request.path if request else "Unknown"
-
     # Build log message
+    exc_type = type(exc).__name__
     log_message = f"[EXCEPTION] {exc_type} in {view_name} at {path} - {exc_message}"
     if user_id:
         log_message += f" - user_id={user_id}"
+    fields = {
+        "fingerprint": fingerprint,
+        "exception": exc_type,
+        "view": view_name,
+        "path": path,
+        "status": status_code,
+        "user_id": user_id,
+    }
 
-    # Get full traceback
-    try:
-        exc_traceback = traceback.format_exc()
-    except Exception:
-        exc_traceback = "Unable to get traceback"
-
-    # Log based on response status
-    if response is not None:
-        status_code = response.status_code
-        if status_code >= 500:
-            logger.error(f"{log_message}\nTraceback:\n{exc_traceback}")
-        elif status_code >= 400:
-            logger.warning(f"{log_message}\nTraceback:\n{exc_traceback}")
+    if status_code >= 500:
+        # Full traceback only for server errors
+        try:
+            exc_traceback = "".join(traceback.format_exception(exc))
+        except Exception:
+            exc_traceback = "Unable to get traceback"
+        logger.error(f"{log_message}\nTraceback:\n{exc_traceback}", extra={"fields": fields})
     else:
-        # Unhandled exception (500)
-        logger.error(f"{log_message}\nTraceback:\n{exc_traceback}")
+        logger.warning(log_message, extra={"fields": fields})
 
     return response
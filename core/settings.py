@@ -13,6 +13,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from celery.schedules import crontab
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third-party apps
     "corsheaders",
@@ -59,6 +61,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "apps.common.middleware.RequestIdMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -104,6 +107,119 @@ DATABASES = {
     },
 }
 
+# Cache
+# Use Redis when available so cache invalidation is shared by all workers;
+# the local-memory fallback is only consistent within a single process.
+
+REDIS_URL = config("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        },
+    }
+
+# Lifetime (seconds) of cached public post/category responses
+POSTS_CACHE_TIMEOUT = config("POSTS_CACHE_TIMEOUT", default=300, cast=int)
+
+# Post view counter buffer: "redis" (shared by all workers) or "memory" (per worker)
+POSTS_VIEW_COUNTER_BACKEND = config(
+    "POSTS_VIEW_COUNTER_BACKEND", default="redis" if REDIS_URL else "memory"
+)
+# Seconds between flushes of buffered views to Post.views_count
+POSTS_VIEW_COUNTER_FLUSH_INTERVAL = config("POSTS_VIEW_COUNTER_FLUSH_INTERVAL", default=10, cast=int)
+
+# Per-worker cache of rendered post detail payloads, in bytes (0 disables it)
+POSTS_DETAIL_CACHE_MAX_BYTES = config("POSTS_DETAIL_CACHE_MAX_BYTES", default=16 * 1024 * 1024, cast=int)
+
+# How feed endpoints build list cards: "cards" (stored on the post) or "database"
+# (json_build_object in the feed query, needs local media storage)
+POSTS_FEED_RENDERING = config("POSTS_FEED_RENDERING", default="cards")
+
+# Sorted-set feed index: "redis" or "none" (feeds read from the database)
+POSTS_FEED_INDEX_BACKEND = config(
+    "POSTS_FEED_INDEX_BACKEND", default="redis" if REDIS_URL else "none"
+)
+
+# Estimated text similarity (0-1) above which the admin warns about a likely duplicate post
+POSTS_DUPLICATE_THRESHOLD = config("POSTS_DUPLICATE_THRESHOLD", default=0.8, cast=float)
+
+# Search backend: "postgres" (full-text search) or "memory" (in-process inverted index),
+# or the dotted path of a SearchBackend subclass
+POSTS_SEARCH_BACKEND = config("POSTS_SEARCH_BACKEND", default="postgres")
+
+# Lifetime (seconds) of cached search results, dropped earlier when published posts change
+POSTS_SEARCH_CACHE_TIMEOUT = config("POSTS_SEARCH_CACHE_TIMEOUT", default=600, cast=int)
+# Popular search query counter: "redis" (shared) or "memory" (per worker)
+POSTS_SEARCH_POPULAR_BACKEND = config(
+    "POSTS_SEARCH_POPULAR_BACKEND", default="redis" if REDIS_URL else "memory"
+)
+# Most popular queries searched again after each invalidation (0 disables pre-warming)
+POSTS_SEARCH_PREWARM_QUERIES = config("POSTS_SEARCH_PREWARM_QUERIES", default=20, cast=int)
+
+# Directory of the semantic search index builds (see build_semantic_index)
+POSTS_SEMANTIC_INDEX_DIR = config("POSTS_SEMANTIC_INDEX_DIR", default=str(BASE_DIR / "semantic_index"))
+
+# Directory of the vocabulary, IDF weights and TF-IDF rows kept between related post runs
+POSTS_RELATED_INDEX_DIR = config("POSTS_RELATED_INDEX_DIR", default=str(BASE_DIR / "related_index"))
+
+# Database log handler: records are queued in memory and written by a background thread
+LOGS_QUEUE_SIZE = config("LOGS_QUEUE_SIZE", default=10000, cast=int)
+LOGS_BATCH_SIZE = config("LOGS_BATCH_SIZE", default=500, cast=int)
+# Seconds a record may wait in the queue before its batch is written
+LOGS_FLUSH_INTERVAL = config("LOGS_FLUSH_INTERVAL", default=2.0, cast=float)
+# What to do with records when the queue is full: "drop", "sample" (keep LOGS_SAMPLE_RATE
+# of INFO records once the queue is half full) or "block" (wait up to LOGS_BLOCK_TIMEOUT seconds)
+LOGS_OVERFLOW_POLICY = config("LOGS_OVERFLOW_POLICY", default="drop")
+LOGS_SAMPLE_RATE = config("LOGS_SAMPLE_RATE", default=0.1, cast=float)
+LOGS_BLOCK_TIMEOUT = config("LOGS_BLOCK_TIMEOUT", default=0.5, cast=float)
+# Admin actions are logged as a one-line message plus typed fields (LogEntry.fields),
+# False logs the full formatted banner as the message instead
+LOGS_STRUCTURED = config("LOGS_STRUCTURED", default=True, cast=bool)
+# API exceptions are counted per fingerprint (type, view, stack): occurrences of one
+# fingerprint logged per hour and worker, and seconds between flushes of the counters
+LOGS_EXCEPTION_TRACEBACKS_PER_HOUR = config("LOGS_EXCEPTION_TRACEBACKS_PER_HOUR", default=5, cast=int)
+LOGS_EXCEPTION_FLUSH_INTERVAL = config("LOGS_EXCEPTION_FLUSH_INTERVAL", default=30, cast=int)
+# Log entries are kept in monthly partitions: full months kept before a partition is
+# dropped, and months created ahead (see manage_log_partitions)
+LOGS_RETENTION_MONTHS = config("LOGS_RETENTION_MONTHS", default=6, cast=int)
+LOGS_PARTITIONS_AHEAD = config("LOGS_PARTITIONS_AHEAD", default=2, cast=int)
+
+# Periodic jobs, run by `celery beat`. Where beat is not deployed, run the management
+# command named with each entry from cron on the same schedule instead.
+CELERY_BEAT_SCHEDULE = {
+    # update_trending_scores: */10 * * * *
+    "update-trending-scores": {
+        "task": "apps.posts.service.trending_tasks.update_trending_scores_task",
+        "schedule": crontab(minute="*/10"),
+    },
+    # build_related_posts: 5 * * * *
+    "update-related-posts": {
+        "task": "apps.posts.service.related_tasks.update_related_posts_task",
+        "schedule": crontab(minute=5),
+    },
+    # build_related_posts --full: 30 3 * * 0
+    "rebuild-related-posts": {
+        "task": "apps.posts.service.related_tasks.update_related_posts_task",
+        "schedule": crontab(minute=30, hour=3, day_of_week=0),
+        "kwargs": {"full": True},
+    },
+    # manage_log_partitions: 15 2 * * *
+    "maintain-log-partitions": {
+        "task": "apps.logs.tasks.maintain_log_partitions_task",
+        "schedule": crontab(minute=15, hour=2),
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -205,6 +321,10 @@ CSRF_TRUSTED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# JSON renderer for API responses. Set to "rest_framework.renderers.JSONRenderer"
+# to go back to the stock encoder; both produce the same output.
+API_JSON_RENDERER = config("API_JSON_RENDERER", default="apps.common.renderers.ORJSONRenderer")
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
@@ -225,7 +345,7 @@ REST_FRAMEWORK = {
         "user": "30000/min",
     },
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer"
+        API_JSON_RENDERER,
     ]
 }
 
@@ -384,6 +504,12 @@ LOGGING = {
             "level": "INFO",
             "class": "apps.logs.handlers.DatabaseHandler",
             "formatter": "verbose",
+            "queue_size": LOGS_QUEUE_SIZE,
+            "batch_size": LOGS_BATCH_SIZE,
+            "flush_interval": LOGS_FLUSH_INTERVAL,
+            "overflow": LOGS_OVERFLOW_POLICY,
+            "sample_rate": LOGS_SAMPLE_RATE,
+            "block_timeout": LOGS_BLOCK_TIMEOUT,
         },
 
         "file": {